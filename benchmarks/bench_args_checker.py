@@ -0,0 +1,365 @@
+"""bench_args_checker.py: timing harness for ArgsIndentChecker
+
+Generates synthetic modules of increasing size and times every entry point of
+the args rules.  Results are saved as JSON so two runs can be compared::
+
+    python benchmarks/bench_args_checker.py run --output=before.json
+    python benchmarks/bench_args_checker.py run --output=after.json
+    python benchmarks/bench_args_checker.py compare before.json after.json
+
+"""
+import json
+from os import path
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+
+from plumbum import cli
+
+HERE = path.abspath(path.dirname(__file__))
+sys.path.insert(0, path.dirname(HERE))
+
+DEFAULT_SIZES = '10,100,1000'
+DEFAULT_ROUNDS = 5
+
+FUNCTION_TEMPLATE = '''
+def good_func_{index}(
+        arg1,
+        arg2,
+        optional_arg=None
+):
+    """docstring"""
+    result = helper_{index}(
+        arg1,
+        arg2,
+        optional_arg
+    )
+    return wide_call(arg1, arg2, result, optional_arg, key=arg1)
+
+def bad_func_{index}(arg1,
+                     arg2):
+    """docstring"""
+    return short_call(arg1, arg2)
+
+def oneline_func_{index}(arg1, arg2, arg3):
+    """docstring"""
+    value = another_call(arg1,
+                         arg2)
+    return value
+'''
+
+CLASS_TEMPLATE = '''
+class Outer{index}(object):
+    """docstring"""
+    attribute = 1
+
+    def method(self, arg1, arg2):
+        """docstring"""
+        return self.helper(arg1, arg2, arg1, arg2)
+
+    def bad_method(self,
+                   arg1):
+        """docstring"""
+        return arg1
+
+    class Inner{index}(object):
+        """docstring"""
+        def inner_method(
+                self,
+                arg1
+        ):
+            """docstring"""
+            return arg1
+'''
+
+def generate_module(size):
+    """build a synthetic module with ``size`` of each construct
+
+    Args:
+        size (int): number of function groups and classes
+
+    Returns:
+        str: python source
+
+    """
+    parts = ['"""synthetic benchmark module"""\n']
+    for index in range(size):
+        parts.append(FUNCTION_TEMPLATE.format(index=index))
+        parts.append(CLASS_TEMPLATE.format(index=index))
+    return ''.join(parts)
+
+def build_checker():
+    """ArgsIndentChecker wired to a message-swallowing linter
+
+    Returns:
+        :obj:`ArgsIndentChecker`: ready to visit nodes
+
+    """
+    from pylint import testutils
+    from pylint_prosper.args_checker import ArgsIndentChecker
+
+    linter = testutils.UnittestLinter()
+    checker = ArgsIndentChecker(linter)
+    checker.open()
+    return checker
+
+def collect_nodes(module):
+    """bucket astroid nodes by the visitor that handles them
+
+    Args:
+        module (:obj:`astroid.Module`): parsed module
+
+    Returns:
+        dict: visitor name -> list of nodes
+
+    """
+    import astroid
+
+    nodes = {
+        'visit_functiondef': [],
+        'visit_classdef': [],
+        'visit_callfunc': [],
+        'visit_call': [],
+    }
+    todo = [module]
+    while todo:
+        node = todo.pop()
+        todo.extend(node.get_children())
+        if isinstance(node, astroid.Call):
+            nodes['visit_call'].append(node)
+        if isinstance(node, astroid.FunctionDef):
+            nodes['visit_functiondef'].append(node)
+        elif isinstance(node, astroid.ClassDef):
+            nodes['visit_classdef'].append(node)
+        elif isinstance(node, astroid.Assign) and isinstance(node.value, astroid.Call):
+            nodes['visit_callfunc'].append(node)  # current visitor reads ``node.value``
+    return nodes
+
+def time_case(func, rounds):
+    """time ``func`` over ``rounds`` runs
+
+    Args:
+        func (callable): zero-arg callable to time
+        rounds (int): number of timed runs
+
+    Returns:
+        dict: min/median seconds, or the error that stopped the case
+
+    """
+    try:
+        timings = timeit.repeat(
+            func,
+            number=1,
+            repeat=rounds
+        )
+    except Exception as err:  # record, don't abort the whole run
+        return {'error': '{}: {}'.format(type(err).__name__, err)}
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'rounds': rounds,
+    }
+
+def bench_size(size, rounds):
+    """time every entry point against one module size
+
+    Args:
+        size (int): module size passed to :func:`generate_module`
+        rounds (int): number of timed runs per case
+
+    Returns:
+        dict: case name -> timing results
+
+    """
+    import astroid
+
+    from pylint_prosper import engine
+    from pylint_prosper import layout
+    from pylint_prosper import runner
+
+    source = generate_module(size)
+    module = astroid.parse(source)
+    nodes = collect_nodes(module)
+    checker = build_checker()
+
+    def visit_all(visitor_name):
+        visitor = getattr(checker, visitor_name)
+        def _visit():
+            checker.visit_module(module)  # fresh visited-node index per round
+            for node in nodes[visitor_name]:
+                visitor(node)
+            checker.linter.release_messages()
+        return _visit
+
+    tokens = list(layout.tokenize_source(source))
+
+    def visit_calls_indexed():
+        checker.process_tokens(list(tokens))  # a fresh list per round, like pylint per module
+        checker.visit_module(module)  # takes the tokens, calls look up their ParenIndex
+        for node in nodes['visit_call']:
+            checker.visit_call(node)
+        checker.linter.release_messages()
+
+    results = {}
+    for visitor_name in sorted(nodes):
+        results[visitor_name] = time_case(visit_all(visitor_name), rounds)
+    results['visit_call_indexed'] = time_case(visit_calls_indexed, rounds)
+
+    results['astroid_build'] = time_case(lambda: astroid.parse(source), rounds)
+    results['engine_lint_source'] = time_case(lambda: engine.lint_source(source), rounds)
+    results['layout_scan_tokens'] = time_case(
+        lambda: list(layout.scan_tokens(layout.tokenize_source(source))),
+        rounds
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        module_path = path.join(tmp_dir, 'bench_module.py')
+        with open(module_path, 'w') as module_fh:
+            module_fh.write(source)
+        linter = runner.build_pylint_linter()
+        results['pylint_full_run'] = time_case(
+            lambda: runner.pylint_file(linter, module_path),
+            rounds
+        )
+
+    return results
+
+def environment():
+    """versions that make two runs comparable
+
+    Returns:
+        dict: interpreter and library versions
+
+    """
+    import astroid
+    import pylint
+
+    from pylint_prosper._version import __version__
+
+    return {
+        'python': platform.python_version(),
+        'pylint': pylint.__version__,
+        'astroid': astroid.__version__,
+        'pylint_prosper': __version__,
+    }
+
+class BenchArgsChecker(cli.Application):
+    """benchmark harness for the pylint_prosper args rules"""
+    PROGNAME = 'bench_args_checker'
+
+    def main(self, *args):
+        """require a subcommand"""
+        if args:
+            print('unknown command: {}'.format(args[0]))
+            return 1
+        if not self.nested_command:
+            self.help()
+            return 1
+        return 0
+
+@BenchArgsChecker.subcommand('run')
+class BenchRun(cli.Application):
+    """time every entry point and save a JSON baseline"""
+    sizes = cli.SwitchAttr(
+        ['--sizes'],
+        str,
+        default=DEFAULT_SIZES,
+        help='comma-separated module sizes to generate'
+    )
+
+    rounds = cli.SwitchAttr(
+        ['--rounds'],
+        int,
+        default=DEFAULT_ROUNDS,
+        help='timed runs per case'
+    )
+
+    output = cli.SwitchAttr(
+        ['--output'],
+        str,
+        default='bench_output.json',
+        help='where to save the JSON baseline'
+    )
+
+    def main(self):
+        """run the benchmarks"""
+        report = {
+            'environment': environment(),
+            'results': {},
+        }
+        for size in (int(size) for size in self.sizes.split(',')):
+            for case, timing in sorted(bench_size(size, self.rounds).items()):
+                name = '{}[{}]'.format(case, size)
+                report['results'][name] = timing
+                print('{:<40} {}'.format(name, format_timing(timing)))
+
+        with open(self.output, 'w') as output_fh:
+            json.dump(
+                report,
+                output_fh,
+                indent=2,
+                sort_keys=True
+            )
+        print('saved: ' + self.output)
+
+def format_timing(timing):
+    """one-line summary of a timing result
+
+    Args:
+        timing (dict): from :func:`time_case`
+
+    Returns:
+        str: ``min/median`` in ms, or the recorded error
+
+    """
+    if 'error' in timing:
+        return 'ERROR ' + timing['error']
+    return '{:10.3f}ms min {:10.3f}ms median'.format(
+        timing['min'] * 1000,
+        timing['median'] * 1000
+    )
+
+@BenchArgsChecker.subcommand('compare')
+class BenchCompare(cli.Application):
+    """compare two JSON baselines, fail on regressions"""
+    threshold = cli.SwitchAttr(
+        ['--threshold'],
+        float,
+        default=0.10,
+        help='allowed slowdown of median time, 0.10 = 10%'
+    )
+
+    def main(self, baseline, current):
+        """diff ``current`` against ``baseline``"""
+        with open(baseline, 'r') as baseline_fh:
+            old = json.load(baseline_fh)
+        with open(current, 'r') as current_fh:
+            new = json.load(current_fh)
+
+        if old['environment'] != new['environment']:
+            print('WARNING: environments differ, timings may not be comparable')
+
+        regressions = 0
+        for name in sorted(set(old['results']) & set(new['results'])):
+            old_timing = old['results'][name]
+            new_timing = new['results'][name]
+            if 'error' in old_timing or 'error' in new_timing:
+                print('{:<40} {}'.format(name, format_timing(new_timing)))
+                continue
+            change = new_timing['median'] / old_timing['median'] - 1
+            flag = ''
+            if change > self.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print('{:<40} {:+8.1%}{}'.format(
+                name,
+                change,
+                flag
+            ))
+
+        return 1 if regressions else 0
+
+if __name__ == '__main__':
+    BenchArgsChecker.run()
@@ -1,6 +1,10 @@
 """pylint_prosper module"""
 from __future__ import absolute_import
 
+from time import perf_counter
+
+IMPORT_START = perf_counter()  # ``prosper_lint --profile`` times its import from here
+
 def register(linter):
     """Required method to auto register this checker.
 
@@ -13,3 +17,22 @@ def register(linter):
     """
     from pylint_prosper.args_checker import ArgsIndentChecker
     linter.register_checker(ArgsIndentChecker(linter))
+
+def lint_sources(sources, config=None):
+    """apply the args rules to in-memory sources, one checker for the whole batch
+
+    Notes:
+        nothing is written to disk and pylint's linter is never built, see
+        :mod:`pylint_prosper.batch`
+
+    Args:
+        sources (iterable): (name, source) pairs, ``name`` is reported as the path
+        config (:obj:`engine.LintConfig`, optional): checker options, default E7700/E7701 settings
+
+    Yields:
+        tuple: (name, :obj:`list` :obj:`engine.Message`) per source, in input order
+
+    """
+    from pylint_prosper import batch
+    from pylint_prosper import engine
+    return batch.lint_sources(sources, config or engine.DEFAULT_CONFIG)
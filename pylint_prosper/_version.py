@@ -1,15 +1,18 @@
-"""_version.py: track package version information"""
+"""_version.py: track package version information
+
+``__version__`` is resolved on first access, not at import, so loading the
+plugin never drags in ProsperCommon
+
+"""
+import functools
 from os import path
+import sys
+import types
 import warnings
 
-INSTALLED = True
-try:   # pragma: no cover
-    import prosper.common.prosper_version as p_version
-except ImportError:
-    INSTALLED = False
-
 HERE = path.abspath(path.dirname(__file__))
 
+@functools.lru_cache(maxsize=None)
 def get_version():
     """find current version information
 
@@ -17,7 +20,9 @@ def get_version():
         (str): version information
 
     """
-    if not INSTALLED:
+    try:   # pragma: no cover
+        import prosper.common.prosper_version as p_version
+    except ImportError:
         try:
             with open('version.txt', 'r') as v_fh:
                 return v_fh.read()
@@ -30,4 +35,11 @@ def get_version():
 
     return p_version.get_version(HERE)
 
-__version__ = get_version()
+class _LazyVersionModule(types.ModuleType):
+    """module type that computes ``__version__`` on first attribute access"""
+
+    @property
+    def __version__(self):
+        return get_version()
+
+sys.modules[__name__].__class__ = _LazyVersionModule
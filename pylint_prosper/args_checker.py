@@ -1,22 +1,114 @@
 """PyLint plugin for validating preferred args alignment"""
-import tokenize
+import functools
+from time import perf_counter
 
+import astroid
 import pylint.interfaces
 import pylint.checkers
+from pylint.exceptions import EmptyReportError
+from pylint.reporters.ureports.nodes import Table
 
+from pylint_prosper import layout
+from pylint_prosper import profiling
+from pylint_prosper.layout import MSGS
 
-MSGS = {
-    'E7700': (
-        'Argument alignment, move to new line',
-        'invalid-function-arg-format',
-        'Used when inconsistent tabstops are used in argument list'
-    ),
-    'E7701': (
-        'Too many args for one-line.  More than %s args',
-        'invalid-oneline-function-format',
-        'Used when one-liner function call is too complex'
-    )
-}
+def timed(
+        visitor,
+        timings,
+        phase
+):
+    """``visitor`` recording its run time into ``timings`` under ``phase``
+
+    Notes:
+        only ever installed while profiling, see :meth:`ArgsIndentChecker.set_timings`
+
+    Args:
+        visitor (callable): bound checker method
+        timings (:obj:`profiling.Timings`): collector
+        phase (str): name to record under, ``checker.visit_call``
+
+    Returns:
+        callable: same signature as ``visitor``
+
+    """
+    @functools.wraps(visitor)
+    def _timed_visitor(node):
+        start = perf_counter()
+        try:
+            return visitor(node)
+        finally:
+            timings.add(
+                phase,
+                start,
+                perf_counter()
+            )
+    return _timed_visitor
+
+def _diff_string(old, new):
+    """``+1.00``/``-1.00``/``=`` change between runs, pylint's report spelling"""
+    if new > old:
+        return '+%.2f' % (new - old)
+    if new < old:
+        return '-%.2f' % (old - new)
+    return '='
+
+def report_args_stats(
+        sect,
+        stats,
+        old_stats
+):
+    """RP7700: defs/calls examined, visitor time and messages, vs the last run
+
+    Notes:
+        only filled in with ``args-stats=y``.  ``stats``/``old_stats`` are plain
+        ``function_args_*`` dicts, see :attr:`ArgsIndentChecker.args_stats`
+
+    """
+    keys = sorted(key for key in stats if key.startswith(profiling.STATS_PREFIX))
+    if not keys:
+        raise EmptyReportError()
+    lines = ('counter', 'number', 'previous', 'difference')
+    for key in keys:
+        value = stats[key]
+        old = old_stats.get(key)
+        if old is not None:
+            diff_str = _diff_string(old, value)
+        else:
+            old, diff_str = 'NC', 'NC'
+        lines += (
+            key[len(profiling.STATS_PREFIX):],
+            '%.6f' % value if isinstance(value, float) else str(value),
+            '%.6f' % old if isinstance(old, float) else str(old),
+            diff_str
+        )
+    sect.append(Table(
+        children=lines,
+        cols=4,
+        rheaders=1
+    ))
+
+def _chained_calls(node):
+    """calls applied earlier in the same expression, ``a(x).b[0](y)`` has 1
+
+    Args:
+        node (:obj:`astroid.Call`): call node
+
+    Returns:
+        int: calls between the expression start and ``node``
+
+    """
+    chained = 0
+    callee = node.func
+    while True:
+        if isinstance(callee, astroid.Call):
+            chained += 1
+            callee = callee.func
+        elif isinstance(callee, astroid.Attribute):
+            callee = callee.expr
+        elif isinstance(callee, astroid.Subscript):
+            callee = callee.value
+        else:
+            return chained
 
 class ArgsIndentChecker(pylint.checkers.BaseTokenChecker):
     """PyLint checker for enforcing Kevlin Henny's function arg preference
@@ -53,6 +145,19 @@ class ArgsIndentChecker(pylint.checkers.BaseTokenChecker):
 
     msgs = MSGS
 
+    timings = None  # :obj:`profiling.Timings` hook, see :meth:`set_timings`
+    TIMED_METHODS = (
+        'process_tokens',
+        'visit_call',
+        'visit_classdef',
+        'visit_functiondef',
+    )
+    _shared_tokens = None  # :obj:`layout.SharedTokenIndex`, shared with the quote checker
+    _pending_tokens = None  # next module's tokens, pylint tokenizes before the walk
+    _module_tokens = None
+    _parens = None  # :obj:`layout.ParenIndex` of the module being walked
+    args_stats = {}  # ``function_args_*`` counters of the last run, filled on close
+
     options = (
         (
             'kevlin-func-args',
@@ -72,36 +177,255 @@ class ArgsIndentChecker(pylint.checkers.BaseTokenChecker):
                 help='number of args allowed to be on a single line'
 
             )
+        ),
+        (
+            'tokenize-func-args',
+            dict(
+                default=False,
+                type='yn',
+                metavar='<y or n>',
+                help='Check args from the token stream and skip the astroid visitors'
+            )
+        ),
+        (
+            'skip-nested-calls',
+            dict(
+                default=False,
+                type='yn',
+                metavar='<y or n>',
+                help='Skip calls inside a statement that already has an args message'
+            )
+        ),
+        (
+            'check-closing-paren',
+            dict(
+                default=False,
+                type='yn',
+                metavar='<y or n>',
+                help='Require multi-line arg lists to end with a closing paren on its own line, '
+                'at the indent of the def/call line'
+            )
+        ),
+        (
+            'args-stats',
+            dict(
+                default=False,
+                type='yn',
+                metavar='<y or n>',
+                help='Count defs/calls examined, visitor time and messages into the run stats'
+            )
         )
     )
 
+    def __init__(self, linter=None):
+        super(ArgsIndentChecker, self).__init__(linter)
+        # RP7700 lives here only: bound per instance, it reads this checker's counters
+        self.reports = (('RP7700', 'Function args statistics', self._report_args_stats),)
+
+    def set_timings(self, timings):
+        """profile into ``timings``, None to stop
+
+        Notes:
+            timed wrappers of :attr:`TIMED_METHODS` shadow the methods on the
+            instance only while profiling, so a normal run calls the plain methods.
+            pylint collects visitors when a check starts, set this before.
+
+        Args:
+            timings (:obj:`profiling.Timings`): collector, or None
+
+        """
+        self.timings = timings
+        for name in self.TIMED_METHODS:
+            if timings is None:
+                self.__dict__.pop(name, None)
+            else:
+                self.__dict__[name] = timed(
+                    getattr(type(self), name).__get__(self),
+                    timings,
+                    'checker.' + name
+                )
+
+    def _report_args_stats(
+            self,
+            sect,
+            stats,
+            old_stats
+    ):
+        """:func:`report_args_stats` on this checker's own counters
+
+        Notes:
+            pylint's ``stats`` stopped being a dict in 2.12, ``old_stats`` only holds
+            counters on versions that still persist a dict between runs
+
+        """
+        report_args_stats(
+            sect,
+            self.args_stats,
+            old_stats if isinstance(old_stats, dict) else {}
+        )
+
+    def process_tokens(self, tokens):
+        """checks def/call args layout straight from the token stream
+
+        Notes:
+            only grades with ``tokenize-func-args=y``.  Otherwise the tokens are kept
+            for the module's :class:`layout.ParenIndex`, built on the first lookup.
+
+        Args:
+            tokens (:obj:`list`): ``tokenize`` tokens for the module, indexed once
+                for every checker reading :func:`layout.shared_index`
+
+        """
+        if self._shared_tokens is None:
+            self._shared_tokens = layout.shared_index(self.linter)
+        if not self.config.tokenize_func_args:
+            self._pending_tokens = tokens  # picked up by visit_module
+            return
+
+        module_tokens = self._shared_tokens.get(tokens, arg_layouts=True)
+        for arg_layout in module_tokens.arg_layouts:
+            if self.timings is not None:
+                self.timings.count('functions_examined' if arg_layout.is_def else 'calls_examined')
+            msg = layout.grade_layout(
+                arg_layout,
+                self.config.single_line_args_limit,
+                kevlin_func_args=self.config.kevlin_func_args,
+                oneline_limit_adjust=1 if arg_layout.is_method else 0
+            )
+            if msg == 'invalid-oneline-function-format':
+                self.add_message(
+                    msg,
+                    line=arg_layout.lineno,
+                    args=(self.config.single_line_args_limit)
+                )
+            elif msg:
+                self.add_message(msg, line=arg_layout.lineno)
+
+    def visit_call(self, node):
+        """checks for ``results = do_something(arg1\n`` pattern in calls
 
-    def process_tokens(self, tokens):  # pragma: no cover
-        """Not used?  Passing"""
-        pass
+        Notes:
+            calls with one arg or none can't break a rule unless the one-line limit
+            is 0, they're skipped before any layout work
+
+        Args:
+            node (:obj:`astroid.Call`): call node to grade
+
+        """
+        if self.config.tokenize_func_args:
+            return
+        if self.timings is not None:
+            self.timings.count('calls_examined')
+        args = node.args or ()
+        keywords = node.keywords or ()
+        if len(args) + len(keywords) < 2 and (
+                len(args) + len(keywords) <= self.config.single_line_args_limit
+        ):
+            return
+        statement = None
+        if self.config.skip_nested_calls:
+            statement = node.statement()
+            if statement in self._reported_statements:
+                return
+        record = -1
+        parens = self._paren_index()
+        if parens is not None:
+            record = parens.find_call(
+                node.lineno,
+                node.col_offset,
+                _chained_calls(node),
+                len(args) + len(keywords)
+            )
+        if record >= 0:
+            added = self._check_indexed(node.lineno, record)
+        else:
+            added = self._check_node_args_style(
+                node.lineno,
+                args,
+                keywords
+            )
+        if added and statement is not None:
+            self._reported_statements.add(statement)
 
     def visit_callfunc(self, node):
-        """checks for ``results = do_something(arg1\n`` pattern in call functions"""
-        call_lineno = node.value.lineno
-        args = node.value.args
-        self._check_node_args_style(call_lineno, args)
+        """pre-``Call`` astroid spelling of :meth:`visit_call`
+
+        Args:
+            node (:obj:`astroid.node`): call node, or a statement wrapping one
+                (``result = do_something(...)``)
+
+        """
+        if not isinstance(node, astroid.Call):
+            node = node.value
+        self.visit_call(node)
+
+    def add_message(
+            self,
+            msg_id,
+            *args,
+            **kwargs
+    ):
+        """count emitted messages per id when stats/profiling are on, then hand off to pylint"""
+        if self.timings is not None:
+            self.timings.count('messages.' + msg_id)
+        super(ArgsIndentChecker, self).add_message(
+            msg_id,
+            *args,
+            **kwargs
+        )
+
+    def open(self):
+        """reset the visited-node index before a run, start counting with ``args-stats``"""
+        self._checked_functions = set()
+        self._reported_statements = set()
+        self._shared_tokens = layout.shared_index(self.linter)
+        if self.config.tokenize_func_args:
+            self._shared_tokens.arg_layouts = True  # index layouts with the strings, one pass
+        if self.config.args_stats:
+            self.set_timings(profiling.Timings())
+
+    def close(self):
+        """publish the counters on :attr:`args_stats` for reports and callers"""
+        if self.timings is not None:
+            self.args_stats = profiling.checker_stats(self.timings)
+            if isinstance(self.linter.stats, dict):  # pylint < 2.12, kept for the next run
+                self.linter.stats.update(self.args_stats)
+
+    def visit_module(self, node):
+        """reset the visited-node index for every module, take its tokens
+
+        Args:
+            node (:obj:`astroid.node`): module node being linted
+
+        """
+        self._checked_functions = set()
+        self._reported_statements = set()
+        self._module_tokens, self._pending_tokens = self._pending_tokens, None
+        self._parens = None
+
+    def _paren_index(self):
+        """:obj:`layout.ParenIndex` for this module, None without its tokens"""
+        if self._parens is None and self._module_tokens is not None:
+            self._parens = self._shared_tokens.get(
+                self._module_tokens,
+                arg_layouts=True
+            ).parens
+        return self._parens
 
     def visit_classdef(self, node):
         """checks for ``def function_name(arg1\n`` pattern in methods
 
+        Notes:
+            methods are graded here and skipped when pylint visits them again
+
         Args:
-            node (:obj:`astroid.node`): function node to grade
+            node (:obj:`astroid.node`): class node to grade
 
         """
-        for function_node in node.locals.values():
-            method_node = function_node[0]
-            method_lineno = method_node.fromlineno
-            method_args = method_node.args.args
-            self._check_node_args_style(
-                method_lineno,
-                method_args,
-                oneline_limit_adjust=1
-            )
+        if self.config.tokenize_func_args:
+            return
+        for method_node in node.mymethods():
+            self._check_function(method_node)
 
     def visit_functiondef(self, node):
         """checks for ``def function_name(arg1\n`` pattern
@@ -110,40 +434,164 @@ class ArgsIndentChecker(pylint.checkers.BaseTokenChecker):
             node (:obj:`astroid.node`): function node to grade
 
         """
-        func_lineno = node.fromlineno
-        args = node.args.args
-        self._check_node_args_style(func_lineno, args)
+        if self.config.tokenize_func_args:
+            return
+        self._check_function(node)
+
+    def _check_function(self, node):
+        """grade a def exactly once per module
+
+        Args:
+            node (:obj:`astroid.node`): function node to grade
+
+        """
+        if node in self._checked_functions:
+            return
+        self._checked_functions.add(node)
+        if self.timings is not None:
+            self.timings.count('functions_examined')
+        arguments = node.args
+        oneline_limit_adjust = 1 if node.is_method() else 0
+        posonlyargs = getattr(
+            arguments,
+            'posonlyargs',
+            ()  # astroid < 2.4
+        )
+        # ``*args``/``**kwargs`` are plain names, only an annotation gives their line
+        vararg = [arguments.varargannotation] if arguments.vararg else []
+        kwarg = [arguments.kwargannotation] if arguments.kwarg else []
+        record = -1
+        parens = self._paren_index()
+        if parens is not None:
+            record = parens.find_def(
+                node.fromlineno,
+                len(posonlyargs) + len(arguments.args) + len(vararg)
+                + len(arguments.kwonlyargs) + len(kwarg)
+            )
+        if record >= 0:
+            added = self._check_indexed(
+                node.fromlineno,
+                record,
+                oneline_limit_adjust
+            )
+        else:
+            added = self._check_node_args_style(
+                node.fromlineno,
+                posonlyargs,
+                arguments.args,
+                [annotation for annotation in vararg if annotation is not None],
+                arguments.kwonlyargs,
+                [annotation for annotation in kwarg if annotation is not None],
+                oneline_limit_adjust=oneline_limit_adjust
+            )
+        if added and self.config.skip_nested_calls:
+            self._reported_statements.add(node)  # calls in defaults/decorators
+
+    def _check_indexed(
+            self,
+            func_lineno,
+            record,
+            oneline_limit_adjust=0
+    ):
+        """:meth:`_check_node_args_style` from a :class:`layout.ParenIndex` record
+
+        Notes:
+            arg lines come from the tokens, so ``*args``/``**kwargs`` count where they
+            sit.  Also checks the closing paren with ``check-closing-paren=y``.
+
+        Args:
+            func_lineno (int): starting line number
+            record (int): index into :attr:`_parens`
+            oneline_limit_adjust (int, optional): +/- adjustments of args limit for special cases
+
+        Returns:
+            bool: a message was added
+
+        """
+        parens = self._parens
+        first_lineno = parens.first_arg_lines[record]
+        if first_lineno == parens.last_arg_lines[record]:  # all args on one line
+            arg_count = parens.arg_counts[record]
+            if arg_count > self.config.single_line_args_limit + oneline_limit_adjust:
+                self.add_message(
+                    'invalid-oneline-function-format',
+                    line=func_lineno,
+                    args=(self.config.single_line_args_limit)
+                )
+                return True
+        elif func_lineno == first_lineno and self.config.kevlin_func_args:
+            self.add_message(
+                'invalid-function-arg-format',
+                line=func_lineno
+            )
+            return True
+
+        if not self.config.check_closing_paren or first_lineno <= parens.open_lines[record]:
+            return False  # empty, or args start on the paren's line
+        if parens.indents[record] >= 0 and parens.close_cols[record] != parens.indents[record]:
+            self.add_message(
+                'invalid-closing-paren-format',
+                line=func_lineno
+            )
+            return True
+        return False
 
     def _check_node_args_style(
             self,
             func_lineno,
             args_list,
+            *more_args,
             oneline_limit_adjust=0
     ):
         """do the actual work of finding bad args lines
 
+        Notes:
+            single pass, no temporary containers.  Stops at the first arg on a new
+            line since only the first arg's line matters for multi-line layouts.
+            Args without a line (unannotated ``*args``/``**kwargs``) aren't passed
+            in, they can't be placed on or off the one line.
+
         Args:
             func_lineno (int): starting line number
             args_list (:obj:`list`): node.args values of function args
+            *more_args (:obj:`list`): more arg nodes in source order (kwonlyargs, call keywords)
             oneline_limit_adjust (int, optional): +/- adjustments of args limit for special cases
 
+        Returns:
+            bool: a message was added
+
         """
+        arg_count = 0
+        first_lineno = 0
+        is_oneline = True   # all args on same line?
+        for arg_group in (args_list,) + more_args:
+            for arg in arg_group:
+                lineno = arg.lineno or arg.value.lineno  # call keywords may lack a lineno
+                if not first_lineno:
+                    first_lineno = lineno
+                elif lineno != first_lineno:
+                    is_oneline = False
+                    break
+                arg_count += 1
+            if not is_oneline:
+                break
+
         ## Check if valid one-line call ##
-        oneline_limit = self.config.single_line_args_limit + oneline_limit_adjust
-        is_oneline = len(set([arg.lineno for arg in args_list])) <= 1  # all args on same line?
-        if is_oneline and len(args_list) > oneline_limit:
-            self.add_message(
-                'invalid-oneline-function-format',
-                line=func_lineno,
-                args=(self.config.single_line_args_limit)
-            )
-            return
-        if is_oneline and len(args_list) <= oneline_limit:
-            return  # valid one-line function
+        if is_oneline:
+            if arg_count > self.config.single_line_args_limit + oneline_limit_adjust:
+                self.add_message(
+                    'invalid-oneline-function-format',
+                    line=func_lineno,
+                    args=(self.config.single_line_args_limit)
+                )
+                return True
+            return False  # valid one-line function
 
         ## Check if first arg is on same line as function def ##
-        if func_lineno == args_list[0].lineno and self.config.kevlin_func_args:
+        if func_lineno == first_lineno and self.config.kevlin_func_args:
             self.add_message(
                 'invalid-function-arg-format',
                 line=func_lineno
             )
+            return True
+        return False
@@ -0,0 +1,212 @@
+"""baseline.py: known E7700/E7701 hits recorded once and dropped on later runs
+
+A hit is fingerprinted by what it is, not where it is: a hash of the file's
+path and the normalized def/call signatures on the reported line.  Moving code
+around keeps its fingerprint, rewriting the signature drops it
+
+"""
+import collections
+import hashlib
+import json
+import os
+from os import path
+import tokenize
+
+from pylint_prosper import engine
+from pylint_prosper import layout
+
+VERSION = 1
+FINGERPRINT_CHARS = 16  # 64 bits of sha1, plenty for one tree's worth of hits
+
+Baseline = collections.namedtuple(
+    'Baseline',
+    [
+        'root',    # fingerprinted paths are relative to the baseline file's directory
+        'counts',  # {fingerprint: hits allowed}
+        'digest',  # sha1 of the file, for the result cache
+    ]
+)
+
+_LOADED = {}  # abspath -> (st_mtime_ns, st_size, Baseline), one parse per process
+
+def signatures(source):
+    """normalized def/call signatures by the line their name is on
+
+    Notes:
+        a signature is the significant tokens from the name through the closing
+        paren, space separated: layout, comments and line breaks don't count
+
+    Args:
+        source (str): python source code
+
+    Returns:
+        dict: line number -> :obj:`list` str, in closing-paren order
+
+    """
+    found = collections.defaultdict(list)
+    texts = []  # significant token strings so far
+    try:
+        for event, token, bracket in layout.scan_brackets(layout.tokenize_source(source)):
+            if event == layout.SKIPPED or event == layout.ARG:
+                continue
+            texts.append(token[1])
+            if event == layout.OPENED and bracket.kind:
+                bracket.extra = len(texts) - 2  # signature starts at the name
+            elif event == layout.CLOSED and bracket.kind:
+                found[bracket.lineno].append(' '.join(texts[bracket.extra:]))
+    except (tokenize.TokenError, SyntaxError):
+        pass  # fingerprint what was seen, the rest falls back to line text
+    return found
+
+def fingerprint(
+        relpath,
+        symbol,
+        signature
+):
+    """hash one hit
+
+    Args:
+        relpath (str): ``/`` separated path, relative to the baseline's directory
+        symbol (str): message symbol, ``invalid-function-arg-format``
+        signature (str): normalized signatures on the reported line
+
+    Returns:
+        str: :data:`FINGERPRINT_CHARS` hex digits
+
+    """
+    digest = hashlib.sha1('\0'.join((relpath, symbol, signature)).encode('utf-8'))
+    return digest.hexdigest()[:FINGERPRINT_CHARS]
+
+def relative_path(filepath, root):
+    """``filepath`` relative to ``root`` with ``/`` separators"""
+    return path.relpath(path.abspath(filepath), root).replace(os.sep, '/')
+
+def fingerprints(
+        filepath,
+        messages,
+        root
+):
+    """fingerprint every args message of one file
+
+    Args:
+        filepath (str): path to python file
+        messages (:obj:`list` :obj:`engine.Message`): that file's messages
+        root (str): directory fingerprinted paths are relative to
+
+    Returns:
+        :obj:`list`: fingerprint per message, None for messages a baseline can't hold
+
+    """
+    if not any(message.msg_id in layout.MSGS for message in messages):
+        return [None] * len(messages)
+    try:
+        source = engine.read_source(filepath)
+    except (OSError, SyntaxError):
+        return [None] * len(messages)
+    relpath = relative_path(filepath, root)
+    by_line = signatures(source)
+    lines = source.splitlines()
+
+    prints = []
+    for message in messages:
+        if message.msg_id not in layout.MSGS:
+            prints.append(None)
+            continue
+        signature = ' | '.join(by_line.get(message.line, ()))
+        if not signature and 0 < message.line <= len(lines):
+            signature = ' '.join(lines[message.line - 1].split())  # pylint put it elsewhere
+        prints.append(fingerprint(
+            relpath,
+            message.symbol,
+            signature
+        ))
+    return prints
+
+def load(filepath):
+    """read a baseline file, reusing the last parse while it's unchanged
+
+    Args:
+        filepath (str): written by :func:`write`
+
+    Returns:
+        :obj:`Baseline`: known hits
+
+    Raises:
+        OSError: unreadable file
+        ValueError: not a baseline file
+
+    """
+    abspath = path.abspath(filepath)
+    stat = os.stat(abspath)
+    cached = _LOADED.get(abspath)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    with open(abspath, 'rb') as baseline_fh:
+        data = baseline_fh.read()
+    contents = json.loads(data.decode('utf-8'))
+    if not isinstance(contents, dict) or contents.get('version') != VERSION:
+        raise ValueError('{} is not a prosper_lint baseline'.format(filepath))
+    loaded = Baseline(
+        root=path.dirname(abspath),
+        counts=contents['fingerprints'],
+        digest=hashlib.sha1(data).hexdigest(),
+    )
+    _LOADED[abspath] = (stat.st_mtime_ns, stat.st_size, loaded)
+    return loaded
+
+def write(filepath, prints):
+    """record hits, overwriting ``filepath``
+
+    Args:
+        filepath (str): baseline file
+        prints (iterable): fingerprint per hit, repeats are counted
+
+    Returns:
+        int: hits recorded
+
+    """
+    counts = collections.Counter(prints)
+    with open(filepath, 'w') as baseline_fh:
+        json.dump(
+            {'version': VERSION, 'fingerprints': counts},
+            baseline_fh,
+            indent=0,
+            sort_keys=True
+        )
+        baseline_fh.write('\n')
+    return sum(counts.values())
+
+def apply(
+        known,
+        filepath,
+        messages
+):
+    """drop the messages ``known`` already holds
+
+    Notes:
+        a fingerprint recorded N times drops N identical hits, an N+1th is
+        reported
+
+    Args:
+        known (:obj:`Baseline`): from :func:`load`
+        filepath (str): path to python file
+        messages (:obj:`list` :obj:`engine.Message`): that file's messages
+
+    Returns:
+        :obj:`list` :obj:`engine.Message`: messages left to report
+
+    """
+    prints = fingerprints(
+        filepath,
+        messages,
+        known.root
+    )
+    seen = collections.Counter()
+    kept = []
+    for message, key in zip(messages, prints):
+        if key is not None and seen[key] < known.counts.get(key, 0):
+            seen[key] += 1
+            continue
+        kept.append(message)
+    return kept
@@ -0,0 +1,178 @@
+"""batch.py: lint in-memory source strings with one args checker
+
+Sources never touch disk and pylint never walks a tree: every source is parsed
+into an astroid tree and graded by the same :class:`ArgsIndentChecker`, on a
+bare ``PyLinter`` with only that checker registered
+
+"""
+from os import path
+import tokenize
+
+from astroid import MANAGER
+from astroid.builder import AstroidBuilder
+from astroid.exceptions import AstroidSyntaxError
+from astroid import nodes
+
+from pylint_prosper import engine
+from pylint_prosper import layout
+from pylint_prosper.args_checker import ArgsIndentChecker
+
+ASTROID_ERROR = ('F0002', 'astroid-error')  # pylint's id for trees astroid can't build
+
+def build_checker(config=engine.DEFAULT_CONFIG):
+    """one configured args checker on a bare linter with a collecting reporter
+
+    Args:
+        config (:obj:`engine.LintConfig`, optional): checker options
+
+    Returns:
+        :obj:`ArgsIndentChecker`: checker, ``checker.linter.reporter`` collects its messages
+
+    """
+    from pylint import lint
+    from pylint import reporters
+
+    from pylint_prosper import runner
+
+    linter = lint.PyLinter()
+    linter.set_reporter(reporters.CollectingReporter())
+    checker = ArgsIndentChecker(linter)
+    linter.register_checker(checker)
+    runner.set_option(
+        linter,
+        'kevlin-func-args',
+        'y' if config.kevlin_func_args else 'n'
+    )
+    runner.set_option(
+        linter,
+        'single-line-args-limit',
+        str(config.single_line_args_limit)
+    )
+    linter.open()  # pylint < 2 starts its stats here
+    checker.open()
+    return checker
+
+def parse_source(source, modname):
+    """astroid tree for ``source``, kept out of astroid's module cache
+
+    Notes:
+        building caches the module under ``modname``, it's dropped again so a
+        source can't shadow a real module for the rest of the process.  The
+        brain transforms are skipped, the args rules only need node line numbers.
+
+    Raises:
+        AstroidSyntaxError: unparsable source
+
+    """
+    builder = AstroidBuilder(MANAGER, apply_transforms=False)
+    tree = builder.string_build(source, modname)
+    if MANAGER.astroid_cache.get(modname) is tree:
+        del MANAGER.astroid_cache[modname]
+    return tree
+
+def module_tokens(source):
+    """token list for ``source``, None where only astroid can read it
+
+    Returns:
+        :obj:`list`: ``tokenize`` tokens, or None
+
+    """
+    try:
+        return list(layout.tokenize_source(source))
+    except (tokenize.TokenError, SyntaxError):
+        return None  # the checker falls back to astroid node lines
+
+def check_module(
+        checker,
+        module,
+        filepath,
+        tokens=None
+):
+    """grade every def and call in an astroid module
+
+    Args:
+        checker (:obj:`ArgsIndentChecker`): from :func:`build_checker`
+        module (:obj:`astroid.Module`): parsed source
+        filepath (str): reported as the messages' path
+        tokens (:obj:`list`, optional): the module's tokens, like pylint hands
+            them over, for the checker's :class:`layout.ParenIndex`
+
+    Returns:
+        :obj:`list` :obj:`engine.Message`: messages sorted by line
+
+    """
+    linter = checker.linter
+    linter.reporter.messages = []
+    linter.set_current_module(module.name, filepath)
+    if tokens is not None:
+        checker.process_tokens(tokens)
+    checker.visit_module(module)
+    for node in module.nodes_of_class((nodes.FunctionDef, nodes.Call)):
+        if isinstance(node, nodes.FunctionDef):
+            checker.visit_functiondef(node)
+        else:
+            checker.visit_call(node)
+
+    messages = [
+        engine.Message(
+            msg.path,
+            msg.module,
+            msg.msg_id,
+            msg.symbol,
+            msg.line,
+            0,
+            msg.msg
+        ) for msg in linter.reporter.messages
+    ]
+    messages.sort(key=lambda message: message.line)
+    return messages
+
+def lint_sources(sources, config=engine.DEFAULT_CONFIG):
+    """lint many source strings with one checker
+
+    Args:
+        sources (iterable): (name, source) pairs, ``name`` is reported as the path
+        config (:obj:`engine.LintConfig`, optional): checker options
+
+    Yields:
+        tuple: (name, :obj:`list` :obj:`engine.Message`) per source, in input order
+
+    """
+    checker = build_checker(config)
+    for name, source in sources:
+        module = path.splitext(path.basename(name))[0]
+        if not layout.may_have_findings(source, config.single_line_args_limit):
+            yield name, []
+            continue
+        try:
+            tree = parse_source(source, module)
+        except AstroidSyntaxError as err:
+            lineno = err.error.lineno if isinstance(err.error, SyntaxError) else None
+            yield name, [engine.Message(
+                name,
+                module,
+                engine.SYNTAX_ERROR[0],
+                engine.SYNTAX_ERROR[1],
+                lineno or 1,
+                0,
+                str(err.error.args[0])
+            )]
+            continue
+        except Exception as err:  # e.g. RecursionError, one bad source shouldn't end the batch
+            yield name, [engine.Message(
+                name,
+                module,
+                ASTROID_ERROR[0],
+                ASTROID_ERROR[1],
+                1,
+                0,
+                '{}: {}'.format(type(err).__name__, err)
+            )]
+            continue
+
+        yield name, check_module(
+            checker,
+            tree,
+            name,
+            module_tokens(source)
+        )
@@ -0,0 +1,195 @@
+"""cache.py: on-disk lint results keyed by file content"""
+import hashlib
+import json
+import os
+from os import path
+import re
+import tempfile
+
+from pylint_prosper import engine
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PROSPER_LINT_CACHE',
+    path.join(path.expanduser('~/.cache'), 'prosper_lint')
+)
+DEFAULT_MAX_ENTRIES = 20000
+ENTRY_DIR = re.compile(r'^[0-9a-f]{2}$')
+ENTRY_FILE = re.compile(r'^[0-9a-f]{40}\.json$')  # sha1 keys, anything else isn't ours
+
+class ResultCache(object):
+    """content-hash cache of per-file lint messages
+
+    Notes:
+        entries live in ``<cache_dir>/<key[:2]>/<key>.json``.
+        Every hit touches the entry so :meth:`prune` evicts least-recently-used first.
+        :meth:`prune` and :meth:`clear` only ever remove files of that shape,
+        ``cache_dir`` may well be shared with something else.
+        An entry can list the files its messages depend on, pylint results
+        through imports, and is a miss once any of them changes.
+
+    Args:
+        fingerprint (str): run settings that invalidate every entry (version, options, rc)
+        cache_dir (str, optional): where to keep entries
+        max_entries (int, optional): entries kept after :meth:`prune`
+
+    """
+    def __init__(
+            self,
+            fingerprint,
+            cache_dir=DEFAULT_CACHE_DIR,
+            max_entries=DEFAULT_MAX_ENTRIES
+    ):
+        self.fingerprint = fingerprint.encode('utf-8')
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def key(self, filepath):
+        """hash a file's content along with the run fingerprint
+
+        Args:
+            filepath (str): path to python file
+
+        Returns:
+            str: hex digest, or None if the file can't be read
+
+        """
+        digest = hashlib.sha1(self.fingerprint)
+        digest.update(b'\0' + filepath.encode('utf-8') + b'\0')
+        try:
+            with open(filepath, 'rb') as source_fh:
+                digest.update(source_fh.read())
+        except OSError:
+            return None  # let the linter report on it
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        """where ``key`` lives on disk"""
+        return path.join(
+            self.cache_dir,
+            key[:2],
+            key + '.json'
+        )
+
+    def get(self, key):
+        """replay cached messages
+
+        Args:
+            key (str): from :meth:`key`
+
+        Returns:
+            :obj:`list` :obj:`engine.Message`: cached messages, or None on a miss
+                or when a file the entry depends on changed
+
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r') as entry_fh:
+                entry = json.load(entry_fh)
+            for dep_path, mtime_ns, size in entry['dependencies']:
+                stat = os.stat(dep_path)
+                if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                    return None
+            os.utime(entry_path, None)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return [engine.Message(*row) for row in entry['messages']]
+
+    def put(
+            self,
+            key,
+            messages,
+            dependencies=()
+    ):
+        """store messages for a file
+
+        Args:
+            key (str): from :meth:`key`
+            messages (:obj:`list` :obj:`engine.Message`): lint results to save
+            dependencies (iterable, optional): other files the messages depend on,
+                their current size and mtime are recorded with the entry
+
+        """
+        entry_path = self._entry_path(key)
+        entry_dir = path.dirname(entry_path)
+        try:
+            entry = {
+                'messages': [list(message) for message in messages],
+                'dependencies': [
+                    [dep_path, stat.st_mtime_ns, stat.st_size]
+                    for dep_path, stat in ((dep, os.stat(dep)) for dep in dependencies)
+                ],
+            }
+            os.makedirs(entry_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as entry_fh:
+                json.dump(entry, entry_fh)
+            os.replace(tmp_path, entry_path)  # atomic, safe with concurrent runs
+        except OSError:
+            pass  # a cache that can't be written is just a slower run
+
+    def _entries(self):
+        """``<key[:2]>/<key>.json`` files under ``cache_dir``
+
+        Yields:
+            :obj:`os.DirEntry`: one per cache entry
+
+        """
+        try:
+            top = list(os.scandir(self.cache_dir))
+        except OSError:
+            return
+        for sub in top:
+            if not ENTRY_DIR.match(sub.name) or not sub.is_dir(follow_symlinks=False):
+                continue
+            try:
+                with os.scandir(sub.path) as entries:
+                    for entry in entries:
+                        if (
+                                ENTRY_FILE.match(entry.name)
+                                and entry.name.startswith(sub.name)
+                                and entry.is_file(follow_symlinks=False)
+                        ):
+                            yield entry
+            except OSError:
+                continue
+
+    def prune(self):
+        """evict least-recently-used entries past ``max_entries``
+
+        Returns:
+            int: number of entries removed
+
+        """
+        entries = []
+        for entry in self._entries():
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+
+        if len(entries) <= self.max_entries:
+            return 0
+
+        entries.sort()
+        stale = entries[:len(entries) - self.max_entries]
+        for _, entry_path in stale:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+        return len(stale)
+
+    def clear(self):
+        """drop every cached entry, then the ``<key[:2]>`` directories left empty"""
+        entry_dirs = set()
+        for entry in self._entries():
+            entry_dirs.add(path.dirname(entry.path))
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        for entry_dir in entry_dirs:
+            try:
+                os.rmdir(entry_dir)
+            except OSError:
+                pass  # something else lives there, leave it
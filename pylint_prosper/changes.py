@@ -0,0 +1,102 @@
+"""changes.py: find changed files and lines from ``git diff``"""
+import re
+from os import path
+
+from plumbum import local
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+WHOLE_FILE = [(1, float('inf'))]
+
+def merge_ranges(line_ranges):
+    """sort and merge touching (first, last) line pairs
+
+    Args:
+        line_ranges (:obj:`list` tuple): (first, last) line pairs
+
+    Returns:
+        :obj:`list` tuple: sorted, non-overlapping line pairs
+
+    """
+    merged = []
+    for first, last in sorted(line_ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+def parse_diff(diff_text):
+    """collect added/changed line ranges from ``git diff --unified=0``
+
+    Notes:
+        pure deletions mark the line they happened after, so a def/call that lost
+        an arg still counts as changed
+
+    Args:
+        diff_text (str): unified diff with zero context lines
+
+    Returns:
+        dict: repo-relative path -> list of (first, last) line pairs
+
+    """
+    changed = {}
+    current = None
+    for line in diff_text.splitlines():
+        if line.startswith('+++ '):
+            target = line[4:].strip()
+            current = None if target == '/dev/null' else target[2:]  # strip ``b/``
+            if current is not None:
+                changed.setdefault(current, [])
+            continue
+        match = HUNK_HEADER.match(line)
+        if match and current is not None:
+            first = int(match.group(1))
+            count = 1 if match.group(2) is None else int(match.group(2))
+            first = max(first, 1)
+            changed[current].append((first, first + max(count, 1) - 1))
+
+    return {filepath: merge_ranges(ranges) for filepath, ranges in changed.items()}
+
+def changed_since(ref, cwd='.'):
+    """changed python files and lines between ``ref`` and the working tree
+
+    Notes:
+        untracked files count as entirely new
+
+    Args:
+        ref (str): any git revision, ``HEAD``, ``origin/master``...
+        cwd (str, optional): somewhere inside the git checkout
+
+    Returns:
+        dict: absolute path -> list of (first, last) line pairs
+
+    """
+    git = local['git']
+    with local.cwd(cwd):
+        root = git('rev-parse', '--show-toplevel').strip()
+        diff_text = git(
+            'diff',
+            '--unified=0',
+            '--no-color',
+            '--no-ext-diff',
+            ref,
+            '--',
+            '*.py'
+        )
+        untracked = git(
+            'ls-files',
+            '--others',
+            '--exclude-standard',
+            '--full-name',  # repo-relative like the diff, not cwd-relative
+            '--',
+            '*.py'
+        ).splitlines()
+
+    changed = parse_diff(diff_text)
+    for filepath in untracked:
+        changed[filepath] = WHOLE_FILE
+
+    return {
+        path.normpath(path.join(root, filepath)): ranges
+        for filepath, ranges in changed.items()
+    }
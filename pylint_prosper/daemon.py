@@ -0,0 +1,165 @@
+"""daemon.py: long-running lint server with warm pylint/astroid caches
+
+Protocol is newline-delimited JSON over a unix socket: one request line in,
+one line per linted file back, then ``{"done": true}``
+
+"""
+import json
+import os
+from os import path
+import socket
+import socketserver
+import tempfile
+
+from pylint_prosper import engine
+from pylint_prosper import runner
+from pylint_prosper import settings
+
+DEFAULT_SOCKET = path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(),
+    'prosper_lint-{}.sock'.format(os.getuid())
+)
+
+def forget_module(filepath):
+    """drop a file's module from astroid's cache so edits are picked up
+
+    Notes:
+        everything it imports stays cached, that's the point of the daemon
+
+    Args:
+        filepath (str): path to python file about to be linted
+
+    """
+    from astroid import MANAGER
+    MANAGER.astroid_cache.pop(engine.module_name(filepath), None)
+
+class LintRequestHandler(socketserver.StreamRequestHandler):
+    """lints the files in one request with the server's warm linters"""
+
+    def _send(self, payload):
+        """write one JSON line back to the client"""
+        self.wfile.write(json.dumps(payload).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode('utf-8'))
+        if request.get('command') == 'shutdown':
+            self.server.shutdown_requested = True
+            self._send({'done': True})
+            return
+
+        config = engine.LintConfig(*request['config'])
+        prosper_config = settings.load_config()  # reparsed only if a file changed
+        for filepath in request['paths']:
+            if not request['fast']:
+                forget_module(filepath)
+            try:
+                messages = runner.lint_path(
+                    filepath,
+                    fast=request['fast'],
+                    config=config,
+                    prosper_config=prosper_config
+                )
+            except Exception as err:  # one bad file shouldn't kill the daemon
+                self._send({'path': filepath, 'error': '{}: {}'.format(type(err).__name__, err)})
+                continue
+            self._send({'path': filepath, 'messages': [list(message) for message in messages]})
+        self._send({'done': True})
+
+class LintServer(socketserver.UnixStreamServer):
+    """serial unix socket server, pylint isn't thread safe"""
+    shutdown_requested = False
+
+def make_server(socket_path=DEFAULT_SOCKET):
+    """bind the daemon socket, clearing out a stale one
+
+    Args:
+        socket_path (str, optional): unix socket to listen on
+
+    Returns:
+        :obj:`LintServer`: bound server
+
+    """
+    if path.exists(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX) as probe:
+                probe.connect(socket_path)
+        except OSError:
+            os.remove(socket_path)  # left behind by a dead daemon
+        else:
+            raise OSError('prosper_lint daemon already listening on ' + socket_path)
+    return LintServer(socket_path, LintRequestHandler)
+
+def serve(server):
+    """handle requests until a client asks for shutdown
+
+    Args:
+        server (:obj:`LintServer`): from :func:`make_server`
+
+    """
+    try:
+        while not server.shutdown_requested:
+            server.handle_request()
+    finally:
+        server.server_close()
+        if path.exists(server.server_address):
+            os.remove(server.server_address)
+
+def _request(socket_path, payload):
+    """send one request, yield the daemon's JSON replies
+
+    Raises:
+        OSError: daemon isn't running
+
+    """
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+        with client.makefile('rb') as replies:
+            for line in replies:
+                reply = json.loads(line.decode('utf-8'))
+                if reply.get('done'):
+                    return
+                yield reply
+
+def lint(
+        paths,
+        fast=False,
+        config=engine.DEFAULT_CONFIG,
+        socket_path=DEFAULT_SOCKET
+):
+    """lint files through a running daemon
+
+    Args:
+        paths (:obj:`list` :obj:`str`): files, directories or glob patterns
+        fast (bool, optional): use the stand-alone engine instead of pylint
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        socket_path (str, optional): daemon's unix socket
+
+    Yields:
+        tuple: (filepath, :obj:`list` :obj:`engine.Message`) per file
+
+    Raises:
+        OSError: daemon isn't running
+        RuntimeError: daemon failed on a file
+
+    """
+    payload = {
+        'paths': [path.abspath(filepath) for filepath in runner.expand_paths(paths)],
+        'fast': fast,
+        'config': list(config),
+    }
+    for reply in _request(socket_path, payload):
+        if 'error' in reply:
+            raise RuntimeError(reply['path'] + ': ' + reply['error'])
+        yield reply['path'], [engine.Message(*row) for row in reply['messages']]
+
+def shutdown(socket_path=DEFAULT_SOCKET):
+    """ask a running daemon to exit
+
+    Args:
+        socket_path (str, optional): daemon's unix socket
+
+    """
+    for _ in _request(socket_path, {'command': 'shutdown'}):
+        pass
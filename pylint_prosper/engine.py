@@ -0,0 +1,584 @@
+"""engine.py: stand-alone args linter that never starts pylint
+
+Reports E7700/E7701 with the same ids, options and text layout as the pylint plugin
+
+"""
+import bisect
+import codecs
+import collections
+import io
+import mmap
+import os
+from os import path
+import re
+import tokenize
+
+from pylint_prosper import layout
+
+LintConfig = collections.namedtuple(
+    'LintConfig',
+    [
+        'kevlin_func_args',
+        'single_line_args_limit',
+    ]
+)
+DEFAULT_CONFIG = LintConfig(
+    kevlin_func_args=True,
+    single_line_args_limit=2,
+)
+
+Message = collections.namedtuple(
+    'Message',
+    [
+        'path',
+        'module',
+        'msg_id',
+        'symbol',
+        'line',
+        'column',
+        'msg',
+    ]
+)
+
+SYMBOLS = {symbol: msg_id for msg_id, (_, symbol, _) in layout.MSGS.items()}
+SYNTAX_ERROR = ('E0001', 'syntax-error')
+FATAL = ('F0001', 'fatal')  # file couldn't be opened or read, pylint's id for it
+SKIPPED = ('F7702', 'lint-skipped')  # a worker limit was hit, see ``workers.WorkerLimits``
+CODING_COOKIE = re.compile(br'^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)', re.MULTILINE)
+UTF8_NAMES = (b'utf-8', b'utf8', b'utf-8-sig')  # after lower() and _ -> -
+HEAD_BYTES = 4096  # enough for the first two lines of any sane file
+MMAP_THRESHOLD = 1 << 20  # bigger files are mapped instead of copied into the read buffer
+STREAM_THRESHOLD = 8 << 20  # bigger files are tokenized line by line, see :func:`stream_file`
+
+_READ_BUFFER = bytearray(64 * 1024)  # reused across files, grows to the largest one read
+
+MSG_TYPES_STATUS = {
+    'I': 0,
+    'C': 16,
+    'R': 8,
+    'W': 4,
+    'E': 2,
+    'F': 1,
+}
+
+MODULE_HEADER = '************* Module {module}'
+MSG_TEMPLATE = '{category}:{line:3d},{column:2d}: {msg} ({symbol})'
+
+def module_name(filepath):
+    """dotted module name for a file, pylint style
+
+    Args:
+        filepath (str): path to python file
+
+    Returns:
+        str: ``package.module`` name, walking up through ``__init__.py`` dirs
+
+    """
+    dirname, basename = path.split(path.abspath(filepath))
+    parts = [path.splitext(basename)[0]]
+    if parts[0] == '__init__':
+        parts = []  # pylint names the package, not its __init__
+    while path.isfile(path.join(dirname, '__init__.py')):
+        dirname, package = path.split(dirname)
+        parts.insert(0, package)
+
+    return '.'.join(parts) or '__init__'
+
+def unreadable(filepath, err):
+    """:data:`FATAL` message for a file the OS wouldn't hand over
+
+    Args:
+        filepath (str): path that failed
+        err (:obj:`OSError`): what went wrong, dangling symlink, permissions...
+
+    Returns:
+        :obj:`Message`: reported on line 1, like pylint's F0001
+
+    """
+    return Message(
+        filepath,
+        module_name(filepath),
+        FATAL[0],
+        FATAL[1],
+        1,
+        0,
+        'Unable to read file: {}'.format(err.strerror or err)
+    )
+
+def overlaps(
+        line_ranges,
+        start,
+        end
+):
+    """check if ``start``..``end`` touches any of ``line_ranges``
+
+    Args:
+        line_ranges (:obj:`list` tuple): sorted, non-overlapping (first, last) line pairs
+        start (int): first line of the construct
+        end (int): last line of the construct
+
+    Returns:
+        bool: construct overlaps a range
+
+    """
+    index = bisect.bisect_right(line_ranges, (end, float('inf')))
+    return index > 0 and line_ranges[index - 1][1] >= start
+
+def in_line_ranges(
+        filepath,
+        messages,
+        line_ranges
+):
+    """keep the messages that touch ``line_ranges``, by the rule :func:`check_tokens` uses
+
+    Notes:
+        args messages count from their def/call line through its closing paren,
+        so a def whose only changed line is an arg is still reported.  Other
+        messages count on their own line, F-messages are always kept.
+
+    Args:
+        filepath (str): path to python file the messages are for
+        messages (:obj:`list` :obj:`Message`): that file's messages, from any linter
+        line_ranges (:obj:`list` tuple): sorted, non-overlapping (first, last) line pairs
+
+    Returns:
+        :obj:`list` :obj:`Message`: messages left to report
+
+    """
+    spans = {}  # def/call line -> last line of the longest construct reported there
+    if any(message.msg_id in layout.MSGS for message in messages):
+        try:
+            for arg_layout in layout.scan_tokens(layout.tokenize_source(read_source(filepath))):
+                spans[arg_layout.lineno] = max(
+                    spans.get(arg_layout.lineno, 0),
+                    arg_layout.end_lineno
+                )
+        except (OSError, SyntaxError, tokenize.TokenError):
+            pass  # whatever was scanned, the rest count on their own line
+    return [
+        message for message in messages
+        if message.msg_id[0] == 'F' or overlaps(
+            line_ranges,
+            message.line,
+            spans.get(message.line, message.line) if message.msg_id in layout.MSGS
+            else message.line
+        )
+    ]
+
+def check_tokens(
+        tokens,
+        config=DEFAULT_CONFIG,
+        line_ranges=None,
+        timings=None
+):
+    """grade every def/call in a token stream
+
+    Args:
+        tokens (iterable): ``tokenize`` token stream
+        config (:obj:`LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only grade defs/calls overlapping these lines
+        timings (:obj:`profiling.Timings`, optional): count defs/calls examined
+
+    Yields:
+        tuple: (msg_id, symbol, line, msg) for every offending def/call
+
+    """
+    limit = config.single_line_args_limit
+    for arg_layout in layout.scan_tokens(tokens):
+        if line_ranges is not None and not overlaps(
+                line_ranges,
+                arg_layout.lineno,
+                arg_layout.end_lineno
+        ):
+            continue
+        if timings is not None:
+            timings.count('functions_examined' if arg_layout.is_def else 'calls_examined')
+        symbol = layout.grade_layout(
+            arg_layout,
+            limit,
+            kevlin_func_args=config.kevlin_func_args,
+            oneline_limit_adjust=1 if arg_layout.is_method else 0
+        )
+        if not symbol:
+            continue
+        msg_id = SYMBOLS[symbol]
+        msg = layout.MSGS[msg_id][0]
+        if symbol == 'invalid-oneline-function-format':
+            msg = msg % limit
+        yield msg_id, symbol, arg_layout.lineno, msg
+
+def iter_messages(
+        tokens,
+        filepath='<string>',
+        module='<string>',
+        config=DEFAULT_CONFIG,
+        line_ranges=None,
+        timings=None
+):
+    """lint a token stream into :class:`Message` records as each def/call closes
+
+    Notes:
+        nothing is kept between records, memory only grows with bracket nesting
+
+    Args:
+        tokens (iterable): ``tokenize`` token stream
+        filepath (str, optional): path to report on messages
+        module (str, optional): module name to report on messages
+        config (:obj:`LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only grade defs/calls overlapping these lines
+        timings (:obj:`profiling.Timings`, optional): count defs/calls examined
+
+    Yields:
+        :obj:`Message`: in the order constructs close, a syntax error ends the stream
+
+    """
+    try:
+        for msg_id, symbol, line, msg in check_tokens(
+                tokens,
+                config,
+                line_ranges,
+                timings
+        ):
+            yield Message(
+                filepath,
+                module,
+                msg_id,
+                symbol,
+                line,
+                0,
+                msg
+            )
+    except (tokenize.TokenError, SyntaxError) as err:
+        lineno = err.lineno if isinstance(err, SyntaxError) else err.args[1][0]
+        yield Message(
+            filepath,
+            module,
+            SYNTAX_ERROR[0],
+            SYNTAX_ERROR[1],
+            lineno,
+            0,
+            str(err.args[0])
+        )
+
+def lint_tokens(
+        tokens,
+        filepath='<string>',
+        module='<string>',
+        config=DEFAULT_CONFIG,
+        line_ranges=None,
+        timings=None
+):
+    """lint a token stream into :class:`Message` records
+
+    Args:
+        tokens (iterable): ``tokenize`` token stream
+        filepath (str, optional): path to report on messages
+        module (str, optional): module name to report on messages
+        config (:obj:`LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only grade defs/calls overlapping these lines
+        timings (:obj:`profiling.Timings`, optional): count defs/calls examined
+
+    Returns:
+        :obj:`list` :obj:`Message`: messages sorted by line
+
+    """
+    messages = list(iter_messages(
+        tokens,
+        filepath,
+        module,
+        config,
+        line_ranges,
+        timings
+    ))
+    messages.sort(key=lambda message: message.line)
+    return messages
+
+def lint_source(
+        source,
+        filepath='<string>',
+        config=DEFAULT_CONFIG
+):
+    """lint a source string
+
+    Args:
+        source (str): python source code
+        filepath (str, optional): name to report on messages
+        config (:obj:`LintConfig`, optional): checker options
+
+    Returns:
+        :obj:`list` :obj:`Message`: messages sorted by line
+
+    """
+    if not layout.may_have_findings(source, config.single_line_args_limit):
+        return []
+    return lint_tokens(
+        layout.tokenize_source(source),
+        filepath=filepath,
+        module=path.splitext(path.basename(filepath))[0],
+        config=config
+    )
+
+def decode_source(data):
+    """decode python source bytes, running PEP 263 detection only when needed
+
+    Notes:
+        plain ASCII/UTF-8 files, the common case, are decoded in one C call.
+        Only a non-UTF-8 coding cookie or undecodable bytes fall back to ``tokenize``.
+
+    Args:
+        data (:obj:`memoryview`): raw file contents
+
+    Returns:
+        str: source text
+
+    Raises:
+        SyntaxError: unknown encoding or bytes that don't match it
+
+    """
+    head = bytes(data[:HEAD_BYTES])
+    start = 3 if head.startswith(codecs.BOM_UTF8) else 0
+    head_end = head.find(b'\n', head.find(b'\n', start) + 1)  # cookie lives on lines 1-2
+    if head_end < 0 and len(data) > HEAD_BYTES:
+        cookie = True  # giant first lines, let tokenize sort it out
+    else:
+        cookie = CODING_COOKIE.search(head[start:head_end if head_end >= 0 else len(head)])
+    if cookie is None or (
+            cookie is not True and cookie.group(1).lower().replace(b'_', b'-') in UTF8_NAMES
+    ):
+        try:
+            return codecs.utf_8_decode(
+                data[start:],
+                'strict',
+                True  # final, no partial sequence left over
+            )[0]
+        except UnicodeDecodeError:
+            pass  # let tokenize produce the usual SyntaxError
+
+    raw = data.tobytes()
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+    try:
+        return raw[start:].decode(encoding)
+    except UnicodeDecodeError as err:
+        raise SyntaxError('invalid {} source: {}'.format(encoding, err))
+
+def read_source(filepath):
+    """read a python file with one ``readinto`` (or ``mmap`` when large) and decode it
+
+    Args:
+        filepath (str): path to python file
+
+    Returns:
+        str: source text, newlines not yet normalized
+
+    Raises:
+        SyntaxError: undecodable source
+
+    """
+    global _READ_BUFFER
+    with open(
+        filepath,
+        'rb',
+        buffering=0  # one syscall per readinto
+    ) as source_fh:
+        size = os.fstat(source_fh.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(
+                source_fh.fileno(),
+                0,
+                access=mmap.ACCESS_READ
+            ) as mapped:
+                with memoryview(mapped) as view:
+                    return decode_source(view)
+
+        if len(_READ_BUFFER) <= size:
+            _READ_BUFFER = bytearray(size + 1)
+        with memoryview(_READ_BUFFER)[:size + 1] as view:
+            read = 0
+            while read <= size:
+                chunk = source_fh.readinto(view[read:])
+                if not chunk:
+                    break
+                read += chunk
+            if read <= size:
+                return decode_source(view[:read])
+            grown = view.tobytes() + source_fh.read()  # appended to since fstat
+    with memoryview(grown) as view:
+        return decode_source(view)
+
+def stream_file(
+        filepath,
+        config=DEFAULT_CONFIG,
+        line_ranges=None,
+        timings=None
+):
+    """lint a file of any size in flat memory
+
+    Notes:
+        the file is decoded and tokenized one line at a time, only the open
+        brackets are tracked and every message is yielded as its def/call
+        closes.  There's no text prefilter, it would need the whole source.
+
+    Args:
+        filepath (str): path to python file
+        config (:obj:`LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only grade defs/calls overlapping these lines
+        timings (:obj:`profiling.Timings`, optional): count defs/calls examined
+
+    Yields:
+        :obj:`Message`: in the order constructs close, a syntax error ends the stream
+
+    """
+    module = module_name(filepath)
+    try:
+        source_fh = tokenize.open(filepath)  # PEP 263 detection, universal newlines
+    except OSError as err:
+        yield unreadable(filepath, err)
+        return
+    except SyntaxError as err:
+        yield Message(
+            filepath,
+            module,
+            SYNTAX_ERROR[0],
+            SYNTAX_ERROR[1],
+            err.lineno or 1,
+            0,
+            str(err.args[0])
+        )
+        return
+
+    lines_read = [0]
+
+    def readline():
+        """next source line, counted for decode errors"""
+        lines_read[0] += 1
+        return source_fh.readline()
+
+    with source_fh:
+        try:
+            for message in iter_messages(
+                    tokenize.generate_tokens(readline),
+                    filepath,
+                    module,
+                    config,
+                    line_ranges,
+                    timings
+            ):
+                yield message
+        except UnicodeDecodeError as err:
+            yield Message(
+                filepath,
+                module,
+                SYNTAX_ERROR[0],
+                SYNTAX_ERROR[1],
+                lines_read[0],
+                0,
+                'invalid {} source: {}'.format(source_fh.encoding, err)
+            )
+
+def lint_file(
+        filepath,
+        config=DEFAULT_CONFIG,
+        line_ranges=None,
+        timings=None,
+        stream_threshold=STREAM_THRESHOLD
+):
+    """lint a file on disk
+
+    Notes:
+        a streamed file's source is never held whole, but its messages are
+        still collected and sorted here, so memory grows with the message
+        count.  Iterate :func:`stream_file` to stay flat.
+
+    Args:
+        filepath (str): path to python file
+        config (:obj:`LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only grade defs/calls overlapping these lines
+        timings (:obj:`profiling.Timings`, optional): count defs/calls examined
+        stream_threshold (int, optional): bytes from which the file goes through
+            :func:`stream_file` instead of being read whole, None to never stream
+
+    Returns:
+        :obj:`list` :obj:`Message`: messages sorted by line, a single
+            :data:`FATAL` one when the file can't be read
+
+    """
+    try:
+        size = os.stat(filepath).st_size
+    except OSError as err:
+        return [unreadable(filepath, err)]
+    if stream_threshold is not None and size >= stream_threshold:
+        if timings is not None:
+            timings.count('streamed')
+        messages = list(stream_file(
+            filepath,
+            config,
+            line_ranges,
+            timings
+        ))
+        messages.sort(key=lambda message: message.line)
+        return messages
+
+    try:
+        source = read_source(filepath)
+    except OSError as err:
+        return [unreadable(filepath, err)]
+    except SyntaxError as err:
+        return [Message(
+            filepath,
+            module_name(filepath),
+            SYNTAX_ERROR[0],
+            SYNTAX_ERROR[1],
+            err.lineno or 1,
+            0,
+            str(err.args[0])
+        )]
+    if not layout.may_have_findings(source, config.single_line_args_limit):
+        if timings is not None:
+            timings.count('prefilter_skipped')
+        return []
+    return lint_tokens(
+        tokenize.generate_tokens(io.StringIO(source, newline=None).readline),
+        filepath=filepath,
+        module=module_name(filepath),
+        config=config,
+        line_ranges=line_ranges,
+        timings=timings
+    )
+
+def format_messages(messages):
+    """render messages in pylint's default text layout
+
+    Args:
+        messages (:obj:`list` :obj:`Message`): messages for one or more files
+
+    Yields:
+        str: ``*** Module`` headers and one line per message
+
+    """
+    current_module = None
+    for message in messages:
+        if message.module != current_module:
+            current_module = message.module
+            yield MODULE_HEADER.format(module=message.module)
+        yield MSG_TEMPLATE.format(
+            category=message.msg_id[0],
+            line=message.line,
+            column=message.column,
+            msg=message.msg,
+            symbol=message.symbol
+        )
+
+def exit_status(messages):
+    """pylint-compatible exit status bitmask for messages
+
+    Args:
+        messages (:obj:`list` :obj:`Message`): all messages for the run
+
+    Returns:
+        int: OR of every reported message category, same as pylint's ``msg_status``
+
+    """
+    status = 0
+    for message in messages:
+        status |= MSG_TYPES_STATUS.get(message.msg_id[0], 0)
+    return status
@@ -0,0 +1,466 @@
+"""fixer.py: rewrite offending arg layouts into one arg per line
+
+One ``tokenize`` pass per file collects every def/call with its args and
+comments.  Fixes are rendered from that tree, nested offenders included, and
+spliced back with one join: O(file) however many layouts a file needs fixed
+
+"""
+import ast
+import bisect
+import collections
+import io
+import os
+from os import path
+import shutil
+import tempfile
+import tokenize
+
+from pylint_prosper import engine
+from pylint_prosper import layout
+
+INDENT = '    '
+DEF_INDENT = INDENT * 2  # def args sit a level deeper than the body, like the checker docstring
+
+FixResult = collections.namedtuple(
+    'FixResult',
+    [
+        'path',
+        'fixed',  # layouts rewritten
+        'error',  # why the file was left alone, or None
+    ]
+)
+
+_Context = collections.namedtuple(
+    '_Context',
+    [
+        'first_row',     # row the rendered text starts on
+        'first_indent',  # that row's indentation in the output
+        'shift',         # columns every later row moves by
+    ]
+)
+_TOP = _Context(
+    first_row=0,
+    first_indent='',
+    shift=0,
+)
+
+class _Item(object):
+    """one comma-separated arg: where it sits and the comments after it"""
+    __slots__ = (
+        'start',
+        'end',
+        'row',
+        'is_marker',
+        'comments',
+    )
+
+    def __init__(
+            self,
+            start,
+            end,
+            row,
+            is_marker
+    ):
+        self.start = start
+        self.end = end
+        self.row = row
+        self.is_marker = is_marker
+        self.comments = []  # (offset, text)
+
+class _Frame(object):
+    """def/call being collected, hung off its :obj:`layout.Bracket`"""
+    __slots__ = (
+        'lineno',
+        'kind',
+        'open',
+        'close_end',
+        'items',
+        'item_comments',
+        'open_comments',
+        'children',
+        'offending',
+        'needs_fix',
+    )
+
+    def __init__(
+            self,
+            lineno,
+            kind,
+            open_offset
+    ):
+        self.lineno = lineno
+        self.kind = kind
+        self.open = open_offset
+        self.close_end = open_offset
+        self.items = []
+        self.item_comments = []  # comments inside the arg being read
+        self.open_comments = []
+        self.children = []  # def/call frames nested in the args, in source order
+        self.offending = False
+        self.needs_fix = False
+
+    def add_item(self, item):
+        """close out an arg, it takes the comments seen inside it"""
+        item.comments = self.item_comments
+        self.item_comments = []
+        self.items.append(item)
+
+    def add_comment(
+            self,
+            offset,
+            text,
+            in_item
+    ):
+        """attach a comment to the arg it's in or trails, or to the open paren"""
+        if in_item:
+            self.item_comments.append((offset, text))
+        elif self.items:
+            self.items[-1].comments.append((offset, text))
+        else:
+            self.open_comments.append((offset, text))
+
+class _Source(object):
+    """normalized source text plus the row bookkeeping the renderer needs"""
+    def __init__(self, text):
+        self.text = text
+        self.lines = text.splitlines(True)
+        self.starts = [0]
+        for line in self.lines:
+            self.starts.append(self.starts[-1] + len(line))
+        self.protected = set()  # rows that start inside a multi-line string
+
+    def offset(self, position):
+        """tokenize (row, col) -> index into ``text``"""
+        return self.starts[position[0] - 1] + position[1]
+
+    def row(self, offset):
+        """index into ``text`` -> 1-based row"""
+        return bisect.bisect_right(self.starts, offset)
+
+    def indent(self, row):
+        """leading whitespace of ``row`` as written"""
+        line = self.lines[row - 1]
+        return line[:len(line) - len(line.lstrip(' \t'))]
+
+def _shift_indent(indent, shift):
+    """move an indentation ``shift`` columns, only ever trimming spaces"""
+    if shift >= 0:
+        return indent + ' ' * shift
+    trimmed = indent.rstrip(' ')
+    return indent[:max(len(trimmed), len(indent) + shift)]
+
+def _collect(
+        source,
+        config,
+        line_ranges
+):
+    """one tokenize pass: def/call frames that need a rewrite, outermost first
+
+    Raises:
+        tokenize.TokenError, SyntaxError: source doesn't tokenize
+
+    """
+    roots = []
+    kind_frames = []  # open def/call frames, innermost last
+    fstring_start = getattr(
+        tokenize,
+        'FSTRING_START',
+        None
+    )
+    for event, token, bracket in layout.scan_brackets(layout.tokenize_source(source.text)):
+        tok_type, start, end = token[0], token[2], token[3]
+        if tok_type == tokenize.STRING or tok_type == fstring_start:
+            source.protected.update(range(start[0] + 1, end[0] + 1))
+        if bracket is None or not bracket.kind:
+            continue
+
+        frame = bracket.extra
+        if event == layout.OPENED:
+            frame = bracket.extra = _Frame(
+                bracket.lineno,
+                bracket.kind,
+                source.offset(start)
+            )
+            kind_frames.append(frame)
+        elif event == layout.ARG:
+            frame.add_item(_Item(
+                source.offset(bracket.item_start),
+                source.offset(bracket.item_end),
+                bracket.item_start[0],
+                bracket.item_is_marker
+            ))
+        elif event == layout.CLOSED:
+            kind_frames.pop()
+            frame.close_end = source.offset(end)
+            _close_frame(
+                frame,
+                bracket.arg_layout(end[0]),
+                config,
+                line_ranges
+            )
+            if kind_frames:
+                kind_frames[-1].children.append(frame)
+            elif frame.needs_fix:
+                roots.append(frame)
+        elif tok_type == tokenize.COMMENT:
+            frame.add_comment(
+                source.offset(start),
+                token[1],
+                bracket.item_start is not None
+            )
+    return roots
+
+def _close_frame(
+        frame,
+        arg_layout,
+        config,
+        line_ranges
+):
+    """grade a finished def/call, decide if it or anything inside needs a rewrite"""
+    if frame.items and any(
+            child.needs_fix and child.open < frame.items[-1].start for child in frame.children
+    ):  # a rewritten arg pushes the ones after it onto new lines
+        arg_layout = arg_layout._replace(last_arg_lineno=arg_layout.first_arg_lineno + 1)
+    if line_ranges is None or engine.overlaps(
+            line_ranges,
+            arg_layout.lineno,
+            arg_layout.end_lineno
+    ):
+        frame.offending = bool(layout.grade_layout(
+            arg_layout,
+            config.single_line_args_limit,
+            kevlin_func_args=config.kevlin_func_args,
+            oneline_limit_adjust=1 if arg_layout.is_method else 0
+        ))
+    frame.needs_fix = frame.offending or any(child.needs_fix for child in frame.children)
+    if not frame.needs_fix:
+        frame.children = []  # nothing to render inside, let them go
+
+def _shift_lines(
+        source,
+        start,
+        end,
+        context
+):
+    """``text[start:end]`` with every line after the first re-indented by ``context.shift``"""
+    text = source.text[start:end]
+    if not context.shift or '\n' not in text:
+        return text
+    lines = text.split('\n')
+    row = source.row(start)
+    for index in range(1, len(lines)):
+        row += 1
+        line = lines[index]
+        if row in source.protected or not line.strip():
+            continue
+        stripped = line.lstrip(' \t')
+        lines[index] = _shift_indent(line[:len(line) - len(stripped)], context.shift) + stripped
+    return '\n'.join(lines)
+
+def _render_span(
+        source,
+        start,
+        end,
+        children,
+        context
+):
+    """source between ``start`` and ``end`` with nested fixes rendered in"""
+    pieces = []
+    position = start
+    for child in children:
+        if not child.needs_fix or not start <= child.open < end:
+            continue
+        pieces.append(_shift_lines(
+            source,
+            position,
+            child.open,
+            context
+        ))
+        pieces.append(_render_frame(
+            source,
+            child,
+            context
+        ))
+        position = child.close_end
+    pieces.append(_shift_lines(
+        source,
+        position,
+        end,
+        context
+    ))
+    return ''.join(pieces)
+
+def _render_frame(
+        source,
+        frame,
+        context
+):
+    """``(...)`` of a def/call, one arg per line if it's offending"""
+    if not frame.offending:
+        return _render_span(
+            source,
+            frame.open,
+            frame.close_end,
+            frame.children,
+            context
+        )
+
+    if frame.lineno == context.first_row:
+        base = context.first_indent
+    elif frame.lineno > context.first_row:
+        base = _shift_indent(source.indent(frame.lineno), context.shift)
+    else:
+        base = source.indent(frame.lineno)
+    arg_indent = base + (DEF_INDENT if frame.kind == 'def' else INDENT)
+
+    pieces = ['(']
+    pieces.extend('  ' + comment for _, comment in frame.open_comments)
+    pieces.append('\n')
+    last = len(frame.items) - 1
+    for index, item in enumerate(frame.items):
+        column = item.start - source.starts[item.row - 1]
+        pieces.append(arg_indent)
+        pieces.append(_render_span(
+            source,
+            item.start,
+            item.end,
+            frame.children,
+            _Context(
+                item.row,
+                arg_indent,
+                len(arg_indent) - column
+            )
+        ))
+        if index < last:
+            pieces.append(',')
+        pieces.extend(
+            '  ' + comment for offset, comment in item.comments
+            if offset >= item.end  # comments inside the arg came along with it
+        )
+        pieces.append('\n')
+    pieces.append(base + ')')
+    return ''.join(pieces)
+
+def _count(frames):
+    """offending layouts in ``frames`` and everything nested in them"""
+    return sum(frame.offending + _count(frame.children) for frame in frames)
+
+def fix_source(
+        source,
+        config=engine.DEFAULT_CONFIG,
+        line_ranges=None
+):
+    """rewrite every offending def/call in ``source``
+
+    Args:
+        source (str): python source code, ``\\n`` newlines
+        config (:obj:`engine.LintConfig`, optional): checker options
+        line_ranges (:obj:`list` tuple, optional): only fix defs/calls overlapping these lines
+
+    Returns:
+        tuple: (new source, layouts fixed)
+
+    Raises:
+        tokenize.TokenError, SyntaxError: source doesn't tokenize
+        ValueError: the rewrite would change what the code means
+
+    """
+    if not layout.may_have_findings(source, config.single_line_args_limit):
+        return source, 0
+    parsed = _Source(source)
+    roots = _collect(
+        parsed,
+        config,
+        line_ranges
+    )
+    if not roots:
+        return source, 0
+
+    pieces = []
+    position = 0
+    for frame in roots:
+        pieces.append(source[position:frame.open])
+        pieces.append(_render_frame(
+            parsed,
+            frame,
+            _TOP
+        ))
+        position = frame.close_end
+    pieces.append(source[position:])
+    fixed = ''.join(pieces)
+
+    if ast.dump(ast.parse(fixed)) != ast.dump(ast.parse(source)):
+        raise ValueError('rewrite changed the syntax tree')
+    return fixed, _count(roots)
+
+def fix_file(
+        filepath,
+        line_ranges=None,
+        config=engine.DEFAULT_CONFIG
+):
+    """rewrite a file in place, keeping its encoding, BOM and newline style
+
+    Args:
+        filepath (str): path to python file
+        line_ranges (:obj:`list` tuple, optional): only fix defs/calls overlapping these lines
+        config (:obj:`engine.LintConfig`, optional): checker options
+
+    Returns:
+        :obj:`FixResult`: layouts fixed, or why the file was left alone
+
+    """
+    try:
+        with open(filepath, 'rb') as source_fh:
+            raw = source_fh.read()
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+        text = raw.decode(encoding)
+    except (OSError, SyntaxError, UnicodeDecodeError) as err:
+        return FixResult(
+            filepath,
+            0,
+            str(err)
+        )
+    newline = '\r\n' if '\r\n' in text else '\r' if '\r' in text else '\n'
+    try:
+        fixed, count = fix_source(
+            text.replace('\r\n', '\n').replace('\r', '\n'),
+            config,
+            line_ranges
+        )
+    except (tokenize.TokenError, SyntaxError, ValueError) as err:
+        return FixResult(
+            filepath,
+            0,
+            str(err.args[0])
+        )
+    if not count:
+        return FixResult(
+            filepath,
+            0,
+            None
+        )
+
+    dirname, basename = path.split(path.abspath(filepath))
+    handle, temp_path = tempfile.mkstemp(
+        suffix='.tmp',
+        prefix='.' + basename + '.',
+        dir=dirname
+    )
+    try:
+        with io.open(
+            handle,
+            'w',
+            encoding=encoding,
+            newline=newline
+        ) as fixed_fh:
+            fixed_fh.write(fixed)
+        shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return FixResult(
+        filepath,
+        count,
+        None
+    )
@@ -0,0 +1,583 @@
+"""layout.py: token-stream scanner for function/call argument layout
+
+Pure stdlib so the same rules can run inside pylint or without it
+
+"""
+from array import array
+import collections
+import keyword
+import tokenize
+
+MSGS = {
+    'E7700': (
+        'Argument alignment, move to new line',
+        'invalid-function-arg-format',
+        'Used when inconsistent tabstops are used in argument list'
+    ),
+    'E7701': (
+        'Too many args for one-line.  More than %s args',
+        'invalid-oneline-function-format',
+        'Used when one-liner function call is too complex'
+    ),
+    'E7703': (
+        'Closing paren, move to its own line at the def/call indent',
+        'invalid-closing-paren-format',
+        'Used when a multi-line argument list does not end with a dedented closing paren'
+    )
+}
+
+ArgLayout = collections.namedtuple(
+    'ArgLayout',
+    [
+        'lineno',
+        'is_def',
+        'is_method',
+        'arg_count',
+        'first_arg_lineno',
+        'last_arg_lineno',
+        'end_lineno',
+    ]
+)
+
+SKIP_TOKENS = (
+    tokenize.NL,
+    tokenize.COMMENT,
+    tokenize.NEWLINE,
+    tokenize.INDENT,
+    tokenize.DEDENT,
+    tokenize.ENCODING,
+)
+OPEN_BRACKETS = ('(', '[', '{')
+CLOSE_BRACKETS = (')', ']', '}')
+ARG_MARKERS = ('*', '/')  # bare ``*``/``/`` in a def are separators, not args
+
+# events from :func:`scan_brackets`
+OPENED = 'opened'    # ``token`` opened ``bracket``
+CLOSED = 'closed'    # ``token`` closed ``bracket``, it's off the stack
+ARG = 'arg'          # an item of the def/call ``bracket`` ends at ``token``, ``,`` or the close
+TOKEN = 'token'      # any other significant token, ``bracket`` is the innermost open one
+SKIPPED = 'skipped'  # a :data:`SKIP_TOKENS` token or the ENDMARKER
+
+class Bracket(object):
+    """open bracket tracked by :func:`scan_brackets`
+
+    Notes:
+        ``item_*`` describe the comma-separated item being read, valid on
+        :data:`ARG` events.  ``extra`` is free for the consumer's own
+        per-bracket state.  A call's ``lineno`` is where its callee
+        expression starts, like astroid's.
+
+    """
+    __slots__ = (
+        'lineno',
+        'kind',
+        'is_method',
+        'start',
+        'is_trailer',
+        'primary',
+        'calls',
+        'arg_count',
+        'first_arg_lineno',
+        'last_arg_lineno',
+        'item_start',
+        'item_end',
+        'item_is_marker',
+        'open_lambdas',
+        'in_generator',
+        'extra',
+    )
+
+    def __init__(
+            self,
+            lineno,
+            kind,
+            start,
+            is_method=False
+    ):
+        self.lineno = lineno  # row of the def name or callee start, else of the bracket
+        self.kind = kind
+        self.is_method = is_method
+        self.start = start
+        self.is_trailer = False  # call/subscript of the expression before it
+        self.primary = None      # (row, col) that expression starts at, when known
+        self.calls = 0           # calls already applied along that expression
+        self.arg_count = 0
+        self.first_arg_lineno = 0
+        self.last_arg_lineno = 0
+        self.item_start = None  # (row, col) of the item's first token
+        self.item_end = None    # (row, col) its last token ends at
+        self.item_is_marker = False
+        self.open_lambdas = 0  # commas in ``lambda a, b:`` don't split args
+        self.in_generator = False  # nor do commas in ``f(x for a, b in y)``
+        self.extra = None
+
+    def extend_item(self, token):
+        """add a token to the current comma-separated item"""
+        if self.item_start is None:
+            self.item_start = token[2]
+            self.item_is_marker = token[1] in ARG_MARKERS
+        elif self.item_is_marker:
+            self.item_is_marker = False  # ``*args`` is an arg
+        self.item_end = token[3]
+
+    def end_item(self):
+        """close out the current comma-separated item"""
+        if self.item_start is not None and not self.item_is_marker:
+            if not self.arg_count:
+                self.first_arg_lineno = self.item_start[0]
+            self.last_arg_lineno = self.item_start[0]
+            self.arg_count += 1
+        self.item_start = None
+        self.item_is_marker = False
+
+    def arg_layout(self, end_lineno):
+        """:obj:`ArgLayout` of a def/call closing on ``end_lineno``"""
+        return ArgLayout(
+            self.lineno,
+            self.kind == 'def',
+            self.is_method,
+            self.arg_count,
+            self.first_arg_lineno,
+            self.last_arg_lineno,
+            end_lineno,
+        )
+
+def opener_kind(prev, prev_prev):
+    """decide if a ``(`` opens a def, a call, or just a grouping
+
+    Args:
+        prev (tuple): (type, string) of token before ``(``
+        prev_prev (tuple): (type, string) of token before ``prev``
+
+    Returns:
+        str: 'def', 'call' or None
+
+    """
+    prev_type, prev_string = prev
+    if prev_type == tokenize.NAME:
+        if keyword.iskeyword(prev_string):
+            return None
+        if prev_prev[1] == 'def':
+            return 'def'
+        if prev_prev[1] == 'class':
+            return None  # base classes are not arguments
+        return 'call'
+    if prev_type == tokenize.OP and prev_string in (')', ']'):
+        return 'call'
+    return None
+
+def _scope(blocks):
+    """'class'/'def' the innermost enclosing scope was opened by, None at module level"""
+    for block in reversed(blocks):
+        if block is not None:
+            return block  # ``if``/``for``/``with`` blocks don't start a scope
+    return None
+
+def scan_brackets(tokens):
+    """walk a tokenize stream tracking open brackets and the args of defs/calls
+
+    Notes:
+        the one bracket/lambda/arg marker/class header state machine, every
+        pass that reads arg layouts out of tokens is built on it.  Every
+        token comes out once with its event, :data:`ARG` events come on top,
+        right before the ``,`` or closing paren that ends the arg.
+
+    Args:
+        tokens (iterable): ``tokenize`` 5-tuples or :obj:`tokenize.TokenInfo`
+
+    Yields:
+        tuple: (event, token, :obj:`Bracket` or None)
+
+    """
+    frames = []
+    blocks = []             # block keyword for every INDENT level
+    header_keyword = None   # 'class'/'def' if current logical line opens one
+    line_start = True
+    chain = None            # (row, col) where the current primary expression starts
+    calls = 0               # calls applied along ``chain`` so far
+    prev = (None, None)
+    prev_prev = (None, None)
+    prev_lineno = 0
+    for token in tokens:
+        tok_type, tok_string, start = token[0], token[1], token[2]
+        frame = frames[-1] if frames else None
+        if tok_type in SKIP_TOKENS or tok_type == tokenize.ENDMARKER:
+            if tok_type == tokenize.INDENT:
+                blocks.append(header_keyword)
+            elif tok_type == tokenize.DEDENT:
+                if blocks:
+                    blocks.pop()
+            elif tok_type == tokenize.NEWLINE:
+                line_start = True
+                prev = prev_prev = (None, None)  # ``(`` opening a statement isn't a call
+                chain = None
+            yield SKIPPED, token, frame
+            continue
+
+        if line_start:
+            line_start = False
+            header_keyword = None
+        if tok_string in ('class', 'def') and tok_type == tokenize.NAME:
+            header_keyword = tok_string
+
+        if tok_type == tokenize.OP and tok_string in CLOSE_BRACKETS and frame is not None:
+            if frame.kind and frame.item_start is not None:
+                yield ARG, token, frame
+            frame.end_item()
+            frames.pop()
+            if frames:
+                frames[-1].extend_item(token)
+            chain = frame.primary if frame.is_trailer else frame.start
+            calls = frame.calls + (frame.kind == 'call')
+            yield CLOSED, token, frame
+        elif tok_type == tokenize.OP and tok_string == ',' and frame is not None \
+                and not frame.open_lambdas and not frame.in_generator:
+            if frame.kind and frame.item_start is not None:
+                yield ARG, token, frame
+            frame.end_item()
+            chain = None
+            yield TOKEN, token, frame
+        else:
+            if frame is not None:
+                if frame.open_lambdas and tok_string == ':':
+                    frame.open_lambdas -= 1
+                elif tok_string == 'lambda':
+                    frame.open_lambdas += 1
+                elif tok_string == 'for' and tok_type == tokenize.NAME:
+                    frame.in_generator = True  # the rest is one generator arg
+                frame.extend_item(token)
+
+            if tok_type == tokenize.OP and tok_string in OPEN_BRACKETS:
+                is_trailer = prev[1] in (')', ']') or prev[0] == tokenize.STRING or (
+                    prev[0] == tokenize.NAME and not keyword.iskeyword(prev[1])
+                )
+                kind = None
+                lineno = start[0]
+                if tok_string == '(':
+                    kind = opener_kind(prev, prev_prev)
+                    if kind == 'call' and chain is not None:
+                        lineno = chain[0]
+                    elif kind:
+                        lineno = prev_lineno
+                frame = Bracket(
+                    lineno,
+                    kind,
+                    start,
+                    is_method=kind == 'def' and _scope(blocks) == 'class'
+                )
+                if is_trailer:
+                    frame.is_trailer = True
+                    frame.primary = chain
+                    frame.calls = calls
+                chain = None
+                frames.append(frame)
+                yield OPENED, token, frame
+            else:
+                if tok_type in (tokenize.NAME, tokenize.NUMBER, tokenize.STRING):
+                    if tok_type == tokenize.NAME and keyword.iskeyword(tok_string) \
+                            and tok_string not in ('True', 'False', 'None'):
+                        chain = None
+                    elif prev[1] != '.' and not (
+                            tok_type == tokenize.STRING and prev[0] == tokenize.STRING
+                    ):
+                        chain = start
+                        calls = 0
+                elif tok_string != '.':
+                    chain = None
+                yield TOKEN, token, frame
+
+        prev_prev = prev
+        prev = (tok_type, tok_string)
+        prev_lineno = start[0]
+
+def scan_tokens(tokens):
+    """stream :class:`ArgLayout` records out of a tokenize stream
+
+    Notes:
+        Every item between the parens is counted as an arg (positional,
+        keyword, ``*args`` and ``**kwargs``).  Records are yielded as soon as
+        the closing paren is seen, so memory only grows with bracket nesting.
+
+    Args:
+        tokens (iterable): ``tokenize`` 5-tuples or :obj:`tokenize.TokenInfo`
+
+    Yields:
+        ArgLayout: layout of every def/call in the stream
+
+    """
+    for event, token, bracket in scan_brackets(tokens):
+        if event == CLOSED and bracket.kind:
+            yield bracket.arg_layout(token[2][0])
+
+def may_have_findings(source, single_line_args_limit):
+    """cheap text prefilter: could ``source`` trip E7700/E7701 at all?
+
+    Notes:
+        conservative, only says no when every paren opens and closes on one
+        line with fewer than ``single_line_args_limit`` commas.  Lines where a
+        string or comment could hide a paren always count as maybe.
+        Unbalanced ``[]``/``{}``, triple quotes or a trailing ``\\`` also say
+        maybe, so tokenize still reports the syntax error.
+
+    Args:
+        source (str): python source code
+        single_line_args_limit (int): number of args allowed on a single line
+
+    Returns:
+        bool: False when scanning the tokens can't find anything
+
+    """
+    if '(' not in source and ')' not in source:
+        return not _balanced(source)
+    for line in source.splitlines():
+        opens = line.count('(')
+        if not opens and ')' not in line:
+            continue
+        if opens != line.count(')') or '#' in line or '"' in line or "'" in line:
+            return True
+        if line.count(',') >= single_line_args_limit:
+            return True
+    return not _balanced(source)
+
+def _balanced(source):
+    """whole-file bracket and triple-quote counts line up, no dangling ``\\``"""
+    return (
+        not source.rstrip().endswith('\\')
+        and source.count('[') == source.count(']')
+        and source.count('{') == source.count('}')
+        and not source.count('"""') % 2
+        and not source.count("'''") % 2
+    )
+
+def tokenize_source(source):
+    """tokenize a text blob
+
+    Args:
+        source (str): python source code
+
+    Returns:
+        generator: ``tokenize`` token stream
+
+    """
+    return tokenize.generate_tokens(iter(source.splitlines(True)).__next__)
+
+def grade_layout(
+        layout,
+        single_line_args_limit,
+        kevlin_func_args=True,
+        oneline_limit_adjust=0
+):
+    """apply the args rules to a layout record
+
+    Args:
+        layout (:obj:`ArgLayout`): def/call layout to grade
+        single_line_args_limit (int): number of args allowed on a single line
+        kevlin_func_args (bool, optional): enforce newline function args
+        oneline_limit_adjust (int, optional): +/- adjustments of args limit for special cases
+
+    Returns:
+        str: offending message symbol, or None if layout is valid
+
+    """
+    if layout.first_arg_lineno == layout.last_arg_lineno:
+        if layout.arg_count > single_line_args_limit + oneline_limit_adjust:
+            return 'invalid-oneline-function-format'
+        return None  # valid one-line function
+
+    if layout.lineno == layout.first_arg_lineno and kevlin_func_args:
+        return 'invalid-function-arg-format'
+    return None
+
+ModuleTokens = collections.namedtuple(
+    'ModuleTokens',
+    [
+        'strings',      # (row, col, token string) for every STRING token, in order
+        'arg_layouts',  # :class:`ArgLayout` list, None when nobody asked for it
+        'parens',       # :class:`ParenIndex`, None along with ``arg_layouts``
+    ]
+)
+
+class ParenIndex(object):
+    """paren and arg lines of every def/call in a module, one ``array('i')`` per field
+
+    Notes:
+        records are in closing-paren order.  ``close_cols`` is -1 when the paren
+        isn't the first token on its line, ``indents`` (indent of the line the
+        paren opens on) is -1 when no token starts on that line before it.
+
+    """
+    __slots__ = (
+        'keys',
+        'arg_counts',
+        'open_lines',
+        'first_arg_lines',
+        'last_arg_lines',
+        'close_lines',
+        'close_cols',
+        'indents',
+    )
+
+    def __init__(self):
+        self.keys = {}  # ('def', lineno) or (lineno, col_offset, calls before it) -> record
+        self.arg_counts = array('i')
+        self.open_lines = array('i')
+        self.first_arg_lines = array('i')
+        self.last_arg_lines = array('i')
+        self.close_lines = array('i')
+        self.close_cols = array('i')
+        self.indents = array('i')
+
+    def find_def(self, lineno, arg_count):
+        """record of the def on ``lineno``, -1 unless its arg count matches too"""
+        record = self.keys.get(('def', lineno), -1)
+        if record >= 0 and self.arg_counts[record] != arg_count:
+            return -1
+        return record
+
+    def find_call(
+            self,
+            lineno,
+            col_offset,
+            chained_calls,
+            arg_count
+    ):
+        """record of a call, -1 unless its arg count matches too
+
+        Args:
+            lineno (int): where the call expression starts, astroid's ``lineno``
+            col_offset (int): astroid's ``col_offset``
+            chained_calls (int): calls already applied in the same expression,
+                1 for the outer call of ``a(x)(y)`` or ``a(x).b(y)``
+            arg_count (int): args + keywords
+
+        """
+        record = self.keys.get((lineno, col_offset, chained_calls), -1)
+        if record >= 0 and self.arg_counts[record] != arg_count:
+            return -1
+        return record
+
+def index_parens(tokens, strings=None):
+    """build a :class:`ParenIndex` in the same pass as :func:`scan_tokens`
+
+    Notes:
+        a call is keyed by where its expression starts, like astroid's
+        ``lineno``/``col_offset``, plus the calls chained in front of it.
+        Callees that start inside grouping parens can't be keyed and are left out.
+
+    Args:
+        tokens (iterable): ``tokenize`` 5-tuples or :obj:`tokenize.TokenInfo`
+        strings (:obj:`list`, optional): collect (row, col, token) of STRING tokens here
+
+    Returns:
+        tuple: (:obj:`ParenIndex`, :obj:`list` :class:`ArgLayout`)
+
+    """
+    index = ParenIndex()
+    layouts = []
+    prev_end_row = 0
+    line_start = (0, 0)  # first token on the latest row a token started on
+    for event, token, bracket in scan_brackets(tokens):
+        tok_type, start = token[0], token[2]
+        if tok_type == tokenize.STRING and strings is not None:
+            strings.append((start[0], start[1], token[1]))
+        if event == SKIPPED or event == ARG:
+            continue
+        first_on_line = start[0] > prev_end_row
+        if first_on_line:
+            line_start = start
+
+        if event == OPENED:
+            bracket.extra = line_start[1] if line_start[0] == start[0] else -1  # indent
+        elif event == CLOSED and bracket.kind:
+            if bracket.kind == 'def':
+                index.keys[('def', bracket.lineno)] = len(index.arg_counts)
+            elif bracket.primary is not None:
+                index.keys[bracket.primary + (bracket.calls,)] = len(index.arg_counts)
+            arg_layout = bracket.arg_layout(start[0])
+            index.arg_counts.append(arg_layout.arg_count)
+            index.open_lines.append(bracket.start[0])
+            index.first_arg_lines.append(arg_layout.first_arg_lineno)
+            index.last_arg_lines.append(arg_layout.last_arg_lineno)
+            index.close_lines.append(arg_layout.end_lineno)
+            index.close_cols.append(start[1] if first_on_line else -1)
+            index.indents.append(bracket.extra)
+            layouts.append(arg_layout)
+        prev_end_row = token[3][0]
+    return index, layouts
+
+def index_tokens(tokens, arg_layouts=True):
+    """one pass over a module's tokens for every rule that reads them
+
+    Args:
+        tokens (iterable): ``tokenize`` 5-tuples or :obj:`tokenize.TokenInfo`
+        arg_layouts (bool, optional): also index defs/calls in the same pass
+
+    Returns:
+        :obj:`ModuleTokens`: string tokens, def/call layouts and their paren index
+
+    """
+    if not arg_layouts:
+        return ModuleTokens(
+            [
+                (token[2][0], token[2][1], token[1])
+                for token in tokens if token[0] == tokenize.STRING
+            ],
+            None,
+            None
+        )
+
+    strings = []
+    parens, layouts = index_parens(tokens, strings)
+    return ModuleTokens(
+        strings,
+        layouts,
+        parens
+    )
+
+class SharedTokenIndex(object):
+    """the current module's :func:`index_tokens`, shared by one linter's checkers
+
+    Notes:
+        pylint hands every token checker the same token list, the first checker
+        to ask builds the index and the rest reuse it
+
+    """
+    def __init__(self):
+        self.arg_layouts = False  # set by a checker that will read them, from ``open()``
+        self._tokens = None
+        self._index = None
+
+    def get(self, tokens, arg_layouts=False):
+        """index for ``tokens``, built on first request
+
+        Args:
+            tokens (:obj:`list`): the module's token list
+            arg_layouts (bool, optional): caller reads :attr:`ModuleTokens.arg_layouts`
+
+        Returns:
+            :obj:`ModuleTokens`: shared index
+
+        """
+        if tokens is not self._tokens or (arg_layouts and self._index.arg_layouts is None):
+            self._index = index_tokens(tokens, arg_layouts=arg_layouts or self.arg_layouts)
+            self._tokens = tokens
+        return self._index
+
+def shared_index(linter):
+    """the :class:`SharedTokenIndex` of ``linter``, created on first use
+
+    Args:
+        linter: pylint linter, or anything checkers are attached to
+
+    Returns:
+        :obj:`SharedTokenIndex`: index shared by that linter's checkers
+
+    """
+    shared = getattr(
+        linter,
+        'prosper_token_index',
+        None
+    )
+    if shared is None:
+        shared = linter.prosper_token_index = SharedTokenIndex()
+    return shared
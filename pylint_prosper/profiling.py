@@ -0,0 +1,244 @@
+"""profiling.py: per-phase timing for prosper_lint runs"""
+import collections
+import contextlib
+import json
+from time import perf_counter
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+STATS_PREFIX = 'function_args_'  # flat numeric keys, pylint sums them across jobs
+
+class Timings(object):
+    """accumulates wall time per phase and plain counters
+
+    Args:
+        record_events (bool, optional): keep every interval for :meth:`write_speedscope`
+
+    """
+    def __init__(self, record_events=False):
+        self.totals = collections.OrderedDict()  # phase -> [seconds, calls]
+        self.counters = collections.Counter()
+        self.events = [] if record_events else None
+        self.origin = perf_counter()
+
+    def add(
+            self,
+            name,
+            start,
+            end
+    ):
+        """record one ``start``..``end`` interval of phase ``name``
+
+        Args:
+            name (str): phase name
+            start (float): ``perf_counter()`` at phase start
+            end (float): ``perf_counter()`` at phase end
+
+        """
+        total = self.totals.get(name)
+        if total is None:
+            total = self.totals[name] = [0.0, 0]
+        total[0] += end - start
+        total[1] += 1
+        if self.events is not None:
+            self.events.append((name, start, end))
+
+    def count(self, name, amount=1):
+        """bump counter ``name``
+
+        Args:
+            name (str): counter name
+            amount (int, optional): increment
+
+        """
+        self.counters[name] += amount
+
+    def merge(self, other):
+        """fold another collector's totals, counters and events into this one
+
+        Args:
+            other (:obj:`Timings`): e.g. a worker's per-file timings
+
+        """
+        for name, (seconds, calls) in other.totals.items():
+            total = self.totals.get(name)
+            if total is None:
+                total = self.totals[name] = [0.0, 0]
+            total[0] += seconds
+            total[1] += calls
+        self.counters.update(other.counters)
+        if self.events is not None and other.events:
+            self.events.extend(other.events)
+
+    def seconds(self, name):
+        """total time recorded for phase ``name``
+
+        Args:
+            name (str): phase name
+
+        Returns:
+            float: seconds, 0 for a phase never entered
+
+        """
+        return self.totals.get(name, (0.0, 0))[0]
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """time the ``with`` block as phase ``name``
+
+        Args:
+            name (str): phase name
+
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(
+                name,
+                start,
+                perf_counter()
+            )
+
+    def format_table(self):
+        """human-readable breakdown
+
+        Yields:
+            str: one line per phase, then one per counter
+
+        """
+        yield '{:<40} {:>8} {:>12} {:>12}'.format(
+            'phase',
+            'calls',
+            'total ms',
+            'mean ms'
+        )
+        for name, (seconds, calls) in self.totals.items():
+            yield '{:<40} {:>8} {:>12.3f} {:>12.3f}'.format(
+                name,
+                calls,
+                seconds * 1000,
+                seconds * 1000 / calls
+            )
+        for name, value in sorted(self.counters.items()):
+            yield '{:<40} {:>8}'.format(name, value)
+
+    def write_speedscope(self, filepath):
+        """dump recorded intervals as a speedscope evented profile
+
+        Args:
+            filepath (str): where to write ``*.speedscope.json``
+
+        """
+        frames = []
+        frame_index = {}
+        markers = []
+        for name, start, end in self.events or ():
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({'name': name})
+            duration = end - start
+            # closes before opens at a tie; outer opens first, inner closes first
+            markers.append(((start - self.origin) * 1000, 1, -duration, 'O', frame_index[name]))
+            markers.append(((end - self.origin) * 1000, 0, duration, 'C', frame_index[name]))
+        markers.sort()
+
+        profile = {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'evented',
+                'name': 'prosper_lint',
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': markers[-1][0] if markers else 0,
+                'events': [
+                    {'type': kind, 'frame': frame, 'at': at}
+                    for at, _, _, kind, frame in markers
+                ],
+            }],
+        }
+        with open(filepath, 'w') as profile_fh:
+            json.dump(profile, profile_fh)
+
+def checker_stats(timings):
+    """ArgsIndentChecker counters as flat pylint ``stats`` entries
+
+    Args:
+        timings (:obj:`Timings`): collector the checker wrote to
+
+    Returns:
+        dict: ``function_args_*`` -> number
+
+    """
+    stats = {
+        STATS_PREFIX + 'functions': timings.counters['functions_examined'],
+        STATS_PREFIX + 'calls': timings.counters['calls_examined'],
+        STATS_PREFIX + 'seconds': sum(
+            seconds for name, (seconds, _) in timings.totals.items()
+            if name.startswith('checker.')
+        ),
+    }
+    for name, count in timings.counters.items():
+        if name.startswith('messages.'):
+            stats[STATS_PREFIX + 'msg_' + name[len('messages.'):]] = count
+    return stats
+
+class RunStats(object):
+    """per-file and whole-run lint statistics for ``prosper_lint --stats``"""
+    def __init__(self):
+        self.totals = Timings()
+        self.files = []
+        self.cached_files = 0
+
+    def add_file(self, filepath, timings):
+        """record one linted file
+
+        Args:
+            filepath (str): path that was linted
+            timings (:obj:`Timings`): that file's collector
+
+        """
+        self.totals.merge(timings)
+        self.files.append({
+            'path': filepath,
+            'seconds': timings.seconds('lint_file'),
+            'messages': _message_counts(timings),
+        })
+
+    def as_dict(self):
+        """JSON-ready summary, slowest files first
+
+        Returns:
+            dict: run totals and per-file records
+
+        """
+        from pylint_prosper._version import __version__
+
+        checker = checker_stats(self.totals)
+        return {
+            'version': __version__,
+            'files': len(self.files) + self.cached_files,
+            'cached_files': self.cached_files,
+            'seconds': self.totals.seconds('lint_file'),
+            'functions_examined': checker[STATS_PREFIX + 'functions'],
+            'calls_examined': checker[STATS_PREFIX + 'calls'],
+            'visitor_seconds': {
+                name[len('checker.'):]: seconds
+                for name, (seconds, _) in self.totals.totals.items()
+                if name.startswith('checker.')
+            },
+            'messages': _message_counts(self.totals),
+            'by_file': sorted(
+                self.files,
+                key=lambda record: record['seconds'],
+                reverse=True
+            ),
+        }
+
+def _message_counts(timings):
+    """``messages.<symbol>`` counters as a plain dict"""
+    return {
+        name[len('messages.'):]: count
+        for name, count in sorted(timings.counters.items())
+        if name.startswith('messages.')
+    }
@@ -1,25 +1,550 @@
 """a wrapper to execute pylint for prosper projects"""
+import contextlib
+import functools
+import json
 from os import path
+import sys
+from time import perf_counter
 
+from plumbum import cli
 from plumbum import local
 
 # TODO: implement prosper_cli parent wrapper
 from plumbum.cli import Application as ProsperCLI
 #from prosper.common.prosper_cli import cli  #NOT IMPLEMENTED
 
-from _version import __version__
+import pylint_prosper
+from pylint_prosper import _version
+from pylint_prosper import baseline
+from pylint_prosper import cache
+from pylint_prosper import changes
+from pylint_prosper import engine
+from pylint_prosper import profiling
+from pylint_prosper import reporters
+from pylint_prosper import runner
+from pylint_prosper import settings
+
+IMPORT_END = perf_counter()
+SPEEDSCOPE_SUFFIX = '.speedscope.json'
 
 HERE = path.abspath(path.dirname(__file__))
 
 class ProsperLint(ProsperCLI):
     """a pylint wrapper that helps execute pylint checking in CI runs"""
     PROGNAME = 'prosper_lint'
-    VERSION = __version__
+    VERSION = property(lambda self: _version.__version__)  # resolved only for --version/--help
+
+    fast = cli.Flag(
+        ['--fast'],
+        help='Check args layout with the stand-alone engine, pylint is never started'
+    )
+
+    fix = cli.Flag(
+        ['--fix'],
+        help='Rewrite offending defs/calls to one arg per line, then lint what is left'
+    )
+
+    kevlin_func_args = cli.SwitchAttr(
+        ['--kevlin-func-args'],
+        cli.Set('y', 'n'),
+        help='Enforce newline function args.  A la Kevlin Henny\'s clean code notes.  '
+        'Defaults to the config files, then y'
+    )
+
+    single_line_args_limit = cli.SwitchAttr(
+        ['--single-line-args-limit'],
+        int,
+        help='number of args allowed to be on a single line.  Defaults to the config files, then 2'
+    )
+
+    jobs = cli.SwitchAttr(
+        ['-j', '--jobs'],
+        cli.Range(0, 1024),
+        default=0,
+        help='number of worker processes, 0 for all cores'
+    )
+
+    no_cache = cli.Flag(
+        ['--no-cache'],
+        help='Lint every file, neither reading nor writing the result cache'
+    )
+
+    clear_cache = cli.Flag(
+        ['--clear-cache'],
+        help='Drop every cached result before linting'
+    )
+
+    cache_dir = cli.SwitchAttr(
+        ['--cache-dir'],
+        str,
+        default=cache.DEFAULT_CACHE_DIR,
+        help='where to keep cached results, keyed by file content'
+    )
+
+    no_gitignore = cli.Flag(
+        ['--no-gitignore'],
+        help='Walk directories without honoring .gitignore files'
+    )
+
+    changed_since = cli.SwitchAttr(
+        ['--changed-since'],
+        str,
+        help='Only lint files and defs/calls changed since this git ref'
+    )
+
+    timeout = cli.SwitchAttr(
+        ['--timeout'],
+        float,
+        help='seconds one file may take, slower files are killed and reported as lint-skipped'
+    )
+
+    max_memory = cli.SwitchAttr(
+        ['--max-memory'],
+        int,
+        help='MiB of resident memory per worker, files past it are reported as lint-skipped'
+    )
+
+    max_files_per_worker = cli.SwitchAttr(
+        ['--max-files-per-worker'],
+        int,
+        help='replace each worker process after this many files to cap memory growth'
+    )
+
+    baseline = cli.SwitchAttr(
+        ['--baseline'],
+        str,
+        help='drop the E7700/E7701 hits recorded in this file, report only new ones'
+    )
+
+    write_baseline = cli.Flag(
+        ['--write-baseline'],
+        requires=['--baseline'],
+        help='Record every current E7700/E7701 hit in the --baseline file instead of reporting'
+    )
+
+    output_format = cli.SwitchAttr(
+        ['-f', '--format'],
+        cli.Set(*sorted(reporters.REPORTERS)),
+        default='text',
+        help='output format, written as each file finishes'
+    )
+
+    profile = cli.Flag(
+        ['--profile'],
+        help='Print a per-phase timing breakdown to stderr, runs with -j1'
+    )
+
+    profile_output = cli.SwitchAttr(
+        ['--profile-output'],
+        str,
+        requires=['--profile'],
+        help='also dump a profile: *.speedscope.json for speedscope, '
+        'anything else is cProfile/pstats'
+    )
+
+    stats_output = cli.SwitchAttr(
+        ['--stats'],
+        str,
+        help='write per-file lint time, defs/calls examined and messages per id as JSON here'
+    )
+
+    timings = None
+    _prosper_config = None
+
+    @property
+    def prosper_config(self):
+        """:obj:`settings.ProsperConfig`: config files, parsed once per run"""
+        if self._prosper_config is None:
+            self._prosper_config = settings.load_config()
+        return self._prosper_config
+
+    @property
+    def lint_config(self):
+        """:obj:`engine.LintConfig`: checker options, command line over config files"""
+        kevlin_func_args = None
+        if self.kevlin_func_args is not None:
+            kevlin_func_args = self.kevlin_func_args == 'y'
+        return settings.lint_config(
+            self.prosper_config,
+            kevlin_func_args=kevlin_func_args,
+            single_line_args_limit=self.single_line_args_limit
+        )
+
+    @property
+    def worker_limits(self):
+        """:obj:`workers.WorkerLimits`: runner guards, command line over config files"""
+        return settings.worker_limits(
+            self.prosper_config,
+            timeout=self.timeout,
+            max_memory=self.max_memory,
+            max_files=self.max_files_per_worker
+        )
+
+    def main(self, *paths):
+        """lint files, directories or globs
+
+        Args:
+            paths (str): files, directories or glob patterns to lint
+
+        Returns:
+            int: pylint-compatible exit status
+
+        """
+        if self.nested_command:
+            return 0
+
+        baseline_file = None
+        if self.baseline and not self.write_baseline:
+            baseline_file = self.baseline
+            try:
+                baseline.load(baseline_file)
+            except (OSError, ValueError) as err:
+                print(
+                    'prosper_lint: can\'t read baseline: ' + str(err),
+                    file=sys.stderr
+                )
+                return 32
+        result_cache = cache.ResultCache(
+            runner.cache_fingerprint(
+                self.fast,
+                self.lint_config,
+                self.prosper_config,
+                baseline_file
+            ),
+            cache_dir=self.cache_dir
+        )
+        if self.clear_cache:
+            result_cache.clear()
+            if not paths:
+                return 0
+        if self.no_cache:
+            result_cache = None
+        if not paths:
+            paths = ['.']
+        line_ranges = None
+        if self.changed_since:
+            line_ranges = changes.changed_since(self.changed_since)
+        if self.fix:
+            self.fix_paths(paths, line_ranges)
+        if self.write_baseline:
+            return self.record_baseline(
+                paths,
+                result_cache,
+                line_ranges
+            )
+        stats = profiling.RunStats() if self.stats_output else None
+        if self.profile:
+            status = self.profiled_run(
+                paths,
+                result_cache,
+                line_ranges,
+                stats,
+                baseline_file
+            )
+        else:
+            status = self.report(runner.run(
+                paths,
+                fast=self.fast,
+                config=self.lint_config,
+                jobs=self.jobs,
+                result_cache=result_cache,
+                line_ranges=line_ranges,
+                stats=stats,
+                rules=runner.ignore_rules(
+                    self.prosper_config,
+                    gitignore=not self.no_gitignore
+                ),
+                prosper_config=self.prosper_config,
+                limits=self.worker_limits,
+                baseline_file=baseline_file
+            ))
+        if stats is not None:
+            with open(self.stats_output, 'w') as stats_fh:
+                json.dump(
+                    stats.as_dict(),
+                    stats_fh,
+                    indent=2,
+                    sort_keys=True
+                )
+        return status
+
+    def fix_paths(self, paths, line_ranges):
+        """``--fix``: rewrite files in parallel, one line per changed file on stderr
 
+        Args:
+            paths (:obj:`list` str): files, directories or glob patterns to fix
+            line_ranges (dict): ``--changed-since`` ranges or None
+
+        """
+        fixed = 0
+        for result in runner.fix(
+                paths,
+                config=self.lint_config,
+                jobs=self.jobs,
+                line_ranges=line_ranges,
+                rules=runner.ignore_rules(
+                    self.prosper_config,
+                    gitignore=not self.no_gitignore
+                )
+        ):
+            if result.error:
+                print(
+                    'prosper_lint: left {} alone: {}'.format(result.path, result.error),
+                    file=sys.stderr
+                )
+            elif result.fixed:
+                fixed += result.fixed
+                print(
+                    'Fixed {} arg layouts in {}'.format(result.fixed, result.path),
+                    file=sys.stderr
+                )
+        print(
+            'Fixed {} arg layouts'.format(fixed),
+            file=sys.stderr
+        )
+
+    def record_baseline(
+            self,
+            paths,
+            result_cache,
+            line_ranges
+    ):
+        """``--write-baseline``: fingerprint every args hit into the ``--baseline`` file
+
+        Args:
+            paths (:obj:`list` str): files, directories or glob patterns to lint
+            result_cache (:obj:`cache.ResultCache`): cache or None
+            line_ranges (dict): ``--changed-since`` ranges or None
+
+        Returns:
+            int: 0, hits are recorded rather than reported
+
+        """
+        root = path.dirname(path.abspath(self.baseline))
+        prints = []
+        for filepath, messages in runner.run(
+                paths,
+                fast=self.fast,
+                config=self.lint_config,
+                jobs=self.jobs,
+                result_cache=result_cache,
+                line_ranges=line_ranges,
+                rules=runner.ignore_rules(
+                    self.prosper_config,
+                    gitignore=not self.no_gitignore
+                ),
+                prosper_config=self.prosper_config,
+                limits=self.worker_limits
+        ):
+            prints.extend(
+                key for key in baseline.fingerprints(
+                    filepath,
+                    messages,
+                    root
+                ) if key is not None
+            )
+        recorded = baseline.write(self.baseline, prints)
+        print(
+            'Recorded {} hits in {}'.format(recorded, self.baseline),
+            file=sys.stderr
+        )
+        return 0
+
+    def profiled_run(
+            self,
+            paths,
+            result_cache,
+            line_ranges,
+            stats,
+            baseline_file=None
+    ):
+        """:meth:`main` under ``--profile``, timing table goes to stderr
+
+        Args:
+            paths (:obj:`list` str): files, directories or glob patterns to lint
+            result_cache (:obj:`cache.ResultCache`): cache or None
+            line_ranges (dict): ``--changed-since`` ranges or None
+            stats (:obj:`profiling.RunStats`): ``--stats`` collector or None
+            baseline_file (str, optional): ``--baseline`` file
+
+        Returns:
+            int: pylint-compatible exit status
+
+        """
+        speedscope = bool(self.profile_output) and self.profile_output.endswith(SPEEDSCOPE_SUFFIX)
+        self.timings = profiling.Timings(record_events=speedscope)
+        self.timings.add(
+            'import',
+            pylint_prosper.IMPORT_START,
+            IMPORT_END
+        )
+
+        profiler = None
+        if self.profile_output and not speedscope:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            with self.timings.phase('total'):
+                status = self.report(runner.run(
+                    paths,
+                    fast=self.fast,
+                    config=self.lint_config,
+                    jobs=1,
+                    result_cache=result_cache,
+                    line_ranges=line_ranges,
+                    timings=self.timings,
+                    stats=stats,
+                    rules=runner.ignore_rules(
+                        self.prosper_config,
+                        gitignore=not self.no_gitignore
+                    ),
+                    prosper_config=self.prosper_config,
+                    baseline_file=baseline_file
+                ))
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+        if profiler is not None:
+            profiler.dump_stats(self.profile_output)
+        elif speedscope:
+            self.timings.write_speedscope(self.profile_output)
+        for line in self.timings.format_table():
+            print(line, file=sys.stderr)
+        return status
+
+    def report(self, results):
+        """stream results through the ``--format`` reporter
+
+        Args:
+            results (iterable): (filepath, :obj:`list` :obj:`engine.Message`) per file
+
+        Returns:
+            int: pylint-compatible exit status, 32 when the format's extra isn't installed
+
+        """
+        reporter_class = reporters.REPORTERS[self.output_format]
+        stream = sys.stdout.buffer if reporter_class is reporters.MsgpackReporter else sys.stdout
+        try:
+            reporter = reporter_class(stream)
+        except ImportError as err:
+            print('prosper_lint: ' + str(err), file=sys.stderr)
+            return 32
+
+        reporter_phase = contextlib.ExitStack
+        if self.timings is not None:
+            reporter_phase = functools.partial(self.timings.phase, 'reporter')
+
+        status = 0
+        with reporter_phase():
+            reporter.start()
+        for filepath, messages in results:
+            with reporter_phase():
+                reporter.handle_file(filepath, messages)
+            status |= engine.exit_status(messages)
+        with reporter_phase():
+            reporter.finish()
+
+        return status
+
+def import_daemon():
+    """:mod:`pylint_prosper.daemon`, only loaded by the subcommands that use it
+
+    Notes:
+        it needs unix sockets, the rest of the CLI has to work without them
+
+    Returns:
+        module: :mod:`pylint_prosper.daemon`, None without ``socket.AF_UNIX``
+
+    """
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        print(
+            'prosper_lint daemon needs unix sockets, not available on this platform',
+            file=sys.stderr
+        )
+        return None
+    from pylint_prosper import daemon
+    return daemon
+
+@ProsperLint.subcommand('daemon')
+class LintDaemon(ProsperCLI):
+    """keep pylint, astroid and the prosper plugins warm for ``prosper_lint client``"""
+    socket_path = cli.SwitchAttr(
+        ['--socket'],
+        str,
+        help='unix socket to listen on.  Defaults to prosper_lint-<uid>.sock '
+        'in $XDG_RUNTIME_DIR or the temp dir'
+    )
 
     def main(self):
-        """do stuff here"""
-        pass
+        """serve lint requests until ``prosper_lint client --stop``"""
+        daemon = import_daemon()
+        if daemon is None:
+            return 32
+        socket_path = self.socket_path or daemon.DEFAULT_SOCKET
+        server = daemon.make_server(socket_path)
+        if not self.parent.fast:
+            runner.get_pylint_linter(  # warm up before the first request
+                self.parent.lint_config,
+                prosper_config=self.parent.prosper_config
+            )
+        print('prosper_lint daemon listening on ' + socket_path)
+        sys.stdout.flush()
+        daemon.serve(server)
+
+@ProsperLint.subcommand('client')
+class LintClient(ProsperCLI):
+    """lint through a running ``prosper_lint daemon``"""
+    socket_path = cli.SwitchAttr(
+        ['--socket'],
+        str,
+        help='unix socket the daemon listens on, same default as the daemon\'s'
+    )
+
+    stop = cli.Flag(
+        ['--stop'],
+        help='Shut the daemon down'
+    )
+
+    def main(self, *paths):
+        """lint files, directories or globs
+
+        Args:
+            paths (str): files, directories or glob patterns to lint
+
+        Returns:
+            int: pylint-compatible exit status, 32 when the daemon can't be
+                reached or fails on a file
+
+        """
+        daemon = import_daemon()
+        if daemon is None:
+            return 32
+        socket_path = self.socket_path or daemon.DEFAULT_SOCKET
+        try:
+            if self.stop:
+                daemon.shutdown(socket_path)
+                return 0
+            return self.parent.report(daemon.lint(
+                paths or ['.'],
+                fast=self.parent.fast,
+                config=self.parent.lint_config,
+                socket_path=socket_path
+            ))
+        except OSError as err:
+            print(
+                'prosper_lint daemon not reachable: ' + str(err),
+                file=sys.stderr
+            )
+            return 32
+        except RuntimeError as err:
+            print(
+                'prosper_lint daemon failed: ' + str(err),
+                file=sys.stderr
+            )
+            return 32
 
 def run_main():
     """hook for running entry_points"""
@@ -0,0 +1,88 @@
+"""pylint_quotes' checker reading from the shared per-module token index
+
+Load ``pylint_prosper.quotes_checker`` instead of ``pylint_quotes``: same
+options and messages, but string tokens come from the index the args checker
+already builds and docstring lookups bisect instead of scanning every row.
+
+The overrides hook pylint_quotes' private methods, so they're only used on the
+releases in :data:`SUPPORTED_VERSIONS` (pinned in ``setup.py``), anything else
+gets the stock checker
+
+"""
+from __future__ import absolute_import
+
+import bisect
+import warnings
+
+from pylint_quotes.__version__ import __version__ as QUOTES_VERSION
+from pylint_quotes.checker import StringQuoteChecker
+
+from pylint_prosper import layout
+
+SUPPORTED_VERSIONS = ('0.1.', '0.2.')  # pylint_quotes releases the overrides match
+TAKES_COLUMN = not QUOTES_VERSION.startswith('0.1.')  # 0.2 reports string columns
+
+class SharedStringQuoteChecker(StringQuoteChecker):
+    """:class:`pylint_quotes.checker.StringQuoteChecker` on :func:`layout.shared_index`"""
+    _shared_tokens = None
+    _triple_rows = ()  # rows of the module's triple-quoted strings, ascending
+
+    def open(self):
+        """attach to the linter's shared token index"""
+        super(SharedStringQuoteChecker, self).open()
+        self._shared_tokens = layout.shared_index(self.linter)
+
+    def process_tokens(self, tokens):
+        """check string tokens from the shared index
+
+        Args:
+            tokens (:obj:`list`): ``tokenize`` tokens for the module
+
+        """
+        if self._shared_tokens is None:
+            self.open()
+        for start_row, start_col, token in self._shared_tokens.get(tokens).strings:
+            if TAKES_COLUMN:
+                self._process_string_token(
+                    token,
+                    start_row,
+                    start_col
+                )
+            else:
+                self._process_string_token(token, start_row)
+        self._triple_rows = sorted(self._tokenized_triple_quotes)
+
+    def _first_tracked_row(self, start, end=None):
+        """first triple-quote row from ``start`` (to ``end``) not yet matched to a docstring"""
+        rows = self._triple_rows
+        for index in range(bisect.bisect_left(rows, start), len(rows)):
+            if end is not None and rows[index] > end:
+                return None
+            if rows[index] in self._tokenized_triple_quotes:
+                return rows[index]
+        return None
+
+    def _find_docstring_line_for_no_body(self, start):
+        """bisect version of pylint_quotes' sort-and-scan lookup"""
+        return self._first_tracked_row(start)
+
+    def _find_docstring_line(self, start, end):
+        """bisect version of pylint_quotes' row-by-row scan"""
+        return self._first_tracked_row(start, end)
+
+def register(linter):
+    """Required method to auto register this checker.
+
+    Args:
+        linter: Main interface object for Pylint plugins.
+
+    """
+    if QUOTES_VERSION.startswith(SUPPORTED_VERSIONS):
+        linter.register_checker(SharedStringQuoteChecker(linter))
+        return
+    warnings.warn(
+        'pylint_quotes {} is untested with pylint_prosper.quotes_checker, '
+        'using its stock checker'.format(QUOTES_VERSION),
+        RuntimeWarning
+    )
+    linter.register_checker(StringQuoteChecker(linter))
@@ -0,0 +1,177 @@
+"""reporters.py: streaming output formats for prosper_lint
+
+Every reporter writes a file's messages as soon as that file is done
+
+"""
+import json
+
+try:  # pragma: no cover
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from pylint_prosper import engine
+from pylint_prosper.layout import MSGS
+
+MSG_TYPES = {
+    'I': 'info',
+    'C': 'convention',
+    'R': 'refactor',
+    'W': 'warning',
+    'E': 'error',
+    'F': 'fatal',
+}
+SARIF_LEVELS = {
+    'I': 'note',
+    'C': 'note',
+    'R': 'note',
+    'W': 'warning',
+    'E': 'error',
+    'F': 'error',
+}
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+def message_record(message):
+    """plain dict for a message, keys match pylint's json reporter
+
+    Args:
+        message (:obj:`engine.Message`): lint result
+
+    Returns:
+        dict: serializable message
+
+    """
+    return {
+        'type': MSG_TYPES.get(message.msg_id[0], 'error'),
+        'module': message.module,
+        'path': message.path,
+        'line': message.line,
+        'column': message.column,
+        'symbol': message.symbol,
+        'message': message.msg,
+        'message-id': message.msg_id,
+    }
+
+class BaseReporter(object):
+    """streams lint results to ``stream``
+
+    Args:
+        stream (file): text stream, binary for :class:`MsgpackReporter`
+
+    """
+    name = None
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def start(self):
+        """called once before any file is reported"""
+        pass
+
+    def handle_file(self, filepath, messages):
+        """write one file's messages
+
+        Args:
+            filepath (str): path that was linted
+            messages (:obj:`list` :obj:`engine.Message`): results for the file
+
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """called once after every file is reported"""
+        pass
+
+class TextReporter(BaseReporter):
+    """pylint's default text layout"""
+    name = 'text'
+
+    def handle_file(self, filepath, messages):
+        for line in engine.format_messages(messages):
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+class JSONLReporter(BaseReporter):
+    """one JSON object per message, per line"""
+    name = 'jsonl'
+
+    def handle_file(self, filepath, messages):
+        for message in messages:
+            self.stream.write(json.dumps(message_record(message), sort_keys=True) + '\n')
+        self.stream.flush()
+
+class SARIFReporter(BaseReporter):
+    """SARIF 2.1.0 log, results streamed into the ``results`` array"""
+    name = 'sarif'
+
+    def __init__(self, stream):
+        super(SARIFReporter, self).__init__(stream)
+        self._first_result = True
+
+    def start(self):
+        from pylint_prosper._version import __version__
+
+        driver = {
+            'name': 'prosper_lint',
+            'version': __version__,
+            'rules': [
+                {
+                    'id': msg_id,
+                    'name': symbol,
+                    'shortDescription': {'text': msg},
+                    'fullDescription': {'text': description},
+                }
+                for msg_id, (msg, symbol, description) in sorted(MSGS.items())
+            ],
+        }
+        run_header = json.dumps({'tool': {'driver': driver}})
+        self.stream.write(
+            '{"version": "2.1.0", "$schema": "' + SARIF_SCHEMA + '", "runs": ['
+            + run_header[:-1] + ', "results": ['  # left open for streaming
+        )
+
+    def handle_file(self, filepath, messages):
+        for message in messages:
+            result = {
+                'ruleId': message.msg_id,
+                'level': SARIF_LEVELS.get(message.msg_id[0], 'error'),
+                'message': {'text': message.msg},
+                'locations': [{
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': message.path.replace('\\', '/')},
+                        'region': {
+                            'startLine': message.line,
+                            'startColumn': message.column + 1,
+                        },
+                    },
+                }],
+            }
+            if not self._first_result:
+                self.stream.write(',')
+            self._first_result = False
+            self.stream.write(json.dumps(result))
+        self.stream.flush()
+
+    def finish(self):
+        self.stream.write(']}]}\n')
+        self.stream.flush()
+
+class MsgpackReporter(BaseReporter):
+    """back-to-back msgpack maps, one per message, for ``msgpack.Unpacker``"""
+    name = 'msgpack'
+
+    def __init__(self, stream):
+        if msgpack is None:
+            raise ImportError('msgpack output needs `pip install ProsperLint[msgpack]`')
+        super(MsgpackReporter, self).__init__(stream)
+        self._packer = msgpack.Packer(use_bin_type=True)
+
+    def handle_file(self, filepath, messages):
+        for message in messages:
+            self.stream.write(self._packer.pack(message_record(message)))
+        self.stream.flush()
+
+REPORTERS = {
+    reporter.name: reporter
+    for reporter in (TextReporter, JSONLReporter, SARIFReporter, MsgpackReporter)
+}
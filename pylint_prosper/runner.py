@@ -0,0 +1,807 @@
+"""runner.py: fan lint work out across worker processes"""
+import collections
+from concurrent import futures
+import contextlib
+import functools
+import glob
+import itertools
+import os
+from os import path
+
+from pylint_prosper import engine
+from pylint_prosper import settings
+from pylint_prosper import walker
+from pylint_prosper import workers
+
+STREAM_CHUNKSIZE = 8  # files per worker task, discovery is streamed so the total isn't known
+GLOB_CHARS = ('*', '?', '[')
+
+_WORKER_LINTERS = {}  # per-process cache, one pylint linter per (config, settings)
+
+def ignore_rules(prosper_config=None, gitignore=True):
+    """walker rules from the merged prosper_lint settings
+
+    Args:
+        prosper_config (:obj:`settings.ProsperConfig`, optional): defaults to
+            :func:`settings.load_config`
+        gitignore (bool, optional): honor .gitignore files while walking
+
+    Returns:
+        :obj:`walker.IgnoreRules`: rules for the walk
+
+    """
+    return walker.load_ignore_rules(
+        prosper_config or settings.load_config(),
+        gitignore=gitignore
+    )
+
+def iter_paths(paths, rules=None):
+    """expand files, directories and globs into de-duplicated python files, lazily
+
+    Args:
+        paths (:obj:`list` :obj:`str`): files, directories or glob patterns
+        rules (:obj:`walker.IgnoreRules`, optional): defaults to :func:`ignore_rules`
+
+    Yields:
+        str: python files in discovery order, as the walk finds them
+
+    """
+    if rules is None:
+        rules = ignore_rules()
+    expanded = []
+    for lint_path in paths:
+        if any(char in lint_path for char in GLOB_CHARS):
+            expanded.extend(
+                match for match in sorted(glob.glob(lint_path, recursive=True))
+                if not walker.glob_ignored(rules, match)
+            )
+        else:
+            expanded.append(lint_path)
+
+    seen = set()
+    for filepath in walker.iter_python_files(expanded, rules):
+        if filepath not in seen:
+            seen.add(filepath)
+            yield filepath
+
+def expand_paths(paths, rules=None):
+    """expand files, directories and globs into a de-duplicated file list
+
+    Args:
+        paths (:obj:`list` :obj:`str`): files, directories or glob patterns
+        rules (:obj:`walker.IgnoreRules`, optional): defaults to :func:`ignore_rules`
+
+    Returns:
+        :obj:`list` :obj:`str`: python files in discovery order
+
+    """
+    return list(iter_paths(paths, rules))
+
+@functools.lru_cache(maxsize=None)
+def _linter_class():
+    """PyLinter that reports astroid build time to ``self.timings``
+
+    Returns:
+        type: :obj:`pylint.lint.PyLinter` subclass
+
+    """
+    from pylint import lint
+
+    class ProfiledLinter(lint.PyLinter):
+        """PyLinter with a ``timings`` hook around astroid builds"""
+        timings = None
+        module_ast = None  # last module built, for :func:`pylint_dependencies`
+
+        def get_ast(
+                self,
+                filepath,
+                modname,
+                *args
+        ):
+            self.module_ast = None
+            with contextlib.ExitStack() as stack:
+                if self.timings is not None:
+                    stack.enter_context(self.timings.phase('astroid_build'))
+                self.module_ast = super(ProfiledLinter, self).get_ast(
+                    filepath,
+                    modname,
+                    *args
+                )
+            return self.module_ast
+
+    return ProfiledLinter
+
+_IMPORTS = {}  # module name -> (astroid module, names it imports), per process
+
+def _imported_names(module):
+    """dotted names ``module`` imports, packages on the way included
+
+    Args:
+        module (:obj:`astroid.Module`): built module
+
+    Returns:
+        :obj:`list` str: ``a``, ``a.b``, ``a.b.c`` for ``from a.b import c``
+
+    """
+    import astroid
+
+    cached = _IMPORTS.get(module.name)
+    if cached is not None and cached[0] is module:
+        return cached[1]
+    names = set()
+    for node in module.nodes_of_class((astroid.Import, astroid.ImportFrom)):
+        if isinstance(node, astroid.Import):
+            dotted = [name for name, _ in node.names]
+        else:
+            try:
+                base = module.relative_to_absolute_name(node.modname, node.level)
+            except astroid.exceptions.TooManyLevelsError:
+                continue
+            dotted = [base] + [base + '.' + name for name, _ in node.names if name != '*']
+        for name in dotted:
+            parts = name.split('.')
+            names.update('.'.join(parts[:end]) for end in range(1, len(parts) + 1))
+    names = sorted(names)
+    _IMPORTS[module.name] = (module, names)
+    return names
+
+def pylint_dependencies(linter):
+    """files besides the linted one that pylint's last result could depend on
+
+    Notes:
+        the module's imports and theirs, as far as astroid built them while
+        linting: a module astroid never built wasn't looked at.  Only file
+        contents are tracked, a new module shadowing an import isn't.
+
+    Args:
+        linter (:obj:`pylint.lint.PyLinter`): from :func:`build_pylint_linter`,
+            right after :func:`pylint_file`
+
+    Returns:
+        :obj:`list` str: sorted paths
+
+    """
+    import astroid
+
+    module = linter.module_ast
+    if module is None:
+        return []
+    built = astroid.MANAGER.astroid_cache
+    seen = {module.name}
+    pending = [module]
+    files = set()
+    while pending:
+        for name in _imported_names(pending.pop()):
+            if name in seen:
+                continue
+            seen.add(name)
+            imported = built.get(name)
+            if imported is None:
+                continue
+            if imported.file and path.isfile(imported.file):
+                files.add(imported.file)
+            pending.append(imported)
+    files.discard(module.file)
+    return sorted(files)
+
+def set_timings(linter, timings):
+    """point a linter and its ArgsIndentChecker at ``timings``
+
+    Args:
+        linter (:obj:`pylint.lint.PyLinter`): from :func:`build_pylint_linter`
+        timings (:obj:`profiling.Timings`): collector, or None to stop profiling
+
+    """
+    from pylint_prosper.args_checker import ArgsIndentChecker
+
+    linter.timings = timings
+    for checker in linter.get_checkers():
+        if isinstance(checker, ArgsIndentChecker):
+            checker.set_timings(timings)
+
+def build_pylint_linter(
+        config=engine.DEFAULT_CONFIG,
+        prosper_config=None,
+        timings=None
+):
+    """configure a reusable pylint linter with the prosper plugins
+
+    Args:
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        prosper_config (:obj:`settings.ProsperConfig`, optional): pylint options to apply,
+            defaults to :func:`settings.load_config`
+        timings (:obj:`profiling.Timings`, optional): collect setup/build/visitor timings
+
+    Returns:
+        :obj:`pylint.lint.PyLinter`: linter with a collecting reporter
+
+    """
+    with contextlib.ExitStack() as stack:
+        if timings is not None:
+            stack.enter_context(timings.phase('pylint_setup'))
+        linter = _build_pylint_linter(
+            config,
+            prosper_config or settings.load_config(),
+            timings
+        )
+    set_timings(linter, timings)
+    return linter
+
+def _build_pylint_linter(
+        config,
+        prosper_config,
+        timings
+):
+    """does the work for :func:`build_pylint_linter`
+
+    Notes:
+        options come from the already-parsed ``prosper_config``, the same way
+        ``PyLinter.load_config_file`` would dispatch them, no rc file is read here.
+
+    """
+    import optparse
+
+    from pylint import reporters
+
+    import pylint_prosper
+
+    linter = _linter_class()()
+    linter.load_default_plugins()
+    plugins = settings.get_option(
+        prosper_config,
+        'load-plugins',
+        section='MASTER',
+        default=''
+    )
+    linter.load_plugin_modules([
+        plugin.strip() for plugin in plugins.split(',')
+        if plugin.strip() and plugin.strip() != 'pylint_prosper'  # registered below
+    ])
+    with contextlib.ExitStack() as stack:
+        if timings is not None:
+            stack.enter_context(timings.phase('register'))
+        pylint_prosper.register(linter)
+    for section, options in prosper_config.sections:
+        if section == settings.PROSPER_SECTION:
+            continue
+        for option, value in options:
+            try:
+                set_option(
+                    linter,
+                    option,
+                    value
+                )
+            except (KeyError, optparse.OptionError):
+                continue  # not a pylint option, pylint skips these too
+    set_option(
+        linter,
+        'kevlin-func-args',
+        'y' if config.kevlin_func_args else 'n'
+    )
+    set_option(
+        linter,
+        'single-line-args-limit',
+        str(config.single_line_args_limit)
+    )
+    linter.set_reporter(reporters.CollectingReporter())
+    return linter
+
+def set_option(
+        linter,
+        option,
+        value
+):
+    """set any registered option from its rc file spelling
+
+    Notes:
+        pylint 2.14 moved options to argparse: ``set_option`` reaches every
+        checker's options there, before that only ``global_set_option`` did
+
+    Args:
+        linter (:obj:`pylint.lint.PyLinter`): linter with the plugins registered
+        option (str): option name, ``single-line-args-limit``
+        value (str): value as written in an rc file
+
+    """
+    if hasattr(linter, '_arg_parser'):
+        linter.set_option(option, value)
+    else:
+        linter.global_set_option(option, value)
+
+def pylint_file(linter, filepath):
+    """lint one file with a linter from :func:`build_pylint_linter`
+
+    Args:
+        linter (:obj:`pylint.lint.PyLinter`): configured linter
+        filepath (str): path to python file
+
+    Returns:
+        :obj:`list` :obj:`engine.Message`: messages sorted by line
+
+    """
+    from pylint import lint
+
+    linter.reporter.messages = []
+    with lint.fix_import_path([filepath]):
+        linter.check([filepath])
+
+    messages = [
+        engine.Message(
+            msg.path,
+            msg.module,
+            msg.msg_id,
+            msg.symbol,
+            msg.line,
+            msg.column,
+            msg.msg
+        ) for msg in linter.reporter.messages
+    ]
+    messages.sort(key=lambda message: (message.line, message.column))
+    return messages
+
+def get_pylint_linter(
+        config=engine.DEFAULT_CONFIG,
+        timings=None,
+        prosper_config=None
+):
+    """this process's linter for ``config``, built on first use
+
+    Args:
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        timings (:obj:`profiling.Timings`, optional): collect setup/build/visitor timings
+        prosper_config (:obj:`settings.ProsperConfig`, optional): pylint options,
+            defaults to :func:`settings.load_config`
+
+    Returns:
+        :obj:`pylint.lint.PyLinter`: cached linter
+
+    """
+    if prosper_config is None:
+        prosper_config = settings.load_config()
+    linter_key = (config, prosper_config)
+    linter = _WORKER_LINTERS.get(linter_key)
+    if linter is None:
+        linter = _WORKER_LINTERS[linter_key] = build_pylint_linter(
+            config,
+            prosper_config,
+            timings=timings
+        )
+    elif linter.timings is not timings:
+        set_timings(linter, timings)
+    return linter
+
+def lint_path(
+        filepath,
+        line_ranges=None,
+        fast=False,
+        config=engine.DEFAULT_CONFIG,
+        timings=None,
+        prosper_config=None,
+        baseline_file=None
+):
+    """lint one file, reusing this process's linter
+
+    Notes:
+        with ``line_ranges`` the stand-alone engine only grades defs/calls that overlap
+        them, pylint results are filtered by the same rule, see :func:`engine.in_line_ranges`
+
+    Args:
+        filepath (str): path to python file
+        line_ranges (:obj:`list` tuple, optional): changed (first, last) line pairs
+        fast (bool, optional): use the stand-alone engine instead of pylint
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        timings (:obj:`profiling.Timings`, optional): collect per-file timings
+        prosper_config (:obj:`settings.ProsperConfig`, optional): pylint options
+        baseline_file (str, optional): drop the hits recorded here, see :mod:`baseline`
+
+    Returns:
+        :obj:`list` :obj:`engine.Message`: messages sorted by line
+
+    """
+    messages = _lint_path(
+        filepath,
+        line_ranges,
+        fast,
+        config,
+        timings,
+        prosper_config
+    )
+    if baseline_file is None or not messages:
+        return messages
+    from pylint_prosper import baseline
+    return baseline.apply(
+        baseline.load(baseline_file),
+        filepath,
+        messages
+    )
+
+def _lint_path(
+        filepath,
+        line_ranges,
+        fast,
+        config,
+        timings,
+        prosper_config
+):
+    """does the work for :func:`lint_path`"""
+    with contextlib.ExitStack() as stack:
+        if timings is not None:
+            stack.enter_context(timings.phase('lint_file'))
+        if fast:
+            messages = engine.lint_file(
+                filepath,
+                config,
+                line_ranges=line_ranges,
+                timings=timings
+            )
+            if timings is not None:
+                for message in messages:
+                    timings.count('messages.' + message.symbol)
+            return messages
+        messages = pylint_file(
+            get_pylint_linter(
+                config,
+                timings,
+                prosper_config
+            ),
+            filepath
+        )
+    if line_ranges is None:
+        return messages
+    return engine.in_line_ranges(
+        filepath,
+        messages,
+        line_ranges
+    )
+
+def lint_path_stats(
+        filepath,
+        line_ranges=None,
+        fast=False,
+        config=engine.DEFAULT_CONFIG,
+        record_events=False,
+        prosper_config=None,
+        baseline_file=None
+):
+    """:func:`lint_path` plus that file's own timings, for ``--stats`` workers
+
+    Args:
+        filepath (str): path to python file
+        line_ranges (:obj:`list` tuple, optional): changed (first, last) line pairs
+        fast (bool, optional): use the stand-alone engine instead of pylint
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        record_events (bool, optional): keep intervals for a speedscope dump
+        prosper_config (:obj:`settings.ProsperConfig`, optional): pylint options
+        baseline_file (str, optional): drop the hits recorded here
+
+    Returns:
+        tuple: (:obj:`list` :obj:`engine.Message`, :obj:`profiling.Timings`)
+
+    """
+    from pylint_prosper import profiling
+
+    timings = profiling.Timings(record_events=record_events)
+    messages = lint_path(
+        filepath,
+        line_ranges,
+        fast=fast,
+        config=config,
+        timings=timings,
+        prosper_config=prosper_config,
+        baseline_file=baseline_file
+    )
+    return messages, timings
+
+def _with_dependencies(
+        worker,
+        linter_key,
+        filepath,
+        line_ranges
+):
+    """``worker``'s result for ``filepath`` and the files it depends on
+
+    Args:
+        worker (callable): pylint-mode :func:`lint_path`/:func:`lint_path_stats` partial
+        linter_key (tuple): (config, prosper_config) of the linter ``worker`` uses
+        filepath (str): path to python file
+        line_ranges (:obj:`list` tuple): changed (first, last) line pairs, or None
+
+    Returns:
+        tuple: (``worker`` result, :obj:`list` str from :func:`pylint_dependencies`)
+
+    """
+    result = worker(filepath, line_ranges)
+    return result, pylint_dependencies(_WORKER_LINTERS[linter_key])
+
+def cache_fingerprint(
+        fast=False,
+        config=engine.DEFAULT_CONFIG,
+        prosper_config=None,
+        baseline_file=None
+):
+    """everything besides file content that changes lint results
+
+    Args:
+        fast (bool, optional): stand-alone engine or pylint
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        prosper_config (:obj:`settings.ProsperConfig`, optional): pylint options, only
+            matter without ``fast``, defaults to :func:`settings.load_config`
+        baseline_file (str, optional): results are cached after baseline filtering
+
+    Returns:
+        str: fingerprint for :class:`cache.ResultCache`
+
+    """
+    from pylint_prosper._version import __version__
+
+    parts = [__version__, 'fast' if fast else 'pylint', repr(tuple(config))]
+    if not fast:
+        parts.append(settings.fingerprint(prosper_config or settings.load_config()))
+    if baseline_file is not None:
+        from pylint_prosper import baseline
+        parts.append(baseline.load(baseline_file).digest)
+    return '|'.join(parts)
+
+def run(
+        paths,
+        fast=False,
+        config=engine.DEFAULT_CONFIG,
+        jobs=0,
+        result_cache=None,
+        line_ranges=None,
+        timings=None,
+        stats=None,
+        rules=None,
+        prosper_config=None,
+        limits=workers.NO_LIMITS,
+        baseline_file=None
+):
+    """lint files across ``jobs`` processes
+
+    Notes:
+        files go to the workers as the walk finds them.  Results come back in
+        discovery order no matter which worker finishes first.
+
+    Args:
+        paths (:obj:`list` :obj:`str`): files, directories or glob patterns
+        fast (bool, optional): use the stand-alone engine instead of pylint
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        jobs (int, optional): worker processes, 0 for all cores
+        result_cache (:obj:`cache.ResultCache`, optional): replay unchanged files from here
+        line_ranges (dict, optional): absolute path -> changed (first, last) line pairs.
+            Files missing from it are skipped and the cache is bypassed.
+        timings (:obj:`profiling.Timings`, optional): profile the run, forces ``jobs=1``
+            since worker timings can't be collected
+        stats (:obj:`profiling.RunStats`, optional): collect per-file statistics,
+            workers send theirs back with the results
+        rules (:obj:`walker.IgnoreRules`, optional): defaults to :func:`ignore_rules`
+        prosper_config (:obj:`settings.ProsperConfig`, optional): parsed once here and
+            shipped to the workers, defaults to :func:`settings.load_config`
+        limits (:obj:`workers.WorkerLimits`, optional): per-file timeout, worker memory
+            and recycling guards.  Files that hit one are reported as ``lint-skipped``
+            and never cached.  Not applied with ``timings``, which lints in-process.
+        baseline_file (str, optional): workers drop the hits recorded here, pass the
+            same file to :func:`cache_fingerprint`
+
+    Yields:
+        tuple: (filepath, :obj:`list` :obj:`engine.Message`) per file
+
+    """
+    if prosper_config is None:
+        prosper_config = settings.load_config()
+    if rules is None:
+        rules = ignore_rules(prosper_config)
+    files = iter_paths(paths, rules)
+    if line_ranges is not None:
+        files = (filepath for filepath in files if path.abspath(filepath) in line_ranges)
+        result_cache = None  # results only cover the changed lines
+
+    if stats is None:
+        worker = functools.partial(
+            lint_path,
+            fast=fast,
+            config=config,
+            timings=timings,
+            prosper_config=None if fast else prosper_config,
+            baseline_file=baseline_file
+        )
+    else:
+        worker = functools.partial(
+            lint_path_stats,
+            fast=fast,
+            config=config,
+            record_events=timings is not None and timings.events is not None,
+            prosper_config=None if fast else prosper_config,
+            baseline_file=baseline_file
+        )
+
+    track_dependencies = result_cache is not None and not fast
+    if track_dependencies:  # pylint results depend on the imported modules too
+        worker = functools.partial(
+            _with_dependencies,
+            worker,
+            (config, prosper_config)
+        )
+
+    order = collections.deque()  # (filepath, cached messages or None, cache key)
+
+    def misses():
+        """feed the workers as the walk goes, cache hits only queue up for output"""
+        for filepath in files:
+            key = result_cache.key(filepath) if result_cache is not None else None
+            messages = result_cache.get(key) if key else None
+            order.append((filepath, messages, key))
+            if messages is None:
+                yield filepath, line_ranges[path.abspath(filepath)] if line_ranges else None
+
+    def cached_ahead():
+        """cache hits queued in front of the next worker result"""
+        while order and order[0][1] is not None:
+            filepath, messages, _ = order.popleft()
+            if stats is not None:
+                stats.cached_files += 1
+            yield filepath, messages
+
+    if timings is None and limits != workers.NO_LIMITS:
+        results = workers.supervised_map(
+            misses(),
+            worker,
+            jobs,
+            limits
+        )
+    else:
+        results = _map_files(
+            misses(),
+            worker,
+            1 if timings is not None else jobs
+        )
+    for messages in results:
+        for cached in cached_ahead():
+            yield cached
+        filepath, _, key = order.popleft()
+        dependencies = ()
+        if isinstance(messages, workers.Skipped):
+            messages = skipped_result(
+                filepath,
+                messages.reason,
+                stats
+            )
+            key = None  # next run tries again
+        elif track_dependencies:
+            messages, dependencies = messages
+        if stats is not None:
+            messages, file_timings = messages
+            stats.add_file(filepath, file_timings)
+            if timings is not None:
+                timings.merge(file_timings)
+        if key:
+            result_cache.put(
+                key,
+                messages,
+                dependencies
+            )
+        yield filepath, messages
+    for cached in cached_ahead():
+        yield cached
+
+    if result_cache is not None:
+        result_cache.prune()
+
+def fix(
+        paths,
+        config=engine.DEFAULT_CONFIG,
+        jobs=0,
+        line_ranges=None,
+        rules=None
+):
+    """rewrite offending arg layouts in place across ``jobs`` processes
+
+    Args:
+        paths (:obj:`list` :obj:`str`): files, directories or glob patterns
+        config (:obj:`engine.LintConfig`, optional): args checker options
+        jobs (int, optional): worker processes, 0 for all cores
+        line_ranges (dict, optional): absolute path -> changed (first, last) line pairs,
+            only defs/calls overlapping them are rewritten
+        rules (:obj:`walker.IgnoreRules`, optional): defaults to :func:`ignore_rules`
+
+    Yields:
+        :obj:`fixer.FixResult`: per file, in discovery order
+
+    """
+    from pylint_prosper import fixer
+
+    files = iter_paths(paths, rules)
+    if line_ranges is not None:
+        files = (filepath for filepath in files if path.abspath(filepath) in line_ranges)
+    tasks = (
+        (filepath, line_ranges[path.abspath(filepath)] if line_ranges else None)
+        for filepath in files
+    )
+    return _map_files(
+        tasks,
+        functools.partial(fixer.fix_file, config=config),
+        jobs
+    )
+
+def skipped_result(
+        filepath,
+        reason,
+        stats=None
+):
+    """worker result for a file a :obj:`workers.WorkerLimits` guard gave up on
+
+    Args:
+        filepath (str): path that was skipped
+        reason (str): which limit was hit
+        stats (:obj:`profiling.RunStats`, optional): shape the result for ``--stats``
+
+    Returns:
+        :obj:`list` :obj:`engine.Message`: one ``lint-skipped`` message, paired with
+            empty timings when ``stats`` is set
+
+    """
+    messages = [engine.Message(
+        filepath,
+        engine.module_name(filepath),
+        engine.SKIPPED[0],
+        engine.SKIPPED[1],
+        1,
+        0,
+        'Skipped, ' + reason
+    )]
+    if stats is None:
+        return messages
+    from pylint_prosper import profiling
+    return messages, profiling.Timings()
+
+def _run_chunk(worker, tasks):
+    """worker-side loop over one chunk of (filepath, line_ranges) tasks"""
+    return [worker(filepath, line_ranges) for filepath, line_ranges in tasks]
+
+def _map_files(
+        tasks,
+        worker,
+        jobs
+):
+    """apply ``worker`` to every task, in order, across ``jobs`` processes
+
+    Notes:
+        ``tasks`` is consumed lazily, workers start on the first chunk while the
+        rest is still being discovered
+
+    Args:
+        tasks (iterable): (filepath, changed line pairs or None) per file
+        worker (callable): picklable ``worker(filepath, line_ranges)`` callable
+        jobs (int): worker processes, 0 for all cores
+
+    Yields:
+        whatever ``worker`` returns, in ``tasks`` order
+
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tasks = iter(tasks)
+    head = list(itertools.islice(tasks, 2))
+    if jobs == 1 or len(head) <= 1:
+        for filepath, line_ranges in itertools.chain(head, tasks):
+            yield worker(filepath, line_ranges)
+        return
+
+    tasks = itertools.chain(head, tasks)
+    pending = collections.deque()
+    with futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            chunk = list(itertools.islice(tasks, STREAM_CHUNKSIZE))
+            if chunk:
+                pending.append(executor.submit(
+                    _run_chunk,
+                    worker,
+                    chunk
+                ))
+            # hand back finished results in order, block once enough work is queued
+            while pending and (
+                    pending[0].done() or not chunk or len(pending) > jobs * 4
+            ):
+                for result in pending.popleft().result():
+                    yield result
+            if not chunk:
+                return
@@ -0,0 +1,317 @@
+"""settings.py: find, parse and merge prosper_lint config once per run
+
+Sources, later ones win:
+
+* the packaged ``.prosperlintrc``
+* the project's ``pyproject.toml`` (``[tool.pylint.<section>]``, ``[tool.prosper_lint]``)
+* the project's ``setup.cfg`` (``[pylint.<section>]``, ``[prosper_lint]``)
+* the project's ``.prosperlintrc``
+
+``[prosper_lint]`` is kept out of the packaged rc: plain pylint reads every
+section of an rcfile and chokes on prosper_lint's own keys
+
+The merged result is a :obj:`ProsperConfig` of plain tuples: hashable, picklable
+and cheap to ship to worker processes, which never touch the rc files
+
+"""
+import collections
+import configparser
+import hashlib
+import io
+import os
+from os import path
+import warnings
+
+try:  # pragma: no cover
+    import tomllib as toml_parser
+except ImportError:
+    try:
+        import toml as toml_parser
+    except ImportError:
+        toml_parser = None
+
+from pylint_prosper import engine
+from pylint_prosper import workers
+
+HERE = path.abspath(path.dirname(__file__))
+RCFILE = path.join(HERE, '.prosperlintrc')
+PROJECT_FILES = ('pyproject.toml', 'setup.cfg', '.prosperlintrc')  # lowest priority first
+PROSPER_SECTION = 'PROSPER_LINT'
+
+ProsperConfig = collections.namedtuple(
+    'ProsperConfig',
+    [
+        'sources',   # ((filepath, sha1), ...) that contributed, in merge order
+        'sections',  # ((SECTION, ((option, value), ...)), ...), values as rc strings
+    ]
+)
+
+_PARSED = {}  # filepath -> (mtime_ns, size, sha1, sections)
+
+def _rc_value(value):
+    """TOML value -> the string an rc file would hold"""
+    if isinstance(value, bool):
+        return 'y' if value else 'n'
+    if isinstance(value, (list, tuple)):
+        return ','.join(_rc_value(item) for item in value)
+    return str(value)
+
+def _parse_ini(text, prefix=None):
+    """rc/setup.cfg text -> {SECTION: {option: value}}
+
+    Args:
+        text (str): file contents
+        prefix (str, optional): only read ``[<prefix>.<section>]`` and ``[prosper_lint]``
+
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_string(text)
+    sections = {}
+    for section in parser.sections():
+        name = section
+        if section.upper() != PROSPER_SECTION and prefix is not None:
+            if not section.startswith(prefix + '.'):
+                continue
+            name = section[len(prefix) + 1:]
+        sections[name.upper()] = dict(parser.items(section))
+    return sections
+
+def _parse_pyproject(text, filepath):
+    """pyproject.toml text -> {SECTION: {option: value}}"""
+    if '[tool.pylint' not in text and '[tool.prosper_lint' not in text:
+        return {}
+    if toml_parser is None:
+        warnings.warn(
+            'skipping pylint/prosper_lint settings in {}, `pip install toml` to read them'.format(
+                filepath
+            )
+        )
+        return {}
+    tool = toml_parser.loads(text).get('tool', {})
+    sections = {}
+    for name, options in tool.get('pylint', {}).items():
+        if isinstance(options, dict):
+            sections[name.upper()] = {key: _rc_value(value) for key, value in options.items()}
+    if isinstance(tool.get('prosper_lint'), dict):
+        sections[PROSPER_SECTION] = {
+            key: _rc_value(value) for key, value in tool['prosper_lint'].items()
+        }
+    return sections
+
+def parse_file(filepath):
+    """parse one config file, reusing the last parse while mtime or content match
+
+    Args:
+        filepath (str): ``.prosperlintrc``, ``setup.cfg`` or ``pyproject.toml``
+
+    Returns:
+        tuple: (sha1, {SECTION: {option: value}})
+
+    """
+    stat = os.stat(filepath)
+    cached = _PARSED.get(filepath)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2], cached[3]
+
+    with open(filepath, 'rb') as config_fh:
+        data = config_fh.read()
+    sha1 = hashlib.sha1(data).hexdigest()
+    if cached and cached[2] == sha1:
+        sections = cached[3]  # touched, not changed
+    else:
+        text = io.TextIOWrapper(io.BytesIO(data), encoding='utf_8_sig').read()
+        basename = path.basename(filepath)
+        if basename == 'pyproject.toml':
+            sections = _parse_pyproject(text, filepath)
+        elif basename == 'setup.cfg':
+            sections = _parse_ini(text, prefix='pylint')
+        else:
+            sections = _parse_ini(text)
+    _PARSED[filepath] = (stat.st_mtime_ns, stat.st_size, sha1, sections)
+    return sha1, sections
+
+def find_project_dir(start='.'):
+    """nearest directory at or above ``start`` with a project config file
+
+    Notes:
+        stops at the git checkout root
+
+    Args:
+        start (str, optional): where to start looking
+
+    Returns:
+        str: directory, or None when there's no project config
+
+    """
+    current = path.abspath(start)
+    while True:
+        if any(path.isfile(path.join(current, name)) for name in PROJECT_FILES):
+            return current
+        parent = path.dirname(current)
+        if parent == current or path.exists(path.join(current, '.git')):
+            return None
+        current = parent
+
+def load_config(
+        start='.',
+        rcfile=RCFILE
+):
+    """merge the packaged rc file with the project's config files
+
+    Args:
+        start (str, optional): where to look for project config
+        rcfile (str, optional): base rc file, normally the packaged one
+
+    Returns:
+        :obj:`ProsperConfig`: frozen, merged settings
+
+    """
+    filepaths = [rcfile]
+    project_dir = find_project_dir(start)
+    if project_dir is not None:
+        filepaths.extend(path.join(project_dir, name) for name in PROJECT_FILES)
+
+    sources = []
+    merged = collections.OrderedDict()
+    for filepath in filepaths:
+        if not path.isfile(filepath) or filepath in (source for source, _ in sources):
+            continue
+        sha1, sections = parse_file(filepath)
+        sources.append((filepath, sha1))
+        for section, options in sections.items():
+            merged.setdefault(section, collections.OrderedDict()).update(options)
+
+    return ProsperConfig(
+        sources=tuple(sources),
+        sections=tuple(
+            (section, tuple(options.items()))
+            for section, options in merged.items()
+        ),
+    )
+
+def get_option(
+        prosper_config,
+        option,
+        section=None,
+        default=None
+):
+    """look up one option
+
+    Args:
+        prosper_config (:obj:`ProsperConfig`): merged settings
+        option (str): option name, ``single-line-args-limit``
+        section (str, optional): only look here, any section when None
+        default (str, optional): returned when the option isn't set
+
+    Returns:
+        str: rc-style value
+
+    """
+    for section_name, options in reversed(prosper_config.sections):
+        if section is not None and section_name != section:
+            continue
+        for name, value in options:
+            if name == option:
+                return value
+    return default
+
+def fingerprint(prosper_config):
+    """stable digest of the merged settings for cache keys
+
+    Args:
+        prosper_config (:obj:`ProsperConfig`): merged settings
+
+    Returns:
+        str: sha1 hex digest
+
+    """
+    return hashlib.sha1(repr(prosper_config.sections).encode('utf-8')).hexdigest()
+
+def lint_config(
+        prosper_config,
+        kevlin_func_args=None,
+        single_line_args_limit=None
+):
+    """args checker options: command line, then config files, then defaults
+
+    Args:
+        prosper_config (:obj:`ProsperConfig`): merged settings
+        kevlin_func_args (bool, optional): command line override
+        single_line_args_limit (int, optional): command line override
+
+    Returns:
+        :obj:`engine.LintConfig`: options for the engine and the pylint plugin
+
+    """
+    if kevlin_func_args is None:
+        value = get_option(prosper_config, 'kevlin-func-args')
+        if value is None:
+            kevlin_func_args = engine.DEFAULT_CONFIG.kevlin_func_args
+        else:
+            kevlin_func_args = value.strip().lower() in ('y', 'yes', 'true', '1')
+    if single_line_args_limit is None:
+        single_line_args_limit = int(get_option(
+            prosper_config,
+            'single-line-args-limit',
+            default=engine.DEFAULT_CONFIG.single_line_args_limit
+        ))
+    return engine.LintConfig(
+        kevlin_func_args=kevlin_func_args,
+        single_line_args_limit=single_line_args_limit,
+    )
+
+def _number(
+        prosper_config,
+        option,
+        value,
+        convert
+):
+    """command line ``value``, else ``[prosper_lint] option``, 0/empty means unset"""
+    if value is None:
+        value = get_option(
+            prosper_config,
+            option,
+            section=PROSPER_SECTION
+        )
+        value = convert(value) if value and value.strip() else None
+    return value or None
+
+def worker_limits(
+        prosper_config,
+        timeout=None,
+        max_memory=None,
+        max_files=None
+):
+    """runner guards: command line, then config files, off by default
+
+    Args:
+        prosper_config (:obj:`ProsperConfig`): merged settings
+        timeout (float, optional): command line ``--timeout`` seconds
+        max_memory (int, optional): command line ``--max-memory`` MiB
+        max_files (int, optional): command line ``--max-files-per-worker``
+
+    Returns:
+        :obj:`workers.WorkerLimits`: limits for :func:`runner.run`
+
+    """
+    max_memory = _number(
+        prosper_config,
+        'max-memory',
+        max_memory,
+        int
+    )
+    return workers.WorkerLimits(
+        timeout=_number(
+            prosper_config,
+            'timeout',
+            timeout,
+            float
+        ),
+        max_rss=max_memory * workers.MIB if max_memory else None,
+        max_files=_number(
+            prosper_config,
+            'max-files-per-worker',
+            max_files,
+            int
+        ),
+    )
@@ -0,0 +1,374 @@
+"""walker.py: concurrent python file discovery that honors ignore files
+
+Directory listings are fetched ahead on a thread pool (``os.scandir`` drops the
+GIL) while files are yielded in the same sorted order ``os.walk`` would give
+
+"""
+import collections
+from concurrent import futures
+import fnmatch
+import os
+from os import path
+import re
+
+from pylint_prosper import settings
+
+GITIGNORE = '.gitignore'
+WALK_THREADS = min(32, (os.cpu_count() or 1) + 4)
+
+IgnoreRules = collections.namedtuple(
+    'IgnoreRules',
+    [
+        'ignore',           # pylint ``ignore``: base names
+        'ignore_patterns',  # pylint ``ignore-patterns``: compiled regexes on base names
+        'exclude',          # ``[prosper_lint] exclude``: globs on cwd-relative paths
+        'gitignore',        # honor .gitignore files
+    ]
+)
+DEFAULT_RULES = IgnoreRules(
+    ignore=('CVS',),
+    ignore_patterns=(),
+    exclude=(),
+    gitignore=True,
+)
+
+GitignoreRule = collections.namedtuple(
+    'GitignoreRule',
+    [
+        'regex',
+        'negate',
+        'dir_only',
+        'anchored',
+    ]
+)
+
+def _split_list(value):
+    """comma or newline separated rc value -> tuple"""
+    return tuple(item.strip() for item in re.split(r'[,\n]', value) if item.strip())
+
+def load_ignore_rules(prosper_config, gitignore=True):
+    """ignore options from merged prosper_lint settings
+
+    Args:
+        prosper_config (:obj:`settings.ProsperConfig`): from :func:`settings.load_config`
+        gitignore (bool, optional): honor .gitignore files while walking
+
+    Returns:
+        :obj:`IgnoreRules`: rules for :func:`iter_python_files`
+
+    """
+    ignore = settings.get_option(
+        prosper_config,
+        'ignore',
+        section='MASTER',
+        default=','.join(DEFAULT_RULES.ignore)
+    )
+    ignore_patterns = settings.get_option(
+        prosper_config,
+        'ignore-patterns',
+        section='MASTER',
+        default=''
+    )
+    exclude = settings.get_option(
+        prosper_config,
+        'exclude',
+        section=settings.PROSPER_SECTION,
+        default=''
+    )
+    return IgnoreRules(
+        ignore=_split_list(ignore),
+        ignore_patterns=tuple(re.compile(pattern) for pattern in _split_list(ignore_patterns)),
+        exclude=_split_list(exclude),
+        gitignore=gitignore,
+    )
+
+def _translate_glob(pattern):
+    """gitignore glob -> regex source, ``*`` stays inside one path segment"""
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith('**/', index):
+            parts.append('(?:.*/)?')
+            index += 3
+            continue
+        if pattern.startswith('**', index):
+            parts.append('.*')
+            index += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            close = pattern.find(']', index + 1)
+            if close < 0:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[index + 1:close]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                index = close
+        elif char == '\\' and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return ''.join(parts)
+
+def parse_gitignore(text):
+    """compile the rules in one .gitignore file
+
+    Args:
+        text (str): .gitignore contents
+
+    Returns:
+        :obj:`list` :obj:`GitignoreRule`: rules in file order
+
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line
+        line = line.lstrip('/')
+        if not line:
+            continue
+        rules.append(GitignoreRule(
+            regex=re.compile('^' + _translate_glob(line) + '$'),
+            negate=negate,
+            dir_only=dir_only,
+            anchored=anchored,
+        ))
+    return rules
+
+def gitignored(
+        gitignores,
+        abs_path,
+        is_dir
+):
+    """apply stacked .gitignore rules, last match wins
+
+    Args:
+        gitignores (tuple): (base directory, rules) pairs, outermost first
+        abs_path (str): absolute path to check
+        is_dir (bool): ``abs_path`` is a directory
+
+    Returns:
+        bool: path is ignored
+
+    """
+    ignored = False
+    name = path.basename(abs_path)
+    for base_dir, rules in gitignores:
+        relpath = abs_path[len(base_dir):].lstrip(os.sep).replace(os.sep, '/')
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(relpath if rule.anchored else name):
+                ignored = not rule.negate
+    return ignored
+
+def _ignored(
+        rules,
+        abs_path,
+        name,
+        cwd_prefix
+):
+    """pylint ``ignore``/``ignore-patterns`` and ``exclude`` checks"""
+    if name in rules.ignore:
+        return True
+    if any(pattern.match(name) for pattern in rules.ignore_patterns):
+        return True
+    if rules.exclude:
+        relpath = abs_path
+        if abs_path.startswith(cwd_prefix):
+            relpath = abs_path[len(cwd_prefix):]
+        relpath = relpath.replace(os.sep, '/')
+        return any(
+            fnmatch.fnmatch(relpath, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in rules.exclude
+        )
+    return False
+
+def glob_ignored(rules, filepath):
+    """``rules`` minus .gitignore for a glob match, an ignored parent counts too
+
+    Args:
+        rules (:obj:`IgnoreRules`): what to skip
+        filepath (str): path the glob turned up
+
+    Returns:
+        bool: path is ignored
+
+    """
+    cwd_prefix = path.join(os.getcwd(), '')
+    current = path.abspath(filepath)
+    while True:
+        if _ignored(
+                rules,
+                current,
+                path.basename(current),
+                cwd_prefix
+        ):
+            return True
+        current = path.dirname(current)
+        if not current.startswith(cwd_prefix):
+            return False
+
+def _read_gitignore(dirpath):
+    """rules from ``dirpath``'s .gitignore, empty if there isn't one"""
+    try:
+        with open(path.join(dirpath, GITIGNORE), 'r') as gitignore_fh:
+            return parse_gitignore(gitignore_fh.read())
+    except (OSError, UnicodeDecodeError):
+        return []
+
+def _scan(dirpath):
+    """one directory listing, run on the thread pool
+
+    Returns:
+        tuple: (sorted files, sorted subdirectories, .gitignore rules)
+
+    """
+    files = []
+    dirs = []
+    has_gitignore = False
+    try:
+        for entry in os.scandir(dirpath):  # no context manager before 3.6
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.is_dir():
+                    continue  # symlinked directory, os.walk doesn't descend into those
+                elif entry.name.endswith('.py'):
+                    files.append(entry.name)
+                elif entry.name == GITIGNORE:
+                    has_gitignore = True
+            except OSError:
+                continue  # broken symlink, permissions
+    except OSError:
+        pass  # vanished or unreadable, os.walk skips these too
+    files.sort()
+    dirs.sort()
+    return files, dirs, _read_gitignore(dirpath) if has_gitignore else []
+
+def _parent_gitignores(abs_dir):
+    """.gitignore rules from the git checkout root down to ``abs_dir``'s parent"""
+    if path.exists(path.join(abs_dir, '.git')):
+        return ()  # walking from the checkout root
+    parents = []
+    current = path.dirname(abs_dir)
+    while True:
+        parents.append(current)
+        if path.exists(path.join(current, '.git')):
+            break
+        parent = path.dirname(current)
+        if parent == current:
+            return ()  # not in a git checkout
+        current = parent
+    return tuple(
+        (parent, rules)
+        for parent, rules in ((parent, _read_gitignore(parent)) for parent in reversed(parents))
+        if rules
+    )
+
+def _walk_dir(
+        top,
+        rules,
+        executor
+):
+    """yield python files under ``top`` in sorted depth-first order"""
+    abs_top = path.abspath(top)
+    cwd_prefix = path.join(os.getcwd(), '')
+    gitignores = _parent_gitignores(abs_top) if rules.gitignore else ()
+    # (display path, absolute path, parent .gitignore stack, listing future)
+    stack = [(top, abs_top, gitignores, executor.submit(_scan, abs_top))]
+    while stack:
+        dirpath, abs_dir, gitignores, listing = stack.pop()
+        files, dirs, gitignore_rules = listing.result()
+        if rules.gitignore and gitignore_rules:
+            gitignores = gitignores + ((abs_dir, gitignore_rules),)
+
+        for filename in files:
+            abs_path = path.join(abs_dir, filename)
+            if _ignored(
+                    rules,
+                    abs_path,
+                    filename,
+                    cwd_prefix
+            ):
+                continue
+            if gitignores and gitignored(
+                    gitignores,
+                    abs_path,
+                    False
+            ):
+                continue
+            yield path.join(dirpath, filename)
+
+        children = []
+        for dirname in dirs:
+            abs_path = path.join(abs_dir, dirname)
+            if rules.gitignore and dirname == '.git':
+                continue
+            if _ignored(
+                    rules,
+                    abs_path,
+                    dirname,
+                    cwd_prefix
+            ):
+                continue
+            if gitignores and gitignored(
+                    gitignores,
+                    abs_path,
+                    True
+            ):
+                continue
+            children.append((
+                path.join(dirpath, dirname),
+                abs_path,
+                gitignores,
+                executor.submit(_scan, abs_path)  # prefetch while files are linted
+            ))
+        stack.extend(reversed(children))
+
+def iter_python_files(
+        paths,
+        rules=DEFAULT_RULES,
+        threads=WALK_THREADS
+):
+    """expand files and directories into python files, lazily
+
+    Notes:
+        explicitly named files are always yielded.  Directory contents are
+        filtered through ``rules``.
+
+    Args:
+        paths (iterable): files or directories to lint
+        rules (:obj:`IgnoreRules`, optional): what to skip while walking
+        threads (int, optional): concurrent directory listings
+
+    Yields:
+        str: path to python file, directories walked in sorted order
+
+    """
+    with futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        for lint_path in paths:
+            if not path.isdir(lint_path):
+                yield lint_path
+                continue
+            for filepath in _walk_dir(
+                    lint_path,
+                    rules,
+                    executor
+            ):
+                yield filepath
@@ -0,0 +1,245 @@
+"""workers.py: supervised worker processes for guarded prosper_lint runs
+
+Every worker lints one file at a time, so a file that runs past the timeout or
+pushes its worker past the memory limit is killed on its own: the file is
+reported as skipped, a fresh worker takes over and the rest of the run carries on
+
+"""
+import collections
+import multiprocessing
+from multiprocessing import connection
+import os
+from time import monotonic
+
+POLL_SECONDS = 0.1  # RSS sampling interval while files are in flight
+MIB = 1024 * 1024
+
+WorkerLimits = collections.namedtuple(
+    'WorkerLimits',
+    [
+        'timeout',    # wall-clock seconds per file
+        'max_rss',    # bytes of resident memory per worker
+        'max_files',  # files per worker before it's replaced
+    ]
+)
+NO_LIMITS = WorkerLimits(
+    timeout=None,
+    max_rss=None,
+    max_files=None,
+)
+
+Skipped = collections.namedtuple('Skipped', ['reason'])  # stands in for a worker result
+
+def rss_bytes(pid):
+    """resident memory of a process, from ``/proc``
+
+    Args:
+        pid (int): process id
+
+    Returns:
+        int: bytes, None where ``/proc`` isn't available
+
+    """
+    try:
+        with open('/proc/{}/statm'.format(pid), 'rb') as statm_fh:
+            return int(statm_fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _worker_main(conn, worker):
+    """child loop: run ``worker`` on tasks from ``conn`` until told to stop"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        index, filepath, line_ranges = task
+        try:
+            reply = (index, None, worker(filepath, line_ranges))
+        except Exception as err:  # re-raised in the parent, like ProcessPoolExecutor
+            reply = (index, err, None)
+        try:
+            conn.send(reply)
+        except Exception as err:  # unpicklable result or exception
+            conn.send((index, RuntimeError('{}: {}'.format(type(err).__name__, err)), None))
+
+class Worker(object):
+    """one child process and the file it's working on
+
+    Args:
+        worker (callable): picklable ``worker(filepath, line_ranges)`` callable
+
+    """
+    def __init__(self, worker):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(child_conn, worker),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.index = None  # task in flight
+        self.deadline = None
+        self.files = 0
+
+    def submit(
+            self,
+            index,
+            task,
+            timeout
+    ):
+        """hand one (filepath, line_ranges) task to the child"""
+        self.conn.send((index,) + tuple(task))
+        self.index = index
+        self.deadline = monotonic() + timeout if timeout else None
+        self.files += 1
+
+    def stop(self):
+        """let the child finish and exit"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass  # already gone
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        """end the child now, mid-file or not"""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+def _over_rss(current, limits):
+    """``current`` worker's resident memory is past ``limits.max_rss``"""
+    return bool(limits.max_rss) and (rss_bytes(current.process.pid) or 0) > limits.max_rss
+
+def _over_limits(current, limits):
+    """idle ``current`` worker should be replaced before its next file"""
+    if limits.max_files and current.files >= limits.max_files:
+        return True
+    return _over_rss(current, limits)
+
+def supervised_map(
+        tasks,
+        worker,
+        jobs,
+        limits=NO_LIMITS
+):
+    """apply ``worker`` to every task, in order, in guarded worker processes
+
+    Notes:
+        ``tasks`` is consumed lazily, only as workers free up.  ``max_rss`` is
+        sampled from ``/proc`` while a file is in flight and checked again after
+        each file, elsewhere only ``timeout`` and ``max_files`` apply.
+
+    Args:
+        tasks (iterable): (filepath, changed line pairs or None) per file
+        worker (callable): picklable ``worker(filepath, line_ranges)`` callable
+        jobs (int): worker processes, 0 for all cores
+        limits (:obj:`WorkerLimits`, optional): per-file and per-worker guards
+
+    Yields:
+        whatever ``worker`` returns, or :obj:`Skipped` for files that hit a limit,
+        in ``tasks`` order
+
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tasks = enumerate(tasks)
+    backlog = jobs * 32  # finished results held back waiting for a slow file
+    workers = []
+    results = {}
+    next_index = 0
+    dispatched = 0
+    exhausted = False
+
+    def replace(
+            current,
+            index,
+            reason
+    ):
+        """kill ``current``, record why its file was skipped"""
+        current.kill()
+        workers.remove(current)
+        results[index] = Skipped(reason)
+
+    try:
+        while True:
+            idle = [current for current in workers if current.index is None]
+            while not exhausted and dispatched - next_index < backlog:
+                if not idle and len(workers) >= jobs:
+                    break
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                if not idle:
+                    workers.append(Worker(worker))
+                    idle.append(workers[-1])
+                idle.pop().submit(
+                    task[0],
+                    task[1],
+                    limits.timeout
+                )
+                dispatched += 1
+
+            while next_index in results:
+                yield results.pop(next_index)
+                next_index += 1
+            busy = [current for current in workers if current.index is not None]
+            if not busy:
+                if exhausted:
+                    return
+                continue
+
+            wait_for = None
+            if limits.timeout:
+                wait_for = max(0, min(current.deadline for current in busy) - monotonic())
+            if limits.max_rss:
+                wait_for = POLL_SECONDS if wait_for is None else min(wait_for, POLL_SECONDS)
+            ready = connection.wait(
+                [current.conn for current in busy],
+                wait_for
+            )
+
+            for current in busy:
+                index = current.index
+                if current.conn in ready:
+                    try:
+                        _, error, result = current.conn.recv()
+                    except EOFError:  # crashed or killed from outside
+                        current.process.join()
+                        replace(
+                            current,
+                            index,
+                            'worker exited with code {}'.format(current.process.exitcode)
+                        )
+                        continue
+                    if error is not None:
+                        raise error
+                    results[index] = result
+                    current.index = None
+                    if _over_limits(current, limits):
+                        current.stop()
+                        workers.remove(current)  # recycled, a fresh one starts on demand
+                elif current.deadline is not None and monotonic() >= current.deadline:
+                    replace(
+                        current,
+                        index,
+                        'timed out after {:g}s'.format(limits.timeout)
+                    )
+                elif _over_rss(current, limits):
+                    replace(
+                        current,
+                        index,
+                        'worker used more than {:g} MiB'.format(limits.max_rss / MIB)
+                    )
+    finally:
+        for current in workers:
+            if current.index is None:
+                current.stop()
+            else:
+                current.kill()
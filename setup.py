@@ -138,12 +138,12 @@ setup(
     },
     entry_points={
         'console_scripts': [
-            'prosper_lint=pylint_prosper.prosper_lint.py:run_main'
+            'prosper_lint=pylint_prosper.prosper_lint:run_main'
         ]
     },
     install_requires=[
         'ProsperCommon',
-        'pylint_quotes',
+        'pylint_quotes>=0.1.9,<0.3',  # quotes_checker overrides its private methods
         'pylint',
         'plumbum~=1.6.3'
     ],
@@ -157,6 +157,9 @@ setup(
             'sphinx',
             'sphinxcontrib-napoleon',
             'semantic-version'
+        ],
+        'msgpack':[
+            'msgpack'
         ]
     },
     cmdclass={
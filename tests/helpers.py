@@ -1,5 +1,7 @@
 """generic test helpers"""
+import io
 from os import path
+import tokenize
 
 import pylint.testutils
 import astroid
@@ -10,3 +12,7 @@ ROOT = path.join(path.dirname(HERE), 'pylint_prosper')
 class ProsperCheckerTestCase(pylint.testutils.CheckerTestCase):
     """instance of checker for pylint tests"""
     pass
+
+def tokenize_str(source):
+    """``tokenize`` tokens of ``source``, the list pylint hands token checkers"""
+    return list(tokenize.generate_tokens(io.StringIO(source).readline))
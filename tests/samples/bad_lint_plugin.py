@@ -0,0 +1,27 @@
+"""a sample of bad args layout for pylint_prosper"""
+
+def bad_function(arg1,
+                 arg2,
+                 optional_arg=None
+):
+    """first arg on the def line"""
+    return arg1 + arg2 + optional_arg
+
+def bad_oneline_function(arg1, arg2, arg3):
+    """too many args for one line"""
+    return bad_function(arg1, arg2, arg3)
+
+class BadClass:
+    """class with bad methods"""
+    def bad_method(self,
+                   arg1
+    ):
+        """first arg on the def line"""
+        return bad_function(
+            arg1,
+            self
+        )
+
+    def bad_oneline_method(self, arg1, arg2, arg3):
+        """too many args for one line, even with ``self``"""
+        return arg1, arg2, arg3
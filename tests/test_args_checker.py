@@ -1,9 +1,19 @@
 """Tests for the string quote checker for class-level docstrings.
 """
+import glob
+from os import path
+import sys
+
+import pylint_prosper
+from pylint_prosper import engine
+from pylint_prosper import layout
+from pylint_prosper import profiling
 from pylint_prosper.args_checker import ArgsIndentChecker
 import helpers
 from pylint import testutils
+from pylint.reporters.ureports.nodes import Section
 import astroid
+import pytest
 
 class TestFuncArgsIndentChecker(helpers.ProsperCheckerTestCase):
     CHECKER_CLASS = ArgsIndentChecker
@@ -121,6 +131,53 @@ def my_oneliner(arg1, arg2, arg3, arg4):  #@
         ):
             self.checker.visit_functiondef(block)
 
+    def test_too_many_oneline_varargs(self):
+        """annotated ``*args``/``**kwargs`` count toward the one-line limit without tokens"""
+        bad_oneline_func = '''
+def my_oneliner(arg1, *args: int, **kwargs: str):  #@
+    pass
+'''
+        block = astroid.extract_node(bad_oneline_func)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=2,
+                args=2
+            )
+        ):
+            self.checker.visit_functiondef(block)
+
+    def test_good_function_varargs(self):
+        """without tokens, unannotated ``*args``/``**kwargs`` have no line to count on"""
+        good_function = '''
+def my_good_function(  #@
+        arg1,
+        *args,
+        **kwargs
+):
+    pass
+'''
+        block = astroid.extract_node(good_function)
+        with self.assertNoMessages():
+            self.checker.visit_functiondef(block)
+
+    def test_bad_function_kwonly(self):
+        """keyword-only args are part of the layout"""
+        bad_function = '''
+def my_bad_function(*, arg1,  #@
+                    arg2=None
+):
+    pass
+'''
+        block = astroid.extract_node(bad_function)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.checker.visit_functiondef(block)
+
 class TestMethodArgsIndentChecker(helpers.ProsperCheckerTestCase):
     CHECKER_CLASS = ArgsIndentChecker
 
@@ -273,6 +330,43 @@ class OneLineClass:  #@
         ):
             self.checker.visit_classdef(block)
 
+    def test_bad_method_reported_once(self):
+        """methods graded by the class visitor are skipped by the function visitor"""
+        bad_class = '''
+class BadClass:  #@
+    """class docstring"""
+    attribute = 1
+
+    def foo(self,
+            arg1
+    ):
+        pass
+
+    class Nested:
+        """nested classes are not methods"""
+'''
+        block = astroid.extract_node(bad_class)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=6
+            )
+        ):
+            self.checker.visit_classdef(block)
+            for method_node in block.mymethods():
+                self.checker.visit_functiondef(method_node)
+
+    def test_good_oneline_method_function_visitor(self):
+        """the method limit (2+1) holds when pylint visits the def directly"""
+        good_oneline_method = '''
+class OneLineClass:
+    def foo(self, arg1, arg2):  #@
+        pass
+'''
+        block = astroid.extract_node(good_oneline_method)
+        with self.assertNoMessages():
+            self.checker.visit_functiondef(block)
+
 class TestCallFuncArgsIndentChecker(helpers.ProsperCheckerTestCase):
     CHECKER_CLASS = ArgsIndentChecker
 
@@ -329,3 +423,559 @@ result = my_function(arg1,  #@
         block = astroid.extract_node(bad_call)
         with self.assertNoMessages():
             self.checker.visit_callfunc(block)
+
+    def test_too_many_oneline_keywords(self):
+        """keyword args count toward the one-line limit"""
+        bad_call = '''
+result = my_function(arg1, arg2=None, arg3=None)
+'''
+        block = astroid.extract_node(bad_call)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=2,
+                args=2
+            )
+        ):
+            self.checker.visit_callfunc(block)
+
+    def test_bad_call_layout_keywords(self):
+        """keyword args on new lines make a multi-line call"""
+        bad_call = '''
+result = my_function(arg1,
+                     optional_arg=None
+)
+'''
+        block = astroid.extract_node(bad_call)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.checker.visit_callfunc(block)
+
+    def test_visit_call(self):
+        """modern astroid ``Call`` nodes, positional and keyword args"""
+        bad_call = '''
+my_function(arg1,  #@
+            optional_arg=None
+)
+'''
+        block = astroid.extract_node(bad_call)
+        assert isinstance(block, astroid.Call)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.checker.visit_call(block)
+
+    def test_visit_call_single_arg(self):
+        """zero/one arg calls are fine, however they're laid out"""
+        good_call = '''
+my_function(nested(
+    arg1,
+    arg2
+))
+'''
+        block = astroid.extract_node(good_call)
+        with self.assertNoMessages():
+            self.checker.visit_call(block)
+
+    @testutils.set_config(single_line_args_limit=0)
+    def test_visit_call_single_arg_limit(self):
+        """the cheap skip never hides a one-arg call past a 0 limit"""
+        block = astroid.extract_node('my_function(arg1)')
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=1,
+                args=0
+            )
+        ):
+            self.checker.visit_call(block)
+
+    @testutils.set_config(skip_nested_calls=True)
+    def test_skip_nested_calls(self):
+        """calls inside an already-reported statement stay quiet"""
+        module = astroid.parse('''
+result = outer(inner(arg1, arg2, arg3),
+               other(arg1, arg2, arg3))
+result = outer(arg1, arg2, arg3)
+''')
+        self.checker.visit_module(module)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            ),
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=4,
+                args=2
+            )
+        ):
+            for call in module.nodes_of_class(astroid.Call):
+                self.checker.visit_call(call)
+
+    def test_nested_calls_default(self):
+        """every call is graded unless ``skip-nested-calls`` is on"""
+        module = astroid.parse('''
+result = outer(inner(arg1, arg2, arg3),
+               arg1)
+''')
+        self.checker.visit_module(module)
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            ),
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=2,
+                args=2
+            )
+        ):
+            for call in module.nodes_of_class(astroid.Call):
+                self.checker.visit_call(call)
+
+class TestTokenArgsIndentChecker(helpers.ProsperCheckerTestCase):
+    CHECKER_CLASS = ArgsIndentChecker
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_good_function_tokens(self):
+        """make sure good practice is supported"""
+        good_function = '''
+def my_good_function(
+        arg1,
+        arg2,
+        optional_arg=None
+):
+    return my_call(arg1, arg2)
+'''
+        with self.assertNoMessages():
+            self.checker.process_tokens(helpers.tokenize_str(good_function))
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_bad_function_tokens(self):
+        """make sure bad format is caught"""
+        bad_function = '''
+def my_bad_function(arg1,
+                    arg2,
+                    optional_arg=None
+):
+    return arg1 + arg2 + optional_arg
+'''
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.checker.process_tokens(helpers.tokenize_str(bad_function))
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_bad_call_layout_tokens(self):
+        """make sure bad call format is caught"""
+        bad_call = '''
+result = my_function(arg1,
+                     lambda x, y: x + y,
+                     optional_arg=(1, 2)
+)
+'''
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.checker.process_tokens(helpers.tokenize_str(bad_call))
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_generator_arg_tokens(self):
+        """commas in a generator's ``for`` target don't split args"""
+        good_calls = '''
+found = any(tag in {1, 2} for tag, _, _ in group)
+total = sum(value
+            for key, value in items)
+'''
+        with self.assertNoMessages():
+            self.checker.process_tokens(helpers.tokenize_str(good_calls))
+        assert [
+            arg_layout.arg_count
+            for arg_layout in layout.scan_tokens(helpers.tokenize_str(good_calls))
+        ] == [1, 1]
+
+    def test_method_in_block_tokens(self):
+        """a def under an ``if`` in a class body is still a method"""
+        source = '''
+class Thing(object):
+    if DEBUG:
+        def log(self, message, level=None):
+            pass
+'''
+        assert [
+            arg_layout.is_method
+            for arg_layout in layout.scan_tokens(helpers.tokenize_str(source))
+        ] == [True]
+
+    def test_statement_paren_not_call(self):
+        """a ``(`` opening a statement doesn't call what the last statement ended with"""
+        source = '''
+month_abbr = localized_month('%b')
+(MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY) = range(5)
+'''
+        assert [
+            (arg_layout.lineno, arg_layout.arg_count)
+            for arg_layout in layout.scan_tokens(helpers.tokenize_str(source))
+        ] == [(2, 1), (3, 1)]
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_oneline_method_tokens(self):
+        """validate one-line method limits (2+1) from tokens"""
+        oneline_class = '''
+class OneLineClass(BaseClass):
+    def foo(self, arg1, arg2):
+        pass
+
+    def bar(self, arg1, arg2, arg3):
+        pass
+
+def baz(arg1, arg2, arg3):
+    pass
+'''
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=6,
+                args=2
+            ),
+            testutils.Message(
+                msg_id='invalid-oneline-function-format',
+                line=9,
+                args=2
+            )
+        ):
+            self.checker.process_tokens(helpers.tokenize_str(oneline_class))
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_visitors_skipped_tokens(self):
+        """astroid visitors step aside when token mode is on"""
+        bad_function = '''
+def my_bad_function(arg1,  #@
+                    arg2
+):
+    pass
+'''
+        block = astroid.extract_node(bad_function)
+        with self.assertNoMessages():
+            self.checker.visit_functiondef(block)
+
+    def test_tokens_skipped_default(self):
+        """token stream is ignored unless token mode is on"""
+        bad_function = '''
+def my_bad_function(arg1,
+                    arg2
+):
+    pass
+'''
+        with self.assertNoMessages():
+            self.checker.process_tokens(helpers.tokenize_str(bad_function))
+
+    @testutils.set_config(tokenize_func_args=True)
+    def test_shared_token_index(self):
+        """one index per module, string tokens kept in the same pass as the layouts"""
+        source = '''
+def my_bad_function(arg1, 'two', "three"):
+    return """doc"""
+'''
+        tokens = helpers.tokenize_str(source)
+        shared = layout.shared_index(self.linter)
+        module_tokens = shared.get(tokens)
+
+        assert shared.get(tokens) is module_tokens
+        assert module_tokens.strings == [
+            (2, 26, "'two'"),
+            (2, 33, '"three"'),
+            (3, 11, '"""doc"""'),
+        ]
+        with self.assertAddsMessages(
+            testutils.Message(
+                'invalid-oneline-function-format',
+                line=2,
+                args=2
+            )
+        ):
+            self.checker.process_tokens(tokens)
+        assert shared.get(tokens).arg_layouts == list(layout.scan_tokens(tokens))
+        assert shared.get(tokens).strings == module_tokens.strings
+
+class TestParenIndexArgsIndentChecker(helpers.ProsperCheckerTestCase):
+    CHECKER_CLASS = ArgsIndentChecker
+
+    def walk(self, source):
+        """hand the checker tokens then nodes, the way pylint does"""
+        module = astroid.parse(source)
+        self.checker.process_tokens(helpers.tokenize_str(source))
+        self.checker.visit_module(module)
+        for node in module.nodes_of_class((astroid.FunctionDef, astroid.Call)):
+            if isinstance(node, astroid.FunctionDef):
+                self.checker.visit_functiondef(node)
+            else:
+                self.checker.visit_call(node)
+
+    def test_index_keys(self):
+        """defs are keyed by line, calls by expression start and chained calls"""
+        source = '''
+def my_function(arg1,
+                arg2):
+    return arg1.method(1, 2)(3, 4, 5).other[0](6, 7)
+'''
+        parens, _ = layout.index_parens(helpers.tokenize_str(source))
+
+        assert parens.find_def(2, 2) >= 0
+        assert parens.find_def(2, 3) == -1  # arg count has to match too
+        for chained, arg_count in enumerate((2, 3, 2)):
+            record = parens.find_call(
+                4,
+                11,
+                chained,
+                arg_count
+            )
+            assert parens.arg_counts[record] == arg_count
+        assert parens.close_lines[parens.find_def(2, 2)] == 3
+
+    def test_scan_brackets_args(self):
+        """one ARG event per def/call item, lambdas and markers included"""
+        source = '''
+def my_function(arg1, *, key=lambda a, b: [a, b]):
+    pass
+'''
+        args = [
+            (token[1], bracket.item_start, bracket.item_is_marker)
+            for event, token, bracket in layout.scan_brackets(helpers.tokenize_str(source))
+            if event == layout.ARG
+        ]
+
+        assert args == [
+            (',', (2, 16), False),
+            (',', (2, 22), True),
+            (')', (2, 25), False),
+        ]
+
+    def test_varargs_lines(self):
+        """``*args``/``**kwargs`` count on the line they sit, not as one-line args"""
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.walk('''
+def my_function(arg1,
+                *args,
+                **kwargs
+):
+    pass
+''')
+
+    @pytest.mark.skipif(sys.version_info < (3, 8), reason='positional-only args')
+    def test_posonly_varargs(self):
+        """positional-only args are counted, the def is still found in the index"""
+        with self.assertNoMessages():
+            self.walk('''
+def my_function(
+        arg1,
+        /,
+        arg2,
+        *args,
+        **kwargs
+):
+    pass
+''')
+
+    def test_multiline_string_arg(self):
+        """an arg after a multi-line string is on a new line"""
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-function-arg-format',
+                line=2
+            )
+        ):
+            self.walk('''
+my_function("""first
+line""", arg2)
+''')
+
+    def test_closing_paren_default(self):
+        """closing paren placement is only checked on request"""
+        with self.assertNoMessages():
+            self.walk('''
+result = my_function(
+    arg1,
+    arg2)
+''')
+
+    @testutils.set_config(check_closing_paren=True)
+    def test_closing_paren(self):
+        """multi-line arg lists end with a dedented paren on its own line"""
+        with self.assertAddsMessages(
+            testutils.Message(
+                msg_id='invalid-closing-paren-format',
+                line=2
+            ),
+            testutils.Message(
+                msg_id='invalid-closing-paren-format',
+                line=6
+            )
+        ):
+            self.walk('''
+result = my_function(
+    arg1,
+    arg2)
+
+def my_method(
+        self,
+        arg1
+        ):
+    return [nested(
+        arg1,
+        arg2
+    )]
+''')
+
+    @testutils.set_config(check_closing_paren=True)
+    def test_closing_paren_good(self):
+        """the preferred format from the checker docstring passes"""
+        with self.assertNoMessages():
+            self.walk('''
+def my_good_func(
+        arg1,
+        arg2,
+        optional_arg=None
+):
+    return my_call(arg1, arg2), other(
+        arg1,
+        arg2
+    )
+''')
+
+class TestArgsStatsArgsIndentChecker(helpers.ProsperCheckerTestCase):
+    CHECKER_CLASS = ArgsIndentChecker
+
+    @testutils.set_config(args_stats=True)
+    def test_stats_published(self):
+        """args-stats counts defs and messages onto the checker on close"""
+        bad_function = '''
+def my_bad_function(arg1,  #@
+                    arg2
+):
+    pass
+'''
+        self.checker.open()
+        block = astroid.extract_node(bad_function)
+        self.checker.visit_functiondef(block)
+        self.checker.visit_functiondef(block)
+        self.checker.close()
+        self.linter.release_messages()
+
+        stats = self.checker.args_stats
+        assert stats['function_args_functions'] == 1
+        assert stats['function_args_calls'] == 0
+        assert stats['function_args_msg_invalid-function-arg-format'] == 1
+        assert stats['function_args_seconds'] > 0
+
+    @testutils.set_config(args_stats=True)
+    def test_stats_report(self):
+        """RP7700 renders the checker's counters whatever shape pylint's stats are"""
+        self.checker.open()
+        self.checker.visit_functiondef(astroid.extract_node('def func(arg1, arg2): pass'))
+        self.checker.close()
+
+        sect = Section('Function args statistics')
+        self.checker._report_args_stats(
+            sect,
+            self.linter.stats,
+            None
+        )
+        cells = [cell.data for cell in sect.children[-1].children]
+        assert 'functions' in cells
+        assert 'NC' in cells
+
+    def test_stats_off_by_default(self):
+        """no counters, no stats entries unless asked for"""
+        self.checker.open()
+        self.checker.visit_functiondef(astroid.extract_node('def func(arg1, arg2): pass'))
+        self.checker.close()
+
+        assert self.checker.timings is None
+        assert not self.checker.args_stats
+        assert not set(ArgsIndentChecker.TIMED_METHODS) & set(vars(self.checker))
+
+    def test_timed_methods_installed(self):
+        """timed wrappers only shadow the visitors while profiling"""
+        timings = profiling.Timings()
+        self.checker.set_timings(timings)
+        self.checker.visit_functiondef(astroid.extract_node('def func(arg1, arg2): pass'))
+        assert timings.seconds('checker.visit_functiondef') > 0
+
+        self.checker.set_timings(None)
+        assert not set(ArgsIndentChecker.TIMED_METHODS) & set(vars(self.checker))
+
+SAMPLES = path.join(helpers.HERE, 'samples')
+BATCH_SOURCES = [
+    ('good.py', 'def my_func(\n        arg1,\n        arg2\n):\n    pass\n'),
+    ('bad_def.py', 'def my_func(arg1,\n            arg2):\n    pass\n'),
+    ('oneline.py', (
+        'class Thing(object):\n    def foo(self, arg1, arg2):\n        pass\n\n'
+        'bar(1, 2, 3)\n'
+    )),
+    ('broken.py', 'def my_func(arg1,\n'),
+]
+
+def test_lint_sources():
+    """one checker grades every source, defs and calls, in input order"""
+    results = list(pylint_prosper.lint_sources(BATCH_SOURCES))
+
+    assert [name for name, _ in results] == [name for name, _ in BATCH_SOURCES]
+    found = {
+        name: [(message.msg_id, message.line) for message in messages]
+        for name, messages in results
+    }
+    assert found['good.py'] == []
+    assert found['bad_def.py'] == [('E7700', 1)]
+    assert found['oneline.py'] == [('E7701', 5)]
+    assert found['broken.py'][0][0] == 'E0001'
+    assert results[2][1][0].msg == 'Too many args for one-line.  More than 2 args'
+
+def test_lint_sources_lazy():
+    """sources are pulled one at a time and never land in astroid's module cache"""
+    pulled = []
+
+    def sources():
+        for name, source in BATCH_SOURCES:
+            pulled.append(name)
+            yield name, source
+
+    results = pylint_prosper.lint_sources(sources())
+    assert next(results)[0] == 'good.py'
+    assert pulled == ['good.py']
+    list(results)
+    assert 'bad_def' not in astroid.MANAGER.astroid_cache
+
+def test_lint_sources_matches_fast():
+    """same messages as the stand-alone engine on the samples"""
+    filepaths = sorted(glob.glob(path.join(SAMPLES, '*.py')))
+    sources = []
+    for filepath in filepaths:
+        with open(filepath) as source_fh:
+            sources.append((filepath, source_fh.read()))
+
+    for name, messages in pylint_prosper.lint_sources(
+            sources,
+            engine.LintConfig(True, 3)
+    ):
+        expected = engine.lint_file(name, engine.LintConfig(True, 3))
+        assert [message[2:] for message in messages] == [message[2:] for message in expected]
@@ -0,0 +1,68 @@
+"""Import-time budget for the plugin and CLI entry points"""
+from os import path
+import subprocess
+import sys
+
+import pytest
+
+import helpers
+
+HEAVY_MODULES = ('pylint', 'astroid', 'prosper.common')
+DEFERRED_MODULES = (  # imported by the pylint runs, --fix or lint_sources that need them
+    'pylint_prosper.args_checker',
+    'pylint_prosper.quotes_checker',
+    'pylint_prosper.batch',
+    'pylint_prosper.fixer',
+)
+
+def imported_modules(statement):
+    """modules loaded by ``statement`` in a fresh interpreter
+
+    Returns:
+        set: names in ``sys.modules`` after running ``statement``
+
+    """
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            '-c',
+            statement + '; import sys; print("\\n".join(sys.modules))'
+        ],
+        cwd=path.dirname(helpers.ROOT)
+    )
+    return set(output.decode('utf-8').split())
+
+@pytest.mark.parametrize('statement', [
+    'import pylint_prosper',
+    'import pylint_prosper._version',
+    'import pylint_prosper.engine',
+    'import pylint_prosper.prosper_lint',
+])
+def test_import_stays_light(statement):
+    """plugin package, version and CLI load without pylint/astroid/ProsperCommon"""
+    modules = imported_modules(statement)
+
+    assert not [module for module in HEAVY_MODULES if module in modules]
+
+def test_cli_skips_daemon():
+    """the CLI only loads the unix socket daemon for its own subcommands"""
+    modules = imported_modules('import pylint_prosper.prosper_lint')
+
+    assert 'pylint_prosper.daemon' not in modules
+    assert 'socketserver' not in modules
+
+def test_register_skips_version():
+    """registering the checker never resolves the package version"""
+    modules = imported_modules(
+        'import pylint_prosper, pylint.lint; '
+        'pylint_prosper.register(pylint.lint.PyLinter())'
+    )
+
+    assert 'pylint_prosper.args_checker' in modules
+    assert 'prosper.common' not in modules
+
+def test_cli_defers_checkers():
+    """modules only some runs need are left for those runs to import"""
+    modules = imported_modules('import pylint_prosper.prosper_lint')
+
+    assert not [module for module in DEFERRED_MODULES if module in modules]
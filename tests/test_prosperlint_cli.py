@@ -0,0 +1,1338 @@
+"""Tests for the prosper_lint CLI"""
+import functools
+import glob
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tokenize
+from os import path
+
+from plumbum import local
+import pytest
+
+import helpers
+from pylint_prosper import baseline
+from pylint_prosper import cache
+from pylint_prosper import changes
+from pylint_prosper import daemon
+from pylint_prosper import engine
+from pylint_prosper import fixer
+from pylint_prosper import layout
+from pylint_prosper import reporters
+from pylint_prosper import runner
+from pylint_prosper import settings
+from pylint_prosper import walker
+from pylint_prosper import workers
+from pylint_prosper.prosper_lint import ProsperLint
+
+SAMPLES = path.join(helpers.HERE, 'samples')
+
+def run_cli(*args):
+    """run prosper_lint in-process, without touching the user's cache
+
+    Returns:
+        int: exit status
+
+    """
+    if not any(arg.startswith('--cache-dir') for arg in args):
+        args = ('--no-cache',) + args
+    _, status = ProsperLint.run(['prosper_lint'] + list(args), exit=False)
+    return status
+
+def test_fast_bad_plugin(capsys):
+    """--fast reports E7700/E7701 in pylint's text layout"""
+    status = run_cli('--fast', path.join(SAMPLES, 'bad_lint_plugin.py'))
+    out = capsys.readouterr()[0].splitlines()
+
+    assert status == 2
+    assert out == [
+        '************* Module bad_lint_plugin',
+        'E:  3, 0: Argument alignment, move to new line (invalid-function-arg-format)',
+        'E: 10, 0: Too many args for one-line.  More than 2 args (invalid-oneline-function-format)',
+        'E: 12, 0: Too many args for one-line.  More than 2 args (invalid-oneline-function-format)',
+        'E: 16, 0: Argument alignment, move to new line (invalid-function-arg-format)',
+        'E: 25, 0: Too many args for one-line.  More than 2 args (invalid-oneline-function-format)',
+    ]
+
+def test_fast_perfect(capsys):
+    """--fast stays quiet on good code"""
+    status = run_cli('--fast', path.join(SAMPLES, 'perfect_lint.py'))
+
+    assert status == 0
+    assert capsys.readouterr()[0] == ''
+
+def test_fast_config(capsys):
+    """--fast honors the plugin options"""
+    status = run_cli(
+        '--fast',
+        '--kevlin-func-args=n',
+        '--single-line-args-limit=3',
+        path.join(SAMPLES, 'bad_lint_plugin.py')
+    )
+    out = capsys.readouterr()[0]
+
+    assert status == 0
+    assert out == ''
+
+def test_engine_syntax_error():
+    """unbalanced source is reported, not raised"""
+    messages = engine.lint_source('result = my_call(\n    arg1,\n')
+
+    assert [message.symbol for message in messages] == ['syntax-error']
+
+def test_module_name():
+    """module names walk up through packages"""
+    assert engine.module_name(path.join(helpers.ROOT, 'engine.py')) == 'pylint_prosper.engine'
+    assert engine.module_name(path.join(helpers.ROOT, '__init__.py')) == 'pylint_prosper'
+
+def test_expand_paths_glob():
+    """globs and directories expand once each, in stable order"""
+    files = runner.expand_paths([
+        path.join(SAMPLES, 'bad_lint_*.py'),
+        SAMPLES,
+    ])
+
+    assert [path.basename(filepath) for filepath in files] == [
+        'bad_lint_core.py',
+        'bad_lint_plugin.py',
+        'bad_lint_quotes.py',
+        'perfect_lint.py',
+    ]
+
+def test_run_jobs_stable():
+    """parallel results merge back in discovery order"""
+    serial = list(runner.run(
+        [SAMPLES, helpers.ROOT],
+        fast=True,
+        jobs=1
+    ))
+    parallel = list(runner.run(
+        [SAMPLES, helpers.ROOT],
+        fast=True,
+        jobs=2
+    ))
+
+    assert serial == parallel
+
+def test_run_pylint_reuses_linter():
+    """pylint workers register the plugin once and reuse the linter"""
+    runner._WORKER_LINTERS.clear()
+    results = dict(runner.run(
+        [SAMPLES],
+        jobs=1
+    ))
+
+    assert len(runner._WORKER_LINTERS) == 1
+    symbols = [
+        message.symbol for message in results[path.join(SAMPLES, 'bad_lint_plugin.py')]
+    ]
+    assert 'invalid-function-arg-format' in symbols
+    assert 'invalid-oneline-function-format' in symbols
+
+def test_pylint_matches_fast():
+    """pylint's visitors grade calls too, same args messages as --fast on the samples"""
+    for sample in sorted(glob.glob(path.join(SAMPLES, '*.py'))):
+        pylint_messages = [
+            message[2:] for message in runner.lint_path(sample)
+            if message.msg_id in layout.MSGS
+        ]
+        assert pylint_messages == [message[2:] for message in engine.lint_file(sample)]
+
+MULTILINE_CALLEES = '''"""calls whose callee starts above the paren"""
+
+
+def build(first, second, third):
+    """every mode reports these where the callee expression starts"""
+    message = ("abc "
+               "def {} {} {}".format(first, second, third))
+    other = (first
+             .method(first, second, third))
+    chained = first.method(
+        second
+    ).other(first, second, third)
+    joined = ("abc "
+              "{}".join(first,
+                        second))
+    return message, other, chained, joined
+'''
+
+def test_pylint_matches_fast_multiline_callee(tmpdir):
+    """pylint, --fast and lint_sources agree on calls whose callee spans lines"""
+    import pylint_prosper
+
+    sample = tmpdir.join('callees.py')
+    sample.write(MULTILINE_CALLEES)
+    pylint_messages = [
+        message[2:] for message in runner.lint_path(str(sample))
+        if message.msg_id in layout.MSGS
+    ]
+    fast_messages = [message[2:] for message in engine.lint_file(str(sample))]
+    (_, batch_messages), = pylint_prosper.lint_sources([('callees.py', MULTILINE_CALLEES)])
+
+    assert [message[:3] for message in fast_messages] == [
+        ('E7701', 'invalid-oneline-function-format', 4),
+        ('E7701', 'invalid-oneline-function-format', 6),
+        ('E7701', 'invalid-oneline-function-format', 8),
+        ('E7701', 'invalid-oneline-function-format', 10),
+    ]
+    assert pylint_messages == fast_messages
+    assert [message[2:] for message in batch_messages] == fast_messages
+
+def test_cache_replay(tmpdir, capsys):
+    """warm runs replay cached messages without linting"""
+    cache_dir = str(tmpdir.join('cache'))
+    sample = path.join(SAMPLES, 'bad_lint_plugin.py')
+    cold_status = run_cli(
+        '--fast',
+        '--cache-dir=' + cache_dir,
+        sample
+    )
+    cold_out = capsys.readouterr()[0]
+
+    result_cache = cache.ResultCache(
+        runner.cache_fingerprint(fast=True),
+        cache_dir=cache_dir
+    )
+    assert result_cache.get(result_cache.key(sample)) is not None
+
+    warm_status = run_cli(
+        '--fast',
+        '--cache-dir=' + cache_dir,
+        sample
+    )
+    assert (warm_status, capsys.readouterr()[0]) == (cold_status, cold_out)
+
+    run_cli('--clear-cache', '--cache-dir=' + cache_dir)
+    assert tmpdir.join('cache').listdir() == []
+
+def test_cache_invalidation(tmpdir):
+    """content or option changes miss the cache"""
+    sample = tmpdir.join('sample.py')
+    sample.write('def my_func(arg1, arg2):\n    pass\n')
+    result_cache = cache.ResultCache(
+        runner.cache_fingerprint(fast=True),
+        cache_dir=str(tmpdir.join('cache'))
+    )
+    key = result_cache.key(str(sample))
+    result_cache.put(key, [])
+
+    sample.write('def my_func(arg1, arg2, arg3):\n    pass\n')
+    assert result_cache.key(str(sample)) != key
+    assert runner.cache_fingerprint(fast=True) != runner.cache_fingerprint(
+        fast=True,
+        config=engine.LintConfig(True, 3)
+    )
+
+def test_cache_prune(tmpdir):
+    """oldest entries are evicted past max_entries"""
+    result_cache = cache.ResultCache(
+        'fingerprint',
+        cache_dir=str(tmpdir),
+        max_entries=2
+    )
+    keys = [prefix * 20 for prefix in ('aa', 'bb', 'cc')]
+    for age, key in enumerate(keys):
+        result_cache.put(key, [])
+        os.utime(
+            result_cache._entry_path(key),
+            (1000 - age, 1000 - age)
+        )
+    tmpdir.join('aa', 'notes.json').write('not a cache entry')
+    os.utime(str(tmpdir.join('aa', 'notes.json')), (1, 1))
+
+    assert result_cache.prune() == 1
+    assert result_cache.get(keys[2]) is None
+    assert result_cache.get(keys[0]) == []
+    assert tmpdir.join('aa', 'notes.json').check()
+
+def test_cache_clear_only_entries(tmpdir):
+    """--clear-cache on a directory with other things in it only drops cache entries"""
+    tmpdir.join('keep.py').write('x = 1\n')
+    tmpdir.join('ab', 'keep.json').ensure()
+    result_cache = cache.ResultCache(
+        'fingerprint',
+        cache_dir=str(tmpdir)
+    )
+    result_cache.put('ab' * 20, [])
+    result_cache.put('cd' * 20, [])
+
+    result_cache.clear()
+    assert sorted(item.basename for item in tmpdir.listdir()) == ['ab', 'keep.py']
+    assert tmpdir.join('ab').listdir() == [tmpdir.join('ab', 'keep.json')]
+
+def test_cache_pylint_dependencies(tmpdir):
+    """pylint results are a miss once a module they import changes"""
+    tmpdir.join('dep.py').write('class Thing(object):\n    value = 1\n')
+    user = tmpdir.join('user.py')
+    user.write('"""uses dep"""\nfrom dep import Thing\nprint(Thing.value)\n')
+    result_cache = cache.ResultCache(
+        runner.cache_fingerprint(),
+        cache_dir=str(tmpdir.join('cache'))
+    )
+    list(runner.run(
+        [str(user)],
+        jobs=1,
+        result_cache=result_cache
+    ))
+
+    key = result_cache.key(str(user))
+    with open(result_cache._entry_path(key)) as entry_fh:
+        dependencies = [row[0] for row in json.load(entry_fh)['dependencies']]
+    assert dependencies == [str(tmpdir.join('dep.py'))]
+    assert result_cache.get(key) is not None
+
+    tmpdir.join('dep.py').write('class Thing(object):\n    other_value = 1\n')
+    assert result_cache.get(key) is None
+
+SAMPLE_DIFF = """diff --git a/pkg/mod.py b/pkg/mod.py
+--- a/pkg/mod.py
++++ b/pkg/mod.py
+@@ -3,0 +4,2 @@ def stuff():
++    result = my_call(arg1,
++                     arg2)
+@@ -10 +12 @@ def other():
+-    return 1
++    return 2
+@@ -20,3 +21,0 @@ def gone():
+diff --git a/old.py b/old.py
+--- a/old.py
++++ /dev/null
+"""
+
+def test_parse_diff():
+    """hunks become merged line ranges per file"""
+    assert changes.parse_diff(SAMPLE_DIFF) == {
+        'pkg/mod.py': [(4, 5), (12, 12), (21, 21)],
+    }
+
+def test_overlaps():
+    """defs/calls are matched to changed lines by span"""
+    line_ranges = [(4, 5), (12, 12)]
+    spans = {
+        (1, 4): True,
+        (10, 20): True,
+        (6, 11): False,
+        (13, 40): False,
+    }
+
+    for (start, end), expected in spans.items():
+        assert engine.overlaps(
+            line_ranges,
+            start,
+            end
+        ) == expected
+
+def test_changed_since(tmpdir):
+    """only changed defs/calls in changed files are reported"""
+    git = local['git'][
+        '-c', 'user.name=prosper',
+        '-c', 'user.email=prosper@example.com'
+    ]
+    bad_source = 'def old_func(arg1, arg2, arg3):\n    pass\n'
+    with local.cwd(str(tmpdir)):
+        git('init', '-q')
+        tmpdir.join('untouched.py').write(bad_source)
+        tmpdir.join('edited.py').write(bad_source)
+        git('add', '.')
+        git['commit', '-q', '-m']('baseline')
+        tmpdir.join('edited.py').write(bad_source + 'def new_func(arg1, arg2, arg3):\n    pass\n')
+
+        line_ranges = changes.changed_since('HEAD')
+        results = list(runner.run(
+            ['.'],
+            fast=True,
+            jobs=1,
+            line_ranges=line_ranges
+        ))
+
+    assert list(line_ranges.values()) == [[(3, 4)]]
+    assert [path.basename(filepath) for filepath, _ in results] == ['edited.py']
+    assert [message.line for message in results[0][1]] == [3]
+
+def test_changed_since_subdir(tmpdir):
+    """untracked files keep their path when run from below the checkout root"""
+    git = local['git'][
+        '-c', 'user.name=prosper',
+        '-c', 'user.email=prosper@example.com'
+    ]
+    with local.cwd(str(tmpdir)):
+        git('init', '-q')
+        tmpdir.join('sub', 'old.py').ensure()
+        git('add', '.')
+        git['commit', '-q', '-m']('baseline')
+    tmpdir.join('sub', 'new.py').write('x = 1\n')
+
+    line_ranges = changes.changed_since('HEAD', cwd=str(tmpdir.join('sub')))
+    assert line_ranges == {
+        path.realpath(str(tmpdir.join('sub', 'new.py'))): changes.WHOLE_FILE,
+    }
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_line_ranges_def_span(tmpdir, fast):
+    """a def whose only changed line is an arg is reported in both modes"""
+    source = tmpdir.join('span.py')
+    source.write('"""span"""\ndef my_func(arg1,\n            arg2):\n    return arg1, arg2\n')
+
+    def symbols(line_ranges):
+        """arg messages for ``line_ranges``"""
+        return [
+            message.symbol for message in runner.lint_path(
+                str(source),
+                line_ranges,
+                fast=fast
+            ) if message.msg_id in layout.MSGS
+        ]
+
+    assert symbols([(3, 3)]) == ['invalid-function-arg-format']
+    assert symbols([(4, 4)]) == []
+
+def test_format_jsonl(capsys):
+    """--format=jsonl writes one parseable record per message"""
+    run_cli(
+        '--fast',
+        '--format=jsonl',
+        path.join(SAMPLES, 'bad_lint_plugin.py')
+    )
+    records = [json.loads(line) for line in capsys.readouterr()[0].splitlines()]
+
+    assert [record['message-id'] for record in records] == [
+        'E7700',
+        'E7701',
+        'E7701',
+        'E7700',
+        'E7701',
+    ]
+    assert records[0]['type'] == 'error'
+
+def test_format_sarif(capsys):
+    """--format=sarif streams a valid SARIF log"""
+    run_cli(
+        '--fast',
+        '--format=sarif',
+        SAMPLES
+    )
+    log = json.loads(capsys.readouterr()[0])
+    run = log['runs'][0]
+
+    assert log['version'] == '2.1.0'
+    assert [rule['id'] for rule in run['tool']['driver']['rules']] == ['E7700', 'E7701', 'E7703']
+    assert len(run['results']) == 5
+    assert run['results'][0]['locations'][0]['physicalLocation']['region']['startLine'] == 3
+
+def test_format_sarif_empty():
+    """a clean run is still a valid SARIF log"""
+    stream = io.StringIO()
+    reporter = reporters.SARIFReporter(stream)
+    reporter.start()
+    reporter.handle_file('clean.py', [])
+    reporter.finish()
+
+    assert json.loads(stream.getvalue())['runs'][0]['results'] == []
+
+def test_format_msgpack():
+    """msgpack records round-trip"""
+    msgpack = pytest.importorskip('msgpack')
+    stream = io.BytesIO()
+    reporter = reporters.MsgpackReporter(stream)
+    reporter.handle_file(
+        'sample.py',
+        engine.lint_source('def my_func(arg1, arg2, arg3):\n    pass\n', 'sample.py')
+    )
+    stream.seek(0)
+
+    records = list(msgpack.Unpacker(stream, raw=False))
+    assert [record['symbol'] for record in records] == ['invalid-oneline-function-format']
+
+def test_format_msgpack_missing(monkeypatch, capsys):
+    """-f msgpack without msgpack installed is a usage error, not a traceback"""
+    monkeypatch.setattr(
+        reporters,
+        'msgpack',
+        None
+    )  # what the guarded import leaves behind
+    status = run_cli(
+        '--fast',
+        '-f',
+        'msgpack',
+        path.join(SAMPLES, 'bad_lint_plugin.py')
+    )
+
+    assert status == 32
+    assert 'msgpack output needs `pip install ProsperLint[msgpack]`' in capsys.readouterr()[1]
+
+def test_daemon_round_trip(tmpdir):
+    """daemon lints with warm linters and picks up edits between requests"""
+    socket_path = str(tmpdir.join('lint.sock'))
+    sample = tmpdir.join('sample.py')
+    sample.write('"""docstring"""\ndef my_func(arg1, arg2, arg3):\n    """docstring"""\n')
+    server = daemon.make_server(socket_path)
+    thread = threading.Thread(
+        target=daemon.serve,
+        args=(server,)
+    )
+    thread.start()
+    try:
+        for fast in (True, False):
+            results = dict(daemon.lint(
+                [str(sample)],
+                fast=fast,
+                socket_path=socket_path
+            ))
+            symbols = [message.symbol for message in results[str(sample)]]
+            assert 'invalid-oneline-function-format' in symbols
+
+        sample.write('"""docstring"""\ndef my_func(arg1, arg2):\n    """docstring"""\n')
+        results = dict(daemon.lint(
+            [str(sample)],
+            socket_path=socket_path
+        ))
+        symbols = [message.symbol for message in results[str(sample)]]
+        assert 'invalid-oneline-function-format' not in symbols
+    finally:
+        daemon.shutdown(socket_path)
+        thread.join()
+
+    assert not tmpdir.join('lint.sock').check()
+
+def test_client_daemon_error(monkeypatch, capsys):
+    """a file the daemon fails on ends the client with a message, not a traceback"""
+    def failing_lint(
+            paths,
+            **kwargs
+    ):
+        """what :func:`daemon.lint` raises on a daemon-side error"""
+        raise RuntimeError('/tmp/sample.py: ValueError: boom')
+        yield  # pylint: disable=unreachable
+
+    monkeypatch.setattr(
+        daemon,
+        'lint',
+        failing_lint
+    )
+    status = run_cli('client', 'sample.py')
+
+    assert status == 32
+    assert 'daemon failed: /tmp/sample.py: ValueError: boom' in capsys.readouterr()[1]
+
+def test_profile_table(monkeypatch, capsys):
+    """--profile prints phases and message counters to stderr"""
+    monkeypatch.setattr(
+        runner,
+        '_WORKER_LINTERS',
+        {}  # time a cold linter
+    )
+    status = run_cli(
+        '--profile',
+        path.join(SAMPLES, 'bad_lint_plugin.py')
+    )
+    out, err = capsys.readouterr()
+
+    assert status & 2
+    assert 'invalid-function-arg-format' in out
+    for name in (
+            'import',
+            'pylint_setup',
+            'register',
+            'astroid_build',
+            'checker.visit_functiondef',
+            'lint_file',
+            'reporter',
+            'messages.invalid-oneline-function-format',
+    ):
+        assert '\n' + name + ' ' in '\n' + err
+
+def test_profile_speedscope(tmpdir, capsys):
+    """--profile-output=*.speedscope.json writes an evented profile"""
+    profile_path = str(tmpdir.join('run.speedscope.json'))
+    run_cli(
+        '--fast',
+        '--profile',
+        '--profile-output=' + profile_path,
+        path.join(SAMPLES, 'bad_lint_plugin.py')
+    )
+    capsys.readouterr()
+
+    with open(profile_path) as profile_fh:
+        profile = json.load(profile_fh)
+    frames = [frame['name'] for frame in profile['shared']['frames']]
+    events = profile['profiles'][0]['events']
+    assert 'lint_file' in frames
+    assert events
+    assert [event['type'] for event in events].count('O') * 2 == len(events)
+    assert all(0 <= event['frame'] < len(frames) for event in events)
+
+def test_stats_json(tmpdir, capsys):
+    """--stats writes per-file and whole-run counters, across worker processes"""
+    stats_path = str(tmpdir.join('stats.json'))
+    run_cli(
+        '--fast',
+        '-j2',
+        '--stats=' + stats_path,
+        path.join(SAMPLES, 'bad_lint_plugin.py'),
+        path.join(SAMPLES, 'perfect_lint.py')
+    )
+    capsys.readouterr()
+
+    with open(stats_path) as stats_fh:
+        stats = json.load(stats_fh)
+    assert stats['files'] == 2
+    assert stats['functions_examined'] > 0
+    assert stats['messages'] == {
+        'invalid-function-arg-format': 2,
+        'invalid-oneline-function-format': 3,
+    }
+    by_path = {record['path']: record for record in stats['by_file']}
+    assert by_path[path.join(SAMPLES, 'perfect_lint.py')]['messages'] == {}
+    assert [record['seconds'] for record in stats['by_file']] == sorted(
+        (record['seconds'] for record in stats['by_file']),
+        reverse=True
+    )
+
+@pytest.mark.parametrize('mmap_threshold', [engine.MMAP_THRESHOLD, 1])
+def test_read_source_encodings(
+        tmpdir,
+        monkeypatch,
+        mmap_threshold
+):
+    """bulk reads match ``tokenize.open``, buffered or mapped"""
+    monkeypatch.setattr(
+        engine,
+        'MMAP_THRESHOLD',
+        mmap_threshold
+    )
+    sources = {
+        'crlf.py': b'def func(arg1,\r\n         arg2):\r\n    pass\r\n',
+        'bom.py': b'\xef\xbb\xbfx = "\xc3\xa9"\n',
+        'latin1.py': b'# -*- coding: latin-1 -*-\nx = "\xe9"\n',
+        'cookie2.py': b'#!/usr/bin/env python\n# coding=cp1252\nx = "\x93"\n',
+    }
+    for name, data in sources.items():
+        filepath = str(tmpdir.join(name))
+        with open(filepath, 'wb') as source_fh:
+            source_fh.write(data)
+        with tokenize.open(filepath) as source_fh:
+            expected = source_fh.read()
+        assert io.StringIO(engine.read_source(filepath), newline=None).read() == expected
+
+    assert [message.line for message in engine.lint_file(str(tmpdir.join('crlf.py')))] == [1]
+
+def test_read_source_bad_encoding(tmpdir):
+    """undecodable files come back as syntax errors, like pylint's E0001"""
+    filepath = str(tmpdir.join('bad.py'))
+    with open(filepath, 'wb') as source_fh:
+        source_fh.write(b'x = "\xff"\n')
+
+    messages = engine.lint_file(filepath)
+    assert [message.symbol for message in messages] == ['syntax-error']
+
+def test_unreadable_file(tmpdir, capsys):
+    """a dangling symlink is one F0001 message, the rest of the run still reports"""
+    tmpdir.join('bad.py').write('def my_func(arg1,\n            arg2):\n    pass\n')
+    os.symlink(
+        str(tmpdir.join('missing.py')),
+        str(tmpdir.join('broken.py'))
+    )
+    broken = str(tmpdir.join('broken.py'))
+
+    for stream_threshold in (None, 0):
+        messages = engine.lint_file(broken, stream_threshold=stream_threshold)
+        assert [message[2:5] for message in messages] == [('F0001', 'fatal', 1)]
+
+    status = run_cli(
+        '--fast',
+        '--jobs=2',
+        str(tmpdir)
+    )
+    out = capsys.readouterr()[0]
+    assert status == 3
+    assert '(fatal)' in out
+    assert '(invalid-function-arg-format)' in out
+
+def test_stream_file_matches(tmpdir):
+    """streamed files report what whole-file reads do, encodings and errors included"""
+    sources = {
+        'crlf.py': b'def func(arg1,\r\n         arg2):\r\n    pass\r\n',
+        'latin1.py': b'# -*- coding: latin-1 -*-\nx = func("\xe9", 1, 2)\n',
+        'bad.py': b'x = "\xff"\n',
+        'eof.py': b'x = func(1,\n',
+    }
+    filepaths = glob.glob(path.join(SAMPLES, '*.py'))
+    for name, data in sources.items():
+        filepaths.append(str(tmpdir.join(name)))
+        with open(filepaths[-1], 'wb') as source_fh:
+            source_fh.write(data)
+
+    for filepath in filepaths:
+        whole = engine.lint_file(
+            filepath,
+            stream_threshold=None
+        )
+        streamed = engine.lint_file(
+            filepath,
+            stream_threshold=0
+        )
+        assert [message[:5] for message in streamed] == [message[:5] for message in whole]
+        assert sorted(
+            engine.stream_file(filepath),
+            key=lambda message: message.line
+        ) == streamed
+
+STREAM_CHUNK = '''def bad_function(arg1,
+                 arg2):
+    return call(arg1, arg2, arg1)
+
+DESCRIPTOR = make(
+    name='x',
+    fields=[field(a, b, c), field(
+        a,
+        b
+    )],
+)
+'''
+
+def test_stream_file_flat_memory(tmpdir):
+    """peak memory doesn't follow file size or message count"""
+    import tracemalloc
+
+    def stream_peak(chunks):
+        filepath = str(tmpdir.join('generated_{}.py'.format(chunks)))
+        with open(filepath, 'w') as source_fh:
+            for _ in range(chunks):
+                source_fh.write(STREAM_CHUNK)
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in engine.stream_file(filepath))
+            return count, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    stream_peak(10)  # warm up tokenize/codec caches
+    small_count, small_peak = stream_peak(100)
+    big_count, big_peak = stream_peak(3000)
+
+    assert big_count == small_count * 30
+    assert big_peak < small_peak * 2 + 64 * 1024
+    assert big_peak < len(STREAM_CHUNK) * 3000 / 10
+
+@pytest.mark.parametrize('source,expected', [
+    ('', False),
+    ('"""constants"""\nLIMIT = 10\nNAMES = [\n    "a",\n]\n', False),
+    ('from .module import func\n__all__ = ["func"]\n', False),
+    ('def func(arg1):\n    return other(arg1)\n', False),
+    ('def func(arg1, arg2, arg3):\n    pass\n', True),
+    ('result = func(arg1,\n              arg2)\n', True),
+    ('result = func(arg1)  # comment (\n', True),
+    ('x = ")"\n', True),
+    ('NAMES = [\n', True),
+    ('x = 1 + \\\n', True),
+])
+def test_prefilter(source, expected):
+    """prefilter only says no when tokens can't turn anything up"""
+    assert layout.may_have_findings(source, 2) is expected
+    if not expected:
+        assert engine.lint_source(source) == []
+
+def test_prefilter_samples():
+    """every sample with findings gets past the prefilter"""
+    for filepath in glob.glob(path.join(SAMPLES, '*.py')):
+        source = engine.read_source(filepath)
+        tokens = tokenize.generate_tokens(io.StringIO(source).readline)
+        if engine.lint_tokens(tokens):
+            assert layout.may_have_findings(source, 2)
+
+def make_tree(root, files):
+    """write ``{relpath: text}`` under ``root``"""
+    for relpath, text in files.items():
+        filepath = root.join(*relpath.split('/'))
+        filepath.dirpath().ensure(dir=True)
+        filepath.write(text)
+
+def test_walker_ignore_files(tmpdir, monkeypatch):
+    """.gitignore, pylint ignore/ignore-patterns and exclude all prune the walk"""
+    make_tree(tmpdir, {
+        '.git/HEAD': '',
+        '.gitignore': 'build/\n*_pb2.py\n!keep_pb2.py\n/top_only.py\n',
+        'top_only.py': '',
+        'app/top_only.py': '',
+        'app/__init__.py': '',
+        'app/models_pb2.py': '',
+        'app/keep_pb2.py': '',
+        'app/build/generated.py': '',
+        'app/vendor/lib.py': '',
+        'app/sub/.gitignore': 'local.py\n',
+        'app/sub/local.py': '',
+        'app/sub/mod.py': '',
+        'app/CVS/old.py': '',
+        'app/test_skip.py': '',
+    })
+    monkeypatch.chdir(tmpdir)
+    rules = walker.IgnoreRules(
+        ignore=('CVS',),
+        ignore_patterns=(re.compile('test_'),),
+        exclude=('app/vendor',),
+        gitignore=True,
+    )
+
+    assert list(walker.iter_python_files(['app'], rules)) == [
+        path.normpath(relpath) for relpath in (
+            'app/__init__.py',
+            'app/keep_pb2.py',
+            'app/top_only.py',
+            'app/sub/mod.py',
+        )
+    ]
+    assert list(walker.iter_python_files(['top_only.py'], rules)) == ['top_only.py']
+    unfiltered = walker.IgnoreRules(
+        (),
+        (),
+        (),
+        False
+    )
+    assert len(list(walker.iter_python_files(['.'], unfiltered))) == 11
+
+def test_walker_matches_os_walk():
+    """walk order matches a sorted os.walk"""
+    expected = []
+    for dirpath, dirnames, filenames in os.walk(helpers.HERE):
+        dirnames.sort()
+        expected.extend(
+            path.join(dirpath, filename)
+            for filename in sorted(filenames) if filename.endswith('.py')
+        )
+    rules = walker.IgnoreRules(
+        (),
+        (),
+        (),
+        False
+    )
+
+    assert list(walker.iter_python_files([helpers.HERE], rules)) == expected
+
+def test_walker_symlink_loop(tmpdir):
+    """symlinked directories aren't followed, like os.walk, so loops end"""
+    tmpdir.join('a', 'mod.py').ensure()
+    os.symlink(str(tmpdir), str(tmpdir.join('a', 'loop')))
+    os.symlink(str(tmpdir.join('a')), str(tmpdir.join('a', 'again.py')))
+    rules = walker.IgnoreRules(
+        (),
+        (),
+        (),
+        False
+    )
+
+    assert list(walker.iter_python_files([str(tmpdir)], rules)) == [
+        str(tmpdir.join('a', 'mod.py')),
+    ]
+
+def test_load_ignore_rules(tmpdir):
+    """walker rules come from the merged settings"""
+    base = tmpdir.join('base.rc')
+    base.write('[MASTER]\nignore=CVS,migrations\nignore-patterns=.*_pb2.py\n')
+    tmpdir.join('.git').ensure(dir=True)
+    tmpdir.join('.prosperlintrc').write('[prosper_lint]\nexclude=\n    vendor/*,\n    build\n')
+
+    rules = walker.load_ignore_rules(settings.load_config(
+        start=str(tmpdir),
+        rcfile=str(base)
+    ))
+    assert rules.ignore == ('CVS', 'migrations')
+    assert [pattern.pattern for pattern in rules.ignore_patterns] == ['.*_pb2.py']
+    assert rules.exclude == ('vendor/*', 'build')
+
+def test_settings_merge(tmpdir):
+    """project files override the packaged rc, .prosperlintrc over setup.cfg"""
+    project = tmpdir.join('project')
+    project.join('.git').ensure(dir=True)
+    project.join('setup.cfg').write(
+        '[metadata]\nname = thing\n'
+        '[pylint.MASTER]\nignore = CVS,build\n'
+        '[pylint.function_args]\nsingle-line-args-limit = 4\nkevlin-func-args = n\n'
+    )
+    project.join('.prosperlintrc').write('[FUNCTION_ARGS]\nsingle-line-args-limit = 3\n')
+    start = project.join('src', 'pkg').ensure(dir=True)
+
+    prosper_config = settings.load_config(start=str(start))
+    assert [source for source, _ in prosper_config.sources] == [
+        settings.RCFILE,
+        str(project.join('setup.cfg')),
+        str(project.join('.prosperlintrc')),
+    ]
+    assert 'METADATA' not in dict(prosper_config.sections)
+    assert settings.get_option(
+        prosper_config,
+        'ignore',
+        section='MASTER'
+    ) == 'CVS,build'
+    assert settings.lint_config(prosper_config) == engine.LintConfig(
+        kevlin_func_args=False,
+        single_line_args_limit=3,
+    )
+    assert settings.lint_config(
+        prosper_config,
+        single_line_args_limit=5
+    ).single_line_args_limit == 5
+    hash(prosper_config)
+
+def test_settings_parse_cache(tmpdir, monkeypatch):
+    """files are reparsed only when their content changes"""
+    rcfile = tmpdir.join('.prosperlintrc')
+    rcfile.write('[MASTER]\nignore=CVS\n')
+    parses = []
+    real_parse = settings._parse_ini
+    monkeypatch.setattr(
+        settings,
+        '_parse_ini',
+        lambda *args, **kwargs: parses.append(1) or real_parse(*args, **kwargs)
+    )
+
+    first = settings.parse_file(str(rcfile))
+    assert settings.parse_file(str(rcfile)) == first
+    os.utime(str(rcfile), (1, 1))  # touched, same content
+    assert settings.parse_file(str(rcfile)) == first
+    assert len(parses) == 1
+
+    rcfile.write('[MASTER]\nignore=CVS,build\n')
+    os.utime(str(rcfile), (2, 2))
+    assert settings.parse_file(str(rcfile))[1]['MASTER']['ignore'] == 'CVS,build'
+    assert len(parses) == 2
+
+def test_pylint_linter_uses_frozen_settings(monkeypatch):
+    """linters are configured from the shipped settings, rc files aren't reread"""
+    prosper_config = settings.ProsperConfig(
+        sources=(),
+        sections=(
+            ('MASTER', (('load-plugins', 'pylint_quotes,pylint_prosper'),)),
+            ('STRING_QUOTES', (('string-quote', 'double'),)),
+            ('DESIGN', (('max-args', '9'),)),
+            ('MESSAGES CONTROL', (('disable', 'missing-docstring'),)),
+        ),
+    )
+    monkeypatch.setattr(
+        settings,
+        'parse_file',
+        lambda filepath: pytest.fail('reparsed ' + filepath)
+    )
+    linter = runner.build_pylint_linter(prosper_config=prosper_config)
+    options = {
+        checker.name: checker.config for checker in linter.get_checkers()
+    }
+
+    assert options['string_quotes'].string_quote == 'double'
+    assert options['design'].max_args == 9
+    assert not linter.is_message_enabled('missing-docstring')
+    assert not any(  # the rc asked for pylint_quotes, that's what it gets
+        type(checker).__module__ == 'pylint_prosper.quotes_checker'
+        for checker in linter.get_checkers()
+    )
+
+def test_shared_quote_checker_matches_pylint_quotes():
+    """the shared quote checker reports exactly what pylint_quotes does"""
+    from pylint import lint
+    from pylint import reporters as pylint_reporters
+
+    from pylint_prosper import quotes_checker
+
+    quote_options = (
+        ('string-quote', 'double'),
+        ('triple-quote', 'double'),
+        ('docstring-quote', 'single'),
+    )
+    prosper_config = settings.ProsperConfig(
+        sources=(),
+        sections=(
+            ('MASTER', (('load-plugins', 'pylint_prosper.quotes_checker,pylint_prosper'),)),
+            ('STRING_QUOTES', quote_options),
+        ),
+    )
+    shared = runner.build_pylint_linter(prosper_config=prosper_config)
+    stock = lint.PyLinter()
+    stock.load_default_plugins()
+    stock.load_plugin_modules(['pylint_quotes'])
+    for option, value in quote_options:
+        runner.set_option(
+            stock,
+            option,
+            value
+        )
+    stock.set_reporter(pylint_reporters.CollectingReporter())
+
+    assert any(
+        isinstance(checker, quotes_checker.SharedStringQuoteChecker)
+        for checker in shared.get_checkers()
+    )
+    filepaths = glob.glob(path.join(SAMPLES, '*.py')) + [
+        path.join(helpers.ROOT, name) for name in ('args_checker.py', 'layout.py', 'settings.py')
+    ]
+    compared = 0
+    for filepath in filepaths:
+        found = [
+            [
+                (message.line, message.column, message.symbol, message.msg)
+                for message in runner.pylint_file(linter, filepath)
+                if message.symbol.endswith('-quote')
+            ]
+            for linter in (shared, stock)
+        ]
+        assert found[0] == found[1], filepath
+        compared += len(found[0])
+    assert compared
+
+def test_shared_quote_checker_unsupported_version(monkeypatch):
+    """pylint_quotes releases the overrides weren't written against get the stock checker"""
+    from pylint import lint
+    from pylint_quotes.checker import StringQuoteChecker
+
+    from pylint_prosper import quotes_checker
+
+    monkeypatch.setattr(
+        quotes_checker,
+        'QUOTES_VERSION',
+        '0.3.0'
+    )
+    linter = lint.PyLinter()
+    with pytest.warns(RuntimeWarning):
+        quotes_checker.register(linter)
+
+    checkers = [
+        checker for checker in linter.get_checkers() if isinstance(checker, StringQuoteChecker)
+    ]
+    assert [type(checker) for checker in checkers] == [StringQuoteChecker]
+
+def test_map_files_streams():
+    """workers start before discovery finishes, results stay in order"""
+    consumed = []
+    sample = path.join(SAMPLES, 'bad_lint_plugin.py')
+
+    def tasks():
+        for index in range(200):
+            consumed.append(index)
+            yield sample, None
+
+    results = runner._map_files(
+        tasks(),
+        functools.partial(runner.lint_path, fast=True),
+        2
+    )
+    first = next(results)
+    assert len(consumed) < 200
+    assert [first] + list(results) == [first] * 200
+
+def guarded_worker(filepath, line_ranges):
+    """stand-in lint worker: ``slow`` hangs, ``crash`` dies, ``big`` eats memory"""
+    if filepath == 'slow':
+        time.sleep(30)
+    elif filepath == 'crash':
+        os._exit(3)
+    elif filepath == 'big':
+        hog = bytearray(256 * workers.MIB)
+        hog[::4096] = b'x' * len(hog[::4096])  # touch every page
+        time.sleep(30)
+    return filepath, os.getpid()
+
+def test_supervised_map_limits():
+    """hung and crashed files are skipped, workers recycle, order holds"""
+    tasks = [(name, None) for name in ('a', 'slow', 'b', 'crash', 'c', 'd', 'e')]
+    start = time.time()
+    results = list(workers.supervised_map(
+        tasks,
+        guarded_worker,
+        2,
+        workers.WorkerLimits(
+            timeout=0.5,
+            max_rss=None,
+            max_files=2
+        )
+    ))
+
+    assert time.time() - start < 10
+    assert results[1] == workers.Skipped('timed out after 0.5s')
+    assert results[3] == workers.Skipped('worker exited with code 3')
+    done = [result for result in results if not isinstance(result, workers.Skipped)]
+    assert [name for name, _ in done] == ['a', 'b', 'c', 'd', 'e']
+    pids = [pid for _, pid in done]
+    assert all(pids.count(pid) <= 2 for pid in pids)
+
+@pytest.mark.skipif(workers.rss_bytes(os.getpid()) is None, reason='needs /proc')
+def test_supervised_map_max_rss():
+    """a worker past the memory limit is killed mid-file"""
+    results = list(workers.supervised_map(
+        [('a', None), ('big', None), ('b', None)],
+        guarded_worker,
+        1,
+        workers.WorkerLimits(
+            timeout=20,
+            max_rss=workers.rss_bytes(os.getpid()) + 128 * workers.MIB,
+            max_files=None
+        )
+    ))
+
+    assert results[0][0] == 'a'
+    assert results[1].reason.startswith('worker used more than')
+    assert results[2][0] == 'b'
+
+def test_timeout_reports_skipped(
+        tmpdir,
+        capsys,
+        monkeypatch
+):
+    """--timeout reports a hung file as lint-skipped, and it isn't cached"""
+    bad = path.join(SAMPLES, 'bad_lint_plugin.py')
+    lint_path = runner.lint_path
+
+    def hanging_lint_path(
+            filepath,
+            *args,
+            **kwargs
+    ):
+        if filepath == bad:
+            time.sleep(30)
+        return lint_path(
+            filepath,
+            *args,
+            **kwargs
+        )
+
+    monkeypatch.setattr(
+        runner,
+        'lint_path',
+        hanging_lint_path
+    )
+    cache_dir = '--cache-dir=' + str(tmpdir)
+    status = run_cli(
+        '--fast',
+        '--timeout=0.5',
+        cache_dir,
+        bad,
+        path.join(SAMPLES, 'perfect_lint.py')
+    )
+    out = capsys.readouterr()[0].splitlines()
+
+    assert status == 1
+    assert out == [
+        '************* Module bad_lint_plugin',
+        'F:  1, 0: Skipped, timed out after 0.5s (lint-skipped)',
+    ]
+
+    monkeypatch.undo()
+    assert run_cli(
+        '--fast',
+        cache_dir,
+        bad
+    ) == 2
+
+def test_worker_limits_settings():
+    """command line over [prosper_lint], 0 or empty means off"""
+    prosper_config = settings.ProsperConfig(
+        sources=(),
+        sections=(('PROSPER_LINT', (
+            ('timeout', '60'),
+            ('max-memory', '2048'),
+            ('max-files-per-worker', '0'),
+        )),),
+    )
+
+    assert settings.worker_limits(prosper_config) == workers.WorkerLimits(
+        timeout=60.0,
+        max_rss=2048 * workers.MIB,
+        max_files=None,
+    )
+    assert settings.worker_limits(
+        prosper_config,
+        timeout=5,
+        max_files=100
+    ).timeout == 5
+    assert settings.worker_limits(settings.load_config(rcfile=settings.RCFILE)) == workers.NO_LIMITS
+
+def test_worker_limits_setup_cfg(tmpdir):
+    """worker limits come from setup.cfg, where pylint doesn't look"""
+    project = tmpdir.join('project')
+    project.join('.git').ensure(dir=True)
+    project.join('setup.cfg').write('[prosper_lint]\ntimeout = 60\nmax-files-per-worker = 200\n')
+
+    assert settings.worker_limits(settings.load_config(start=str(project))) == workers.WorkerLimits(
+        timeout=60.0,
+        max_rss=None,
+        max_files=200,
+    )
+
+def test_packaged_rcfile_loads_in_pylint():
+    """plain pylint takes the packaged rc, prosper_lint's own keys aren't in it"""
+    python = local[sys.executable]
+    _, stdout, stderr = python[
+        '-m',
+        'pylint',
+        '--rcfile=' + settings.RCFILE,
+        path.join(SAMPLES, 'perfect_lint.py')
+    ].run(retcode=None)
+    output = stdout + stderr
+
+    assert 'ambiguous option' not in output
+    assert 'usage:' not in output
+    for option in ('exclude', 'timeout', 'max-memory', 'max-files-per-worker'):
+        assert not re.search(r"Unrecognized option found: .*\b{}\b".format(option), output)
+
+FIX_BEFORE = '''def bad_function(arg1,
+                 arg2,  # second
+                 optional_arg=None):
+    """doc"""
+    return outer(inner(arg1, arg2, arg3), """multi
+line""")
+
+class Thing(object):
+    def method(self, a, b, *, c=lambda x, y: x):
+        print(fmt(a, b, c), file=sys.stderr)
+        return call(a, b)
+'''
+FIX_AFTER = '''def bad_function(
+        arg1,
+        arg2,  # second
+        optional_arg=None
+):
+    """doc"""
+    return outer(
+        inner(
+            arg1,
+            arg2,
+            arg3
+        ),
+        """multi
+line"""
+    )
+
+class Thing(object):
+    def method(
+            self,
+            a,
+            b,
+            *,
+            c=lambda x, y: x
+    ):
+        print(
+            fmt(
+                a,
+                b,
+                c
+            ),
+            file=sys.stderr
+        )
+        return call(a, b)
+'''
+
+def test_fix_source():
+    """nested offenders, comments, strings and markers, all in one pass"""
+    fixed, count = fixer.fix_source(FIX_BEFORE)
+
+    assert fixed == FIX_AFTER
+    assert count == 6  # print only goes multi-line once fmt(...) is rewritten
+    assert engine.lint_source(fixed) == []
+    assert fixer.fix_source(fixed) == (fixed, 0)
+
+def test_fix_source_statement_paren():
+    """a tuple target after a call is left alone"""
+    source = 'month_abbr = localized_month(fmt)\n(MONDAY, TUESDAY, WEDNESDAY) = range(3)\n'
+
+    assert fixer.fix_source(source) == (source, 0)
+
+def test_fix_source_generator_arg():
+    """a generator arg is one arg, its ``for`` target isn't split over lines"""
+    source = 'found = any(tag in {1, 2} for tag, _, _ in group)\n'
+
+    assert fixer.fix_source(source) == (source, 0)
+
+def test_fix_source_line_ranges():
+    """with changed lines only the overlapping defs/calls are rewritten"""
+    fixed, count = fixer.fix_source(
+        FIX_BEFORE,
+        line_ranges=[(9, 9)]
+    )
+
+    assert count == 1
+    assert fixed.startswith(FIX_BEFORE.split('    def method')[0])
+    assert '        print(fmt(a, b, c), file=sys.stderr)\n' in fixed
+
+def test_fix_cli(tmpdir, capsys):
+    """--fix rewrites in place, keeps CRLF newlines, then lints what is left"""
+    target = tmpdir.join('bad_lint_plugin.py')
+    with open(path.join(SAMPLES, 'bad_lint_plugin.py')) as sample_fh:
+        target.write_binary(sample_fh.read().replace('\n', '\r\n').encode('utf-8'))
+
+    status = run_cli(
+        '--fix',
+        '--fast',
+        str(target)
+    )
+    out, err = capsys.readouterr()
+
+    assert status == 0
+    assert out == ''
+    assert 'Fixed 5 arg layouts in ' + str(target) in err
+    assert b'\r\n' in target.read_binary()
+    assert b'\n' not in target.read_binary().replace(b'\r\n', b'')
+    assert engine.lint_file(str(target)) == []
+
+BASELINE_SOURCE = '''def bad_function(arg1,
+                 arg2):
+    return call(arg1, arg2, arg1)
+'''
+
+def test_baseline_fingerprints(tmpdir):
+    """fingerprints follow the signature, not the line number or layout"""
+    def prints(source):
+        target = tmpdir.join('module.py')
+        target.write(source)
+        return baseline.fingerprints(
+            str(target),
+            engine.lint_source(source),
+            str(tmpdir)
+        )
+
+    original = prints(BASELINE_SOURCE)
+    assert len(original) == 2 and None not in original
+    assert prints('import os\n\n' + BASELINE_SOURCE) == original
+    assert prints(BASELINE_SOURCE.replace('(arg1, arg2, arg1)', '( arg1,arg2,  arg1 )')) == original
+    assert prints(BASELINE_SOURCE.replace('arg2, arg1)', 'arg2, arg3)'))[1] != original[1]
+
+    baseline.write(str(tmpdir.join('baseline.json')), original)
+    known = baseline.load(str(tmpdir.join('baseline.json')))
+    twice = BASELINE_SOURCE + '    return call(arg1, arg2, arg1)\n'
+    tmpdir.join('module.py').write(twice)
+    left = baseline.apply(
+        known,
+        str(tmpdir.join('module.py')),
+        engine.lint_source(twice)
+    )
+    assert [message.line for message in left] == [4]  # recorded once, reported the second time
+
+@pytest.mark.parametrize('mode', [('--fast',), ()])
+def test_baseline_cli(
+        tmpdir,
+        capsys,
+        mode
+):
+    """--write-baseline records today's hits, --baseline only reports new ones"""
+    target = tmpdir.join('bad_lint_plugin.py')
+    with open(path.join(SAMPLES, 'bad_lint_plugin.py')) as sample_fh:
+        sample = sample_fh.read()
+    target.write(sample)
+    baseline_file = str(tmpdir.join('baseline.json'))
+
+    assert run_cli(*mode + ('--baseline', baseline_file, str(target))) == 32
+    assert run_cli(*mode + ('--write-baseline', '--baseline', baseline_file, str(target))) == 0
+    assert 'Recorded 5 hits in ' + baseline_file in capsys.readouterr()[1]
+    assert not run_cli(*mode + ('--baseline', baseline_file, str(target))) & 2  # no errors
+    assert '-format)' not in capsys.readouterr()[0]
+
+    target.write('"""moved down"""\n\n' + sample + 'bad_function(1, 2, 3)\n')
+    daemon.forget_module(str(target))  # same process, same astroid cache
+    status = run_cli(*mode + ('--baseline', baseline_file, str(target)))
+    out = [line for line in capsys.readouterr()[0].splitlines() if line.endswith('-format)')]
+
+    assert status & 2
+    assert out == [
+        'E: {:2d}, 0: Too many args for one-line.  More than 2 args '
+        '(invalid-oneline-function-format)'.format(len(sample.splitlines()) + 3),
+    ]